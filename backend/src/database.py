@@ -1,3 +1,43 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 db = SQLAlchemy()
+
+
+def _bitmap_set(bits, offset):
+    """`bits` (little-endian bitmap blob) with bit `offset` set, grown as needed"""
+    byte_index, bit = divmod(offset, 8)
+    bits = bytearray(bits or b"")
+    if byte_index >= len(bits):
+        bits.extend(b"\x00" * (byte_index + 1 - len(bits)))
+    bits[byte_index] |= 1 << bit
+    return bytes(bits)
+
+
+def _bitmap_test(bits, offset):
+    byte_index, bit = divmod(offset, 8)
+    return 1 if bits and byte_index < len(bits) and bits[byte_index] & (1 << bit) else 0
+
+
+def _byte_at(data, index):
+    return data[index] if data and index < len(data) else 0
+
+
+def _byte_max(data, index, value):
+    """`data` with byte `index` raised to at least `value` (a HyperLogLog register update)"""
+    data = bytearray(data or b"")
+    if data[index] < value:
+        data[index] = value
+    return bytes(data)
+
+
+@event.listens_for(Engine, "connect")
+def _register_sql_functions(dbapi_connection, connection_record):
+    """Blob helpers, so read-modify-write updates of bitmaps and sketches run inside one atomic statement"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("bitmap_set", 2, _bitmap_set, deterministic=True)
+        dbapi_connection.create_function("bitmap_test", 2, _bitmap_test, deterministic=True)
+        dbapi_connection.create_function("byte_at", 2, _byte_at, deterministic=True)
+        dbapi_connection.create_function("byte_max", 3, _byte_max, deterministic=True)
@@ -21,6 +21,8 @@ from src.routes.activity import activity_bp
 from src.routes.feedback import feedback_bp
 from src.routes.gamification import gamification_bp
 from src.routes.search import search_bp
+from src.services.leaderboard_index import LeaderboardIndex
+from src.services.scheduler import Scheduler, register_default_jobs
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), "static"))
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "asdf#FGSgvasgf$5$WGT")
@@ -44,9 +46,31 @@ app.register_blueprint(gamification_bp, url_prefix="/api")
 app.register_blueprint(search_bp, url_prefix="/api")
 
 # uncomment if you need to use database
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "DATABASE_URL", f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 db.init_app(app)
+with app.app_context():
+    db.create_all()
+
+# Periodic jobs (leaderboard snapshots, streak resets, ledger compaction) run in every worker;
+# leases in scheduled_job_leases make each run happen once. Set SCHEDULER_ENABLED=0 to turn them off.
+app.config["SCHEDULER_ENABLED"] = os.environ.get("SCHEDULER_ENABLED", "1") != "0"
+register_default_jobs()
+
+# Each worker builds its in-memory leaderboards in a background thread when it starts serving,
+# instead of on the first leaderboard request. Set LEADERBOARD_WARMUP=0 to build them on demand.
+app.config["LEADERBOARD_WARMUP"] = os.environ.get("LEADERBOARD_WARMUP", "1") != "0"
+
+
+@app.before_request
+def start_background_threads():
+    # Started by the first request so scripts that import the app don't start them
+    if app.config["SCHEDULER_ENABLED"]:
+        Scheduler.start(app)
+    if app.config["LEADERBOARD_WARMUP"]:
+        LeaderboardIndex.warm(app)
 
 
 @app.route("/", defaults={"path": ""})
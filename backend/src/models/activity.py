@@ -11,5 +11,14 @@ class UserActivity(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     details = db.Column(db.JSON)
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'activity_type': self.activity_type,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'details': self.details
+        }
+
     def __repr__(self):
         return f'<UserActivity {self.id}>'
@@ -0,0 +1,186 @@
+from datetime import datetime, date
+from src.database import db
+
+
+class UserDailyStats(db.Model):
+    __tablename__ = "user_daily_stats"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+
+    # Rollup counters, maintained incrementally by StatsService
+    minutes_studied = db.Column(db.Integer, default=0)
+    resources_completed = db.Column(db.Integer, default=0)
+    quizzes_taken = db.Column(db.Integer, default=0)
+    quiz_score_sum = db.Column(db.Float, default=0.0)  # Sum of attempt percentages
+    points_earned = db.Column(db.Integer, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # One row per user per day
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "date", name="unique_user_daily_stats"),
+        db.Index("ix_user_daily_stats_date", "date"),
+        db.Index("ix_user_daily_stats_updated_at", "updated_at"),  # Leaderboard catch-up cursor
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "date": self.date.isoformat() if self.date else None,
+            "minutes_studied": self.minutes_studied,
+            "resources_completed": self.resources_completed,
+            "quizzes_taken": self.quizzes_taken,
+            "quiz_score_sum": self.quiz_score_sum,
+            "average_quiz_score": (self.quiz_score_sum / self.quizzes_taken) if self.quizzes_taken else 0,
+            "points_earned": self.points_earned,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class UserMetrics(db.Model):
+    __tablename__ = "user_metrics"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+
+    # Lifetime counters behind achievement progress, maintained incrementally by MetricsService
+    quizzes_completed = db.Column(db.Integer, default=0)
+    quiz_score_sum = db.Column(db.Float, default=0.0)  # Sum of completed attempt percentages
+    notes_created = db.Column(db.Integer, default=0)  # Notes the user currently has; deletes decrement
+    resources_viewed = db.Column(db.Integer, default=0)
+    paths_completed = db.Column(db.Integer, default=0)
+    achievements_earned = db.Column(db.Integer, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Set by MetricsService.reconcile(); NULL while the row only holds the increments made since it was created
+    reconciled_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "quizzes_completed": self.quizzes_completed,
+            "quiz_score_sum": self.quiz_score_sum,
+            "average_quiz_score": (self.quiz_score_sum / self.quizzes_completed) if self.quizzes_completed else 0,
+            "notes_created": self.notes_created,
+            "resources_viewed": self.resources_viewed,
+            "paths_completed": self.paths_completed,
+            "achievements_earned": self.achievements_earned,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+        }
+
+
+class QuestionStats(db.Model):
+    __tablename__ = "question_stats"
+
+    question_id = db.Column(db.Integer, db.ForeignKey("questions.id"), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quizzes.id"), nullable=False, index=True)
+
+    # Running item statistics, maintained incrementally by ItemStatsService at submit.
+    # "Rest score" is the attempt's percentage on its other questions (the item itself left out).
+    attempts = db.Column(db.Integer, default=0)
+    correct_count = db.Column(db.Integer, default=0)
+    rest_score_sum = db.Column(db.Float, default=0.0)
+    rest_score_sq_sum = db.Column(db.Float, default=0.0)
+    rest_score_correct_sum = db.Column(db.Float, default=0.0)  # Over the attempts that got the item right
+    seconds_sum = db.Column(db.Float, default=0.0)  # Attempt duration / question count (no per-question timing)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Day zero of the activity bitmaps (the project start date used by the all-time leaderboards)
+ACTIVITY_EPOCH = date(2024, 1, 1)
+
+
+class UserActivityBitmap(db.Model):
+    __tablename__ = "user_activity_bitmaps"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    # Bit n (little-endian within and across bytes) is set when the user was active on ACTIVITY_EPOCH + n days
+    bits = db.Column(db.LargeBinary, nullable=False, default=b"")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "epoch": ACTIVITY_EPOCH.isoformat(),
+            "active_days": int.from_bytes(self.bits or b"", "little").bit_count(),
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class ScoreSketch(db.Model):
+    __tablename__ = "score_sketches"
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # 'quiz' or 'subject'
+    scope_key = db.Column(db.String(100), nullable=False)  # Quiz id or subject name
+    count = db.Column(db.Integer, default=0)  # Scores summarised by the sketch
+    data = db.Column(db.LargeBinary, nullable=False)  # Serialized KLLSketch
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint("scope", "scope_key", name="unique_score_sketch"),)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "scope": self.scope,
+            "scope_key": self.scope_key,
+            "count": self.count,
+            "size_bytes": len(self.data) if self.data else 0,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class DailyActiveUsers(db.Model):
+    __tablename__ = "daily_active_users"
+
+    date = db.Column(db.Date, primary_key=True)
+    # HyperLogLog registers (one byte each) over the ids of users active that day
+    registers = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "date": self.date.isoformat() if self.date else None,
+            "size_bytes": len(self.registers) if self.registers else 0,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class AnalyticsJob(db.Model):
+    __tablename__ = "analytics_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    name = db.Column(db.String(50), nullable=False)  # 'quiz-analytics', 'study-time', 'bundle'
+    params = db.Column(db.JSON, nullable=False)
+    params_key = db.Column(db.String(255), nullable=False)  # Canonical JSON of params, to share identical jobs
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)  # Set once the job finishes
+
+    __table_args__ = (
+        db.Index("ix_analytics_jobs_active", "status", "user_id", "name", "params_key"),
+        db.Index("ix_analytics_jobs_expires_at", "expires_at"),
+    )
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "name": self.name,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
@@ -85,7 +85,7 @@ class UserLevel(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # Leaderboard catch-up cursor
     
     # Relationships
     user = db.relationship('User', backref=db.backref('level', uselist=False))
@@ -204,3 +204,106 @@ class Leaderboard(db.Model):
             } if self.user else None
         }
 
+
+class RuleBackfillJob(db.Model):
+    __tablename__ = 'rule_backfill_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    rule_type = db.Column(db.String(20), nullable=False)  # 'achievement' or 'badge'
+    rule_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='running')  # 'running', 'completed'
+    
+    # Progress; last_user_id is the resume cursor and moves in the same transaction as the awards
+    last_user_id = db.Column(db.Integer, default=0)
+    users_processed = db.Column(db.Integer, default=0)
+    total_users = db.Column(db.Integer, default=0)
+    awarded_count = db.Column(db.Integer, default=0)
+    
+    # Timestamps
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'rule_type': self.rule_type,
+            'rule_id': self.rule_id,
+            'status': self.status,
+            'last_user_id': self.last_user_id,
+            'users_processed': self.users_processed,
+            'total_users': self.total_users,
+            'awarded_count': self.awarded_count,
+            'progress_percentage': (self.users_processed / self.total_users * 100) if self.total_users else 100,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+class LeaderboardSnapshot(db.Model):
+    __tablename__ = 'leaderboard_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    board = db.Column(db.String(50), nullable=False, unique=True)  # Ranked category: 'points', 'quizzes', 'streak'
+    entries = db.Column(db.Integer, default=0)
+    data = db.Column(db.LargeBinary, nullable=False)  # Packed ranking keys in rank order
+    
+    # UserLevel changes up to here are included; newer ones are replayed on load
+    watermark = db.Column(db.DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'board': self.board,
+            'entries': self.entries,
+            'size_bytes': len(self.data) if self.data else 0,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class PointsLedgerEntry(db.Model):
+    __tablename__ = 'points_ledger'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category = db.Column(db.String(20), nullable=False, default='general')  # 'learning', 'quiz', 'achievement', 'social', 'general'
+    points = db.Column(db.Integer, nullable=False)
+    entries = db.Column(db.Integer, default=1)  # Awards folded into this row by compaction
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Award time; start of the day once compacted
+    
+    __table_args__ = (
+        db.Index('ix_points_ledger_user_created', 'user_id', 'created_at'),
+        db.Index('ix_points_ledger_created', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'category': self.category,
+            'points': self.points,
+            'entries': self.entries,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)  # 'gamification': achievements and badges
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped by every committed catalog change
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -81,6 +81,7 @@ class Resource(db.Model):
     duration_minutes = db.Column(db.Integer, nullable=True)
     difficulty_level = db.Column(db.String(20), default="intermediate")
     is_completed = db.Column(db.Boolean, default=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -95,6 +96,7 @@ class Resource(db.Model):
             "duration_minutes": self.duration_minutes,
             "difficulty_level": self.difficulty_level,
             "is_completed": self.is_completed,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
@@ -109,6 +111,7 @@ class Quiz(db.Model):
     difficulty_level = db.Column(db.String(20), default="intermediate")
     time_limit_minutes = db.Column(db.Integer, default=15)
     is_active = db.Column(db.Boolean, default=True)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Bumped whenever its questions change
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -133,7 +136,7 @@ class Question(db.Model):
     __tablename__ = "questions"
 
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey("quizzes.id"), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quizzes.id"), nullable=False, index=True)
     question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(50), default="multiple_choice")  # multiple_choice, true_false, short_answer
     correct_answer = db.Column(db.Text, nullable=False)
@@ -143,6 +146,9 @@ class Question(db.Model):
     order_index = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Relationships
+    results = db.relationship("QuestionResult", backref="question", lazy=True, cascade="all, delete-orphan")
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -172,6 +178,12 @@ class QuizAttempt(db.Model):
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
 
+    # Per-user lookups by quiz: best scores on the quiz list, attempt history
+    __table_args__ = (db.Index("ix_quiz_attempts_user_quiz", "user_id", "quiz_id"),)
+
+    # Relationships
+    results = db.relationship("QuestionResult", backref="attempt", lazy=True, cascade="all, delete-orphan")
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -187,6 +199,30 @@ class QuizAttempt(db.Model):
         }
 
 
+class QuestionResult(db.Model):
+    __tablename__ = "question_results"  # One row per question of a submitted attempt, written at submit
+
+    id = db.Column(db.Integer, primary_key=True)
+    attempt_id = db.Column(db.Integer, db.ForeignKey("quiz_attempts.id"), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey("questions.id"), nullable=False, index=True)
+    answer = db.Column(db.Text, nullable=True)  # As graded (trimmed)
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+    points_earned = db.Column(db.Integer, nullable=False, default=0)
+
+    # Doubles as the per-attempt index; question_id has its own for per-question reads
+    __table_args__ = (db.UniqueConstraint("attempt_id", "question_id", name="unique_attempt_question"),)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "attempt_id": self.attempt_id,
+            "question_id": self.question_id,
+            "answer": self.answer,
+            "is_correct": self.is_correct,
+            "points_earned": self.points_earned,
+        }
+
+
 class Note(db.Model):
     __tablename__ = "notes"
 
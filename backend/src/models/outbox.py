@@ -0,0 +1,32 @@
+from datetime import datetime
+from src.database import db
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'event_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    event = db.Column(db.String(50), nullable=False)  # 'quiz_submitted', 'resource_completed', 'note_created', 'activity_logged', ...
+    payload = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # Committed with the write that emitted it
+    
+    # Consumer state: processed_at is set in the same transaction as the event's effects
+    processed_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    last_error = db.Column(db.Text, nullable=True)  # Kept on events given up after too many attempts
+    
+    __table_args__ = (
+        db.Index('ix_event_outbox_pending', 'processed_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'event': self.event,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
+            'attempts': self.attempts,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,34 @@
+from datetime import datetime
+from src.database import db
+
+class ScheduledJobLease(db.Model):
+    __tablename__ = 'scheduled_job_leases'
+    
+    job_name = db.Column(db.String(100), primary_key=True)
+    
+    # Leader lock: the worker running the job and when its claim lapses if it dies mid-run
+    owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    
+    # Last run, shared by every worker
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_finished_at = db.Column(db.DateTime, nullable=True)
+    last_duration_ms = db.Column(db.Integer, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)  # 'success', 'failed'
+    last_error = db.Column(db.Text, nullable=True)
+    run_count = db.Column(db.Integer, default=0)
+    failure_count = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'job_name': self.job_name,
+            'owner': self.owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+            'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+            'last_duration_ms': self.last_duration_ms,
+            'last_status': self.last_status,
+            'last_error': self.last_error,
+            'run_count': self.run_count,
+            'failure_count': self.failure_count
+        }
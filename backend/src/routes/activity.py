@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
 from src.models.activity import UserActivity
 from src.database import db
+from src.services.activity_bitmap import ActivityBitmapService
+from src.services.event_outbox import EventOutbox
+from src.services.metrics_service import MetricsService
 from src.utils.auth_utils import token_required
 from datetime import datetime
 
@@ -19,9 +22,15 @@ def log_activity(current_user):
     new_activity = UserActivity(
         user_id=current_user.id,
         activity_type=activity_type,
-        activity_details=activity_details
+        details=activity_details,
+        timestamp=datetime.utcnow()
     )
     db.session.add(new_activity)
+    # Logging an activity makes it an active day (and adds the user to its engagement sketch)
+    ActivityBitmapService.mark_active(current_user.id, new_activity.timestamp)
+    MetricsService.record_activity(current_user.id, activity_type)
+    # Achievements are evaluated off the request path by the outbox consumer
+    EventOutbox.emit(current_user.id, "activity_logged", {"activity_type": activity_type})
     db.session.commit()
 
     return jsonify({"message": "Activity logged successfully", "activity": new_activity.to_dict()}), 201
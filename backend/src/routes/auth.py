@@ -3,6 +3,7 @@ from werkzeug.security import check_password_hash
 from src.models.user import User
 from src.database import db
 from src.utils.auth_utils import token_required
+from src.routes.analytics import warm_dashboard_cache
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -115,6 +116,9 @@ def login():
         # Generate token
         token = user.generate_token()
         
+        # The dashboard is the first page after login; start computing it now
+        warm_dashboard_cache(user.id)
+        
         return jsonify({
             'message': 'Login successful',
             'user': user.to_dict(),
@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify, current_app
 from src.models.user import User
 from src.database import db
-from src.models.gamification import Achievement, UserAchievement, UserLevel, Badge, UserBadge, Leaderboard
+from src.models.gamification import Achievement, UserAchievement, UserLevel, UserBadge
+from src.services.achievement_rules import AchievementEngine
+from src.services.catalog_cache import CatalogCache
 from src.services.gamification_service import GamificationService
+from src.services.leaderboard_index import LeaderboardIndex
 from src.utils.auth_utils import token_required
 from datetime import datetime, date, timedelta
 
 gamification_bp = Blueprint('gamification', __name__)
 
+MAX_LEADERBOARD_PAGE = 100  # Entries per leaderboard page
+MAX_CONTEXT_RADIUS = 50  # Entries above and below the user in context mode
+
 @gamification_bp.route('/gamification/profile', methods=['GET'])
 @token_required
 def get_user_gamification_profile(current_user):
@@ -24,6 +30,19 @@ def get_user_gamification_profile(current_user):
         current_app.logger.error(f"Error getting gamification profile: {str(e)}")
         return jsonify({'error': 'Failed to get gamification profile'}), 500
 
+@gamification_bp.route('/gamification/overview', methods=['GET'])
+@token_required
+def get_gamification_overview(current_user):
+    """Get every section of the gamification page in one request"""
+    try:
+        overview = GamificationService.get_overview(current_user.id)
+        
+        return jsonify(overview), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Error getting gamification overview: {str(e)}")
+        return jsonify({'error': 'Failed to get gamification overview'}), 500
+
 @gamification_bp.route('/gamification/achievements', methods=['GET'])
 @token_required
 def get_achievements(current_user):
@@ -31,36 +50,16 @@ def get_achievements(current_user):
     try:
         current_user_id = current_user.id
         
-        # Get all active achievements
-        achievements = Achievement.query.filter_by(is_active=True).all()
-        
         # Get user's earned achievements
         user_achievements = {
             ua.achievement_id: ua for ua in 
             UserAchievement.query.filter_by(user_id=current_user_id).all()
         }
         
-        achievement_list = []
-        for achievement in achievements:
-            achievement_dict = achievement.to_dict()
-            user_achievement = user_achievements.get(achievement.id)
-            
-            achievement_dict['earned'] = user_achievement is not None
-            achievement_dict['earned_at'] = user_achievement.earned_at.isoformat() if user_achievement else None
-            achievement_dict['progress'] = user_achievement.progress_value if user_achievement else 0
-            
-            # Calculate current progress for unearned achievements
-            if not achievement_dict['earned']:
-                progress = GamificationService._calculate_achievement_progress(current_user_id, achievement)
-                achievement_dict['progress'] = progress
-                achievement_dict['progress_percentage'] = min(100, (progress / achievement.condition_target) * 100)
-            else:
-                achievement_dict['progress_percentage'] = 100
-            
-            achievement_list.append(achievement_dict)
-        
-        # Sort by earned status and then by category
-        achievement_list.sort(key=lambda x: (not x['earned'], x['category'], x['name']))
+        # Active achievements come from the per-process catalog snapshot, progress from the user's counters row
+        achievement_list = GamificationService.achievement_list(
+            CatalogCache.get(), user_achievements, AchievementEngine.progress_values(current_user_id)
+        )
         
         return jsonify({
             'achievements': achievement_list
@@ -77,27 +76,13 @@ def get_badges(current_user):
     try:
         current_user_id = current_user.id
         
-        # Get all active badges
-        badges = Badge.query.filter_by(is_active=True).all()
-        
         # Get user's earned badges
         user_badges = {
             ub.badge_id: ub for ub in 
             UserBadge.query.filter_by(user_id=current_user_id).all()
         }
         
-        badge_list = []
-        for badge in badges:
-            badge_dict = badge.to_dict()
-            user_badge = user_badges.get(badge.id)
-            
-            badge_dict['earned'] = user_badge is not None
-            badge_dict['earned_at'] = user_badge.earned_at.isoformat() if user_badge else None
-            
-            badge_list.append(badge_dict)
-        
-        # Sort by earned status and then by category
-        badge_list.sort(key=lambda x: (not x['earned'], x['category'], x['name']))
+        badge_list = GamificationService.badge_list(CatalogCache.get(), user_badges)
         
         return jsonify({
             'badges': badge_list
@@ -123,40 +108,36 @@ def get_leaderboard(current_user, leaderboard_type, category):
             return jsonify({'error': 'Invalid category'}), 400
         
         current_user_id = current_user.id
-        limit = request.args.get('limit', 50, type=int)
-        
-        # Get current period dates
-        today = date.today()
-        if leaderboard_type == 'weekly':
-            period_start = today - timedelta(days=today.weekday())
-        elif leaderboard_type == 'monthly':
-            period_start = today.replace(day=1)
-        else:  # all_time
-            period_start = date(2024, 1, 1)
         
-        # Get leaderboard entries
-        leaderboard_entries = Leaderboard.query.filter_by(
-            leaderboard_type=leaderboard_type,
-            category=category,
-            period_start=period_start
-        ).order_by(Leaderboard.rank.asc()).limit(limit).all()
-        
-        # Get current user's position
-        user_position = Leaderboard.query.filter_by(
-            user_id=current_user_id,
-            leaderboard_type=leaderboard_type,
-            category=category,
-            period_start=period_start
-        ).first()
+        # Ranks come from the in-memory leaderboard index, so every user has one and any page is O(log n + page)
+        if request.args.get('mode') == 'context':
+            radius = request.args.get('radius', 5, type=int)
+            if not 1 <= radius <= MAX_CONTEXT_RADIUS:
+                return jsonify({'error': f'radius must be between 1 and {MAX_CONTEXT_RADIUS}'}), 400
+            
+            leaderboard = GamificationService.get_leaderboard_context(
+                leaderboard_type, category, current_user_id, radius
+            )
+        elif 'from_rank' in request.args or 'to_rank' in request.args:
+            from_rank = request.args.get('from_rank', 1, type=int)
+            to_rank = request.args.get('to_rank', type=int)
+            if to_rank is None:
+                to_rank = from_rank + 49
+            if from_rank < 1 or to_rank < from_rank:
+                return jsonify({'error': 'Invalid rank range'}), 400
+            if to_rank - from_rank + 1 > MAX_LEADERBOARD_PAGE:
+                return jsonify({'error': f'At most {MAX_LEADERBOARD_PAGE} ranks per page'}), 400
+            
+            leaderboard = GamificationService.get_leaderboard_range(
+                leaderboard_type, category, current_user_id, from_rank, to_rank
+            )
+        else:
+            limit = request.args.get('limit', 50, type=int)
+            leaderboard = GamificationService.get_leaderboard(
+                leaderboard_type, category, current_user_id, min(max(limit, 1), MAX_LEADERBOARD_PAGE)
+            )
         
-        return jsonify({
-            'leaderboard': [entry.to_dict() for entry in leaderboard_entries],
-            'user_position': user_position.to_dict() if user_position else None,
-            'leaderboard_type': leaderboard_type,
-            'category': category,
-            'period_start': period_start.isoformat(),
-            'total_entries': len(leaderboard_entries)
-        }), 200
+        return jsonify(leaderboard), 200
         
     except Exception as e:
         current_app.logger.error(f"Error getting leaderboard: {str(e)}")
@@ -173,23 +154,7 @@ def get_level_progress(current_user):
         if not user_level:
             user_level = GamificationService.initialize_user_level(current_user_id)
         
-        # Calculate progress to next level
-        current_level_points = GamificationService._calculate_points_for_level(user_level.current_level)
-        next_level_points = GamificationService._calculate_points_for_level(user_level.current_level + 1)
-        progress_in_level = user_level.total_points - current_level_points
-        points_needed_for_level = next_level_points - current_level_points
-        progress_percentage = (progress_in_level / points_needed_for_level) * 100
-        
-        return jsonify({
-            'level_info': user_level.to_dict(),
-            'progress': {
-                'current_level_points': current_level_points,
-                'next_level_points': next_level_points,
-                'progress_in_level': progress_in_level,
-                'points_needed_for_level': points_needed_for_level,
-                'progress_percentage': progress_percentage
-            }
-        }), 200
+        return jsonify(GamificationService.level_progress(user_level)), 200
         
     except Exception as e:
         current_app.logger.error(f"Error getting level progress: {str(e)}")
@@ -239,98 +204,17 @@ def get_gamification_stats(current_user):
         
         # Count achievements and badges
         achievements_count = UserAchievement.query.filter_by(user_id=current_user_id).count()
-        total_achievements = Achievement.query.filter_by(is_active=True).count()
-        
         badges_count = UserBadge.query.filter_by(user_id=current_user_id).count()
-        total_badges = Badge.query.filter_by(is_active=True).count()
         
         # Get leaderboard positions
-        leaderboard_positions = {}
-        for lb_type in ['weekly', 'monthly', 'all_time']:
-            for category in ['points', 'quizzes', 'streak']:
-                today = date.today()
-                if lb_type == 'weekly':
-                    period_start = today - timedelta(days=today.weekday())
-                elif lb_type == 'monthly':
-                    period_start = today.replace(day=1)
-                else:
-                    period_start = date(2024, 1, 1)
-                
-                entry = Leaderboard.query.filter_by(
-                    user_id=current_user_id,
-                    leaderboard_type=lb_type,
-                    category=category,
-                    period_start=period_start
-                ).first()
-                
-                if entry:
-                    leaderboard_positions[f"{lb_type}_{category}"] = entry.rank
+        leaderboard_positions = LeaderboardIndex.positions(current_user_id)
         
         return jsonify({
-            'stats': {
-                'level': user_level.current_level,
-                'total_points': user_level.total_points,
-                'achievements_earned': achievements_count,
-                'total_achievements': total_achievements,
-                'achievement_completion_rate': (achievements_count / total_achievements * 100) if total_achievements > 0 else 0,
-                'badges_earned': badges_count,
-                'total_badges': total_badges,
-                'badge_completion_rate': (badges_count / total_badges * 100) if total_badges > 0 else 0,
-                'current_streak': user_level.current_learning_streak,
-                'longest_streak': user_level.longest_learning_streak,
-                'leaderboard_positions': leaderboard_positions
-            }
+            'stats': GamificationService.stats_summary(
+                user_level, CatalogCache.get(), achievements_count, badges_count, leaderboard_positions
+            )
         }), 200
         
     except Exception as e:
         current_app.logger.error(f"Error getting gamification stats: {str(e)}")
         return jsonify({'error': 'Failed to get gamification stats'}), 500
-
-# Helper function for calculating achievement progress
-def _calculate_achievement_progress(user_id, achievement):
-    """Calculate current progress towards an achievement"""
-    condition_type = achievement.condition_type
-    condition_resource = achievement.condition_resource
-    
-    if condition_type == 'count':
-        if condition_resource == 'learning_paths_completed':
-            from src.models.activity import UserActivity
-            return db.session.query(UserActivity).filter_by(
-                user_id=user_id,
-                activity_type='learning_path_completed'
-            ).count()
-        elif condition_resource == 'quizzes_completed':
-            from src.models.learning import QuizAttempt
-            return QuizAttempt.query.filter_by(user_id=user_id).count()
-        elif condition_resource == 'resources_viewed':
-            from src.models.activity import UserActivity
-            return db.session.query(UserActivity).filter_by(
-                user_id=user_id,
-                activity_type='resource_viewed'
-            ).count()
-        elif condition_resource == 'notes_created':
-            from src.models.learning import Note
-            return Note.query.filter_by(user_id=user_id).count()
-    
-    elif condition_type == 'streak':
-        user_level = UserLevel.query.filter_by(user_id=user_id).first()
-        if user_level and condition_resource == 'learning_streak':
-            return user_level.current_learning_streak
-    
-    elif condition_type == 'score':
-        if condition_resource == 'average_quiz_score':
-            from src.models.learning import QuizAttempt
-            attempts = QuizAttempt.query.filter_by(user_id=user_id).all()
-            if attempts:
-                return sum(attempt.percentage for attempt in attempts) / len(attempts)
-    
-    elif condition_type == 'time':
-        user_level = UserLevel.query.filter_by(user_id=user_id).first()
-        if user_level and condition_resource == 'total_points':
-            return user_level.total_points
-    
-    return 0
-
-# Add the helper function to GamificationService
-GamificationService._calculate_achievement_progress = staticmethod(_calculate_achievement_progress)
-
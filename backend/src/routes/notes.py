@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from src.models.learning import Note, Resource, LearningPath, Topic
 from src.database import db
+from src.services.event_outbox import EventOutbox
+from src.services.metrics_service import MetricsService
 from src.utils.auth_utils import token_required
 from sqlalchemy import or_
 
@@ -104,6 +106,8 @@ def create_note(current_user):
         )
         
         db.session.add(note)
+        MetricsService.record_note(current_user.id)
+        EventOutbox.emit(current_user.id, "note_created")
         db.session.commit()
         
         return jsonify({
@@ -189,6 +193,8 @@ def delete_note(current_user, note_id):
             return jsonify({"error": "Note not found"}), 404
         
         db.session.delete(note)
+        MetricsService.record_note(current_user.id, -1)
+        EventOutbox.emit(current_user.id, "note_deleted", {"note_id": note.id})
         db.session.commit()
         
         return jsonify({"message": "Note deleted successfully"}), 200
@@ -1,10 +1,19 @@
 from flask import Blueprint, request, jsonify
 from src.models.learning import Quiz, Question, QuizAttempt, Topic, LearningPath
 from src.database import db
+from src.services.activity_bitmap import ActivityBitmapService
+from src.services.answer_keys import AnswerKeyCache, grade
+from src.services.event_outbox import EventOutbox
+from src.services.item_stats import ItemStatsService
+from src.services.metrics_service import MetricsService
+from src.services.percentile_service import PercentileService
+from src.services.question_results import QuestionResultService
+from src.services.stats_service import StatsService
 from src.utils.auth_utils import token_required
 from datetime import datetime
 import random
-from sqlalchemy import or_
+from sqlalchemy import func, or_
+from sqlalchemy.orm import noload
 
 quiz_bp = Blueprint("quiz", __name__)
 
@@ -21,11 +30,34 @@ def get_quizzes(current_user):
         difficulty = request.args.get("difficulty", "")
         search_query = request.args.get("search_query", "")
 
-        # Build query - only quizzes from user's learning paths
+        # User's best completed score per quiz
+        best_scores = (
+            db.session.query(QuizAttempt.quiz_id, func.max(QuizAttempt.percentage).label("best_score"))
+            .filter(QuizAttempt.user_id == current_user.id, QuizAttempt.completed_at.isnot(None))
+            .group_by(QuizAttempt.quiz_id)
+            .subquery()
+        )
+        # Evaluated only for the quizzes on the page
+        questions_count = (
+            db.session.query(func.count(Question.id))
+            .filter(Question.quiz_id == Quiz.id)
+            .correlate(Quiz)
+            .scalar_subquery()
+        )
+
+        # Build query - only quizzes from user's learning paths, with everything the list shows in one row
         query = (
-            db.session.query(Quiz)
-            .join(Topic)
-            .join(LearningPath)
+            db.session.query(
+                Quiz,
+                Topic.title,
+                LearningPath.title,
+                best_scores.c.best_score,
+                questions_count,
+            )
+            .join(Topic, Quiz.topic_id == Topic.id)
+            .join(LearningPath, Topic.learning_path_id == LearningPath.id)
+            .outerjoin(best_scores, best_scores.c.quiz_id == Quiz.id)
+            .options(noload(Quiz.questions))
             .filter(LearningPath.user_id == current_user.id, Quiz.is_active == True)
         )
 
@@ -45,22 +77,15 @@ def get_quizzes(current_user):
         quizzes = query.paginate(page=page, per_page=per_page, error_out=False)
 
         quiz_list = []
-        for quiz in quizzes.items:
+        for quiz, topic_title, learning_path_title, best_score, questions_count in quizzes.items:
             quiz_data = quiz.to_dict()
+            # Questions are counted in the page query rather than loaded
+            quiz_data["questions_count"] = questions_count
             # Add topic and learning path info
-            quiz_data["topic_title"] = quiz.topic.title
-            quiz_data["learning_path_title"] = quiz.topic.learning_path.title
+            quiz_data["topic_title"] = topic_title
+            quiz_data["learning_path_title"] = learning_path_title
             # Add user's best attempt
-            best_attempt = (
-                QuizAttempt.query.filter(
-                    QuizAttempt.user_id == current_user.id,
-                    QuizAttempt.quiz_id == quiz.id,
-                    QuizAttempt.completed_at.isnot(None),
-                )
-                .order_by(QuizAttempt.percentage.desc())
-                .first()
-            )
-            quiz_data["best_score"] = best_attempt.percentage if best_attempt else None
+            quiz_data["best_score"] = best_score
             quiz_list.append(quiz_data)
 
         return (
@@ -228,6 +253,29 @@ def add_question_to_quiz(current_user, quiz_id):
         return jsonify({"error": str(e)}), 500
 
 
+@quiz_bp.route("/quizzes/<int:quiz_id>/item-analysis", methods=["GET"])
+@token_required
+def get_quiz_item_analysis(current_user, quiz_id):
+    """Get difficulty and discrimination statistics for each question of a quiz"""
+    try:
+        # Verify quiz belongs to user
+        quiz = (
+            db.session.query(Quiz.id)
+            .join(Topic)
+            .join(LearningPath)
+            .filter(Quiz.id == quiz_id, LearningPath.user_id == current_user.id)
+            .first()
+        )
+
+        if not quiz:
+            return jsonify({"error": "Quiz not found or access denied"}), 404
+
+        return jsonify({"item_analysis": ItemStatsService.item_analysis(quiz_id)}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @quiz_bp.route("/quizzes/<int:quiz_id>/start", methods=["POST"])
 @token_required
 def start_quiz_attempt(current_user, quiz_id):
@@ -306,41 +354,22 @@ def submit_quiz_attempt(current_user, attempt_id):
         if not answers:
             return jsonify({"error": "No answers provided"}), 400
 
-        # Get quiz questions
-        questions = Question.query.filter(Question.quiz_id == attempt.quiz_id).all()
-
-        # Calculate score
-        total_points = 0
-        earned_points = 0
-        detailed_results = []
-
-        for question in questions:
-            total_points += question.points
-            user_answer = answers.get(str(question.id), "").strip()
-            is_correct = False
-
-            # Check answer based on question type
-            if question.question_type == "multiple_choice":
-                is_correct = user_answer.lower() == question.correct_answer.lower()
-            elif question.question_type == "true_false":
-                is_correct = user_answer.lower() == question.correct_answer.lower()
-            elif question.question_type == "short_answer":
-                # Simple string comparison (could be enhanced with fuzzy matching)
-                is_correct = user_answer.lower().strip() == question.correct_answer.lower().strip()
-
-            if is_correct:
-                earned_points += question.points
-
-            detailed_results.append(
-                {
-                    "question_id": question.id,
-                    "user_answer": user_answer,
-                    "correct_answer": question.correct_answer,
-                    "is_correct": is_correct,
-                    "points_earned": question.points if is_correct else 0,
-                    "explanation": question.explanation,
-                }
-            )
+        # Grade against the quiz's compiled answer key
+        answer_key = AnswerKeyCache.get(attempt.quiz_id)
+        total_points = answer_key.total_points
+        earned_points, graded = grade(answer_key, answers)
+
+        detailed_results = [
+            {
+                "question_id": result.question.id,
+                "user_answer": result.user_answer,
+                "correct_answer": result.question.correct_answer,
+                "is_correct": result.is_correct,
+                "points_earned": result.points_earned,
+                "explanation": result.question.explanation,
+            }
+            for result in graded
+        ]
 
         # Calculate percentage
         percentage = (earned_points / total_points * 100) if total_points > 0 else 0
@@ -356,6 +385,17 @@ def submit_quiz_attempt(current_user, attempt_id):
         attempt.answers = answers
         attempt.completed_at = datetime.utcnow()
 
+        QuestionResultService.record(attempt.id, graded)
+        ItemStatsService.record_attempt(
+            attempt.quiz_id, graded, earned_points, total_points,
+            (attempt.completed_at - attempt.started_at).total_seconds()
+        )
+        StatsService.record_quiz_submitted(current_user.id, percentage, attempt.completed_at)
+        MetricsService.record_quiz_submitted(current_user.id, percentage)
+        ActivityBitmapService.mark_active(current_user.id, attempt.completed_at)
+        peer_percentiles = PercentileService.record_score(attempt.quiz_id, percentage)
+        EventOutbox.emit(current_user.id, "quiz_submitted", {"attempt_id": attempt.id, "quiz_id": attempt.quiz_id})
+
         db.session.commit()
 
         return (
@@ -369,6 +409,7 @@ def submit_quiz_attempt(current_user, attempt_id):
                         "percentage": percentage,
                         "time_taken_minutes": int(time_taken),
                         "detailed_results": detailed_results,
+                        "peer_percentiles": peer_percentiles,
                     },
                 }
             ),
@@ -380,6 +421,39 @@ def submit_quiz_attempt(current_user, attempt_id):
         return jsonify({"error": str(e)}), 500
 
 
+@quiz_bp.route("/quiz-attempts/<int:attempt_id>/percentile", methods=["GET"])
+@token_required
+def get_quiz_attempt_percentile(current_user, attempt_id):
+    """Get where an attempt's score falls among all attempts at the quiz and in its subject"""
+    try:
+        attempt = QuizAttempt.query.filter(
+            QuizAttempt.id == attempt_id, QuizAttempt.user_id == current_user.id
+        ).first()
+
+        if not attempt:
+            return jsonify({"error": "Quiz attempt not found"}), 404
+
+        if not attempt.completed_at:
+            return jsonify({"error": "Quiz attempt not completed yet"}), 400
+
+        percentiles = PercentileService.get_percentiles(attempt.quiz_id, attempt.percentage or 0)
+
+        return (
+            jsonify(
+                {
+                    "attempt_id": attempt.id,
+                    "quiz_id": attempt.quiz_id,
+                    "percentage": attempt.percentage,
+                    "percentiles": percentiles,
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @quiz_bp.route("/quiz-attempts", methods=["GET"])
 @token_required
 def get_quiz_attempts(current_user):
@@ -426,6 +500,25 @@ def get_quiz_attempts(current_user):
         return jsonify({"error": str(e)}), 500
 
 
+@quiz_bp.route("/quizzes/missed-questions", methods=["GET"])
+@token_required
+def get_missed_questions(current_user):
+    """Get the questions the user usually gets wrong"""
+    try:
+        limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+        min_attempts = max(request.args.get("min_attempts", 2, type=int), 1)
+        quiz_id = request.args.get("quiz_id", type=int)
+
+        questions = QuestionResultService.usually_missed(
+            current_user.id, min_attempts=min_attempts, limit=limit, quiz_id=quiz_id
+        )
+
+        return jsonify({"questions": questions}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @quiz_bp.route("/quiz-attempts/<int:attempt_id>", methods=["GET"])
 @token_required
 def get_quiz_attempt_details(current_user, attempt_id):
@@ -441,33 +534,38 @@ def get_quiz_attempt_details(current_user, attempt_id):
         if not attempt.completed_at:
             return jsonify({"error": "Quiz attempt not completed yet"}), 400
 
-        # Get quiz and questions
-        quiz = Quiz.query.get(attempt.quiz_id)
-        questions = Question.query.filter(Question.quiz_id == attempt.quiz_id).order_by(Question.order_index).all()
+        # Question payloads come from the quiz's cached answer key, outcomes from the stored results
+        quiz = Quiz.query.options(noload(Quiz.questions)).get(attempt.quiz_id)
+        answer_key = AnswerKeyCache.get(quiz.id, quiz.version)
+        results = QuestionResultService.for_attempt(attempt.id)
 
-        # Build detailed results
-        detailed_results = []
-        for question in questions:
-            user_answer = attempt.answers.get(str(question.id), "") if attempt.answers else ""
-            is_correct = False
-
-            # Check if answer is correct
-            if question.question_type == "multiple_choice":
-                is_correct = user_answer.lower() == question.correct_answer.lower()
-            elif question.question_type == "true_false":
-                is_correct = user_answer.lower() == question.correct_answer.lower()
-            elif question.question_type == "short_answer":
-                is_correct = user_answer.lower().strip() == question.correct_answer.lower().strip()
-
-            detailed_results.append(
-                {"question": question.to_dict(), "user_answer": user_answer, "is_correct": is_correct}
-            )
+        if results:
+            detailed_results = [
+                {
+                    "question": dict(question.data),
+                    "user_answer": results[question.id].answer,
+                    "is_correct": results[question.id].is_correct,
+                }
+                for question in answer_key.questions
+                if question.id in results
+            ]
+        else:
+            # Submitted before per-question results were stored and not backfilled yet: grade once and keep them
+            _, graded = grade(answer_key, attempt.answers)
+            QuestionResultService.record(attempt.id, graded)
+            db.session.commit()
+            detailed_results = [
+                {"question": dict(result.question.data), "user_answer": result.user_answer, "is_correct": result.is_correct}
+                for result in graded
+            ]
 
         attempt_data = attempt.to_dict()
         attempt_data["quiz"] = quiz.to_dict()
+        attempt_data["quiz"]["questions_count"] = len(answer_key.questions)
         attempt_data["detailed_results"] = detailed_results
 
         return jsonify({"attempt": attempt_data}), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -1,11 +1,23 @@
 from flask import Blueprint, request, jsonify
 from src.models.learning import Resource, Topic, LearningPath
 from src.database import db
+from src.services.activity_bitmap import ActivityBitmapService
+from src.services.event_outbox import EventOutbox
+from src.services.stats_service import StatsService
 from src.utils.auth_utils import token_required
 from sqlalchemy import or_
+from datetime import datetime
 
 resource_bp = Blueprint("resource", __name__)
 
+
+def _rollup_state(resource):
+    """What the resource contributes to user_daily_stats: (minutes, completion time), or None"""
+    if not resource.is_completed:
+        return None
+    return resource.duration_minutes, resource.completed_at or resource.created_at
+
+
 @resource_bp.route("/resources", methods=["GET"])
 @token_required
 def get_resources(current_user):
@@ -165,6 +177,7 @@ def update_resource(current_user, resource_id):
             return jsonify({"error": "Resource not found or access denied"}), 404
         
         data = request.get_json()
+        counted_before = _rollup_state(resource)
         
         # Update fields if provided
         if "title" in data:
@@ -189,7 +202,16 @@ def update_resource(current_user, resource_id):
             if data["difficulty_level"] in ["beginner", "intermediate", "advanced"]:
                 resource.difficulty_level = data["difficulty_level"]
         if "is_completed" in data:
-            resource.is_completed = bool(data["is_completed"])
+            is_completed = bool(data["is_completed"])
+            if is_completed != bool(resource.is_completed):
+                resource.is_completed = is_completed
+                resource.completed_at = datetime.utcnow() if is_completed else None
+                if is_completed:
+                    ActivityBitmapService.mark_active(current_user.id, resource.completed_at)
+                    EventOutbox.emit(current_user.id, "resource_completed", {"resource_id": resource.id})
+
+        # Keep the daily rollup in step (completion or duration changes); it is committed together with the resource
+        StatsService.record_resource_change(current_user.id, counted_before, _rollup_state(resource))
         
         db.session.commit()
         
@@ -215,6 +237,7 @@ def delete_resource(current_user, resource_id):
         if not resource:
             return jsonify({"error": "Resource not found or access denied"}), 404
         
+        StatsService.record_resource_change(current_user.id, before=_rollup_state(resource))
         db.session.delete(resource)
         db.session.commit()
         
@@ -0,0 +1,379 @@
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import func, insert, select
+from src.database import db
+from src.models.activity import UserActivity
+from src.models.analytics import UserMetrics
+from src.models.gamification import UserAchievement, UserLevel, UserBadge
+from src.models.learning import QuizAttempt, Note
+from src.models.user import User
+from src.services.catalog_cache import CatalogCache
+from src.services.metrics_service import MetricsService
+
+# Metric key -> function(user_id, user_level) returning the current value (None if undefined)
+METRICS = {}
+# Event name -> metric keys the event can change
+EVENT_INDEX = defaultdict(set)
+# Metric key -> function(first_user_id, last_user_id) returning a SELECT of (user_id, value)
+METRIC_QUERIES = {}
+# Metric key -> function(user_metrics, user_level) reading the value from the maintained counters
+METRIC_COUNTERS = {}
+
+
+def metric(key, events=()):
+    """Register a rule metric and the events that can change it.
+
+    Achievements are keyed by (condition_type, condition_resource) and
+    badges by ('badge', condition_type); a new rule type only needs a
+    decorated function here, plus a metric_query for catalog backfills
+    and a metric_counter for progress displays.
+    """
+    def register(compute):
+        METRICS[key] = compute
+        for event in events:
+            EVENT_INDEX[event].add(key)
+        return compute
+    return register
+
+
+def metric_query(key):
+    """Register the set-based form of a metric, used to backfill rules for all users"""
+    def register(build):
+        METRIC_QUERIES[key] = build
+        return build
+    return register
+
+
+def metric_counter(key):
+    """Register how progress displays read a metric from the user's user_metrics row"""
+    def register(read):
+        METRIC_COUNTERS[key] = read
+        return read
+    return register
+
+
+def badge_key(badge):
+    return ('badge', badge.condition_type)
+
+
+def achievement_key(achievement):
+    return (achievement.condition_type, achievement.condition_resource)
+
+
+def _activity_count(user_id, activity_type):
+    return db.session.query(func.count(UserActivity.id)).filter(
+        UserActivity.user_id == user_id,
+        UserActivity.activity_type == activity_type
+    ).scalar()
+
+
+@metric(('count', 'learning_paths_completed'), events=('learning_path_completed',))
+def learning_paths_completed(user_id, user_level):
+    return _activity_count(user_id, 'learning_path_completed')
+
+
+@metric(('count', 'resources_viewed'), events=('resource_viewed',))
+def resources_viewed(user_id, user_level):
+    return _activity_count(user_id, 'resource_viewed')
+
+
+@metric(('count', 'quizzes_completed'), events=('quiz_submitted',))
+def quizzes_completed(user_id, user_level):
+    return QuizAttempt.query.filter(
+        QuizAttempt.user_id == user_id,
+        QuizAttempt.completed_at.isnot(None)
+    ).count()
+
+
+@metric(('score', 'average_quiz_score'), events=('quiz_submitted',))
+def average_quiz_score(user_id, user_level):
+    return db.session.query(func.avg(QuizAttempt.percentage)).filter(
+        QuizAttempt.user_id == user_id,
+        QuizAttempt.completed_at.isnot(None)
+    ).scalar()
+
+
+@metric(('count', 'notes_created'), events=('note_created', 'note_deleted'))
+def notes_created(user_id, user_level):
+    return Note.query.filter_by(user_id=user_id).count()
+
+
+@metric(('streak', 'learning_streak'), events=('streak_updated',))
+def learning_streak(user_id, user_level):
+    return user_level.current_learning_streak
+
+
+@metric(('time', 'total_points'), events=('points_awarded',))
+def total_points(user_id, user_level):
+    return user_level.total_points
+
+
+@metric(('badge', 'level'), events=('points_awarded',))
+def badge_level(user_id, user_level):
+    return user_level.current_level
+
+
+@metric(('badge', 'points'), events=('points_awarded',))
+def badge_points(user_id, user_level):
+    return user_level.total_points
+
+
+@metric(('badge', 'achievements'), events=('achievement_earned',))
+def badge_achievements(user_id, user_level):
+    return UserAchievement.query.filter_by(user_id=user_id).count()
+
+
+def _grouped_count(column, user_column, first_user_id, last_user_id, *conditions):
+    return select(user_column.label('user_id'), func.count(column).label('value')).where(
+        user_column.between(first_user_id, last_user_id), *conditions
+    ).group_by(user_column)
+
+
+def _level_column(column, first_user_id, last_user_id):
+    return select(UserLevel.user_id.label('user_id'), column.label('value')).where(
+        UserLevel.user_id.between(first_user_id, last_user_id)
+    )
+
+
+@metric_query(('count', 'learning_paths_completed'))
+def learning_paths_completed_query(first_user_id, last_user_id):
+    return _grouped_count(UserActivity.id, UserActivity.user_id, first_user_id, last_user_id,
+                          UserActivity.activity_type == 'learning_path_completed')
+
+
+@metric_query(('count', 'resources_viewed'))
+def resources_viewed_query(first_user_id, last_user_id):
+    return _grouped_count(UserActivity.id, UserActivity.user_id, first_user_id, last_user_id,
+                          UserActivity.activity_type == 'resource_viewed')
+
+
+@metric_query(('count', 'quizzes_completed'))
+def quizzes_completed_query(first_user_id, last_user_id):
+    return _grouped_count(QuizAttempt.id, QuizAttempt.user_id, first_user_id, last_user_id,
+                          QuizAttempt.completed_at.isnot(None))
+
+
+@metric_query(('score', 'average_quiz_score'))
+def average_quiz_score_query(first_user_id, last_user_id):
+    return select(QuizAttempt.user_id.label('user_id'), func.avg(QuizAttempt.percentage).label('value')).where(
+        QuizAttempt.user_id.between(first_user_id, last_user_id),
+        QuizAttempt.completed_at.isnot(None)
+    ).group_by(QuizAttempt.user_id)
+
+
+@metric_query(('count', 'notes_created'))
+def notes_created_query(first_user_id, last_user_id):
+    return _grouped_count(Note.id, Note.user_id, first_user_id, last_user_id)
+
+
+@metric_query(('streak', 'learning_streak'))
+def learning_streak_query(first_user_id, last_user_id):
+    return _level_column(UserLevel.current_learning_streak, first_user_id, last_user_id)
+
+
+@metric_query(('time', 'total_points'))
+def total_points_query(first_user_id, last_user_id):
+    return _level_column(UserLevel.total_points, first_user_id, last_user_id)
+
+
+@metric_query(('badge', 'level'))
+def badge_level_query(first_user_id, last_user_id):
+    return _level_column(UserLevel.current_level, first_user_id, last_user_id)
+
+
+@metric_query(('badge', 'points'))
+def badge_points_query(first_user_id, last_user_id):
+    return _level_column(UserLevel.total_points, first_user_id, last_user_id)
+
+
+@metric_query(('badge', 'achievements'))
+def badge_achievements_query(first_user_id, last_user_id):
+    return _grouped_count(UserAchievement.id, UserAchievement.user_id, first_user_id, last_user_id)
+
+
+@metric_counter(('count', 'learning_paths_completed'))
+def learning_paths_completed_counter(counters, user_level):
+    return counters.paths_completed
+
+
+@metric_counter(('count', 'resources_viewed'))
+def resources_viewed_counter(counters, user_level):
+    return counters.resources_viewed
+
+
+@metric_counter(('count', 'quizzes_completed'))
+def quizzes_completed_counter(counters, user_level):
+    return counters.quizzes_completed
+
+
+@metric_counter(('score', 'average_quiz_score'))
+def average_quiz_score_counter(counters, user_level):
+    if not counters.quizzes_completed:
+        return None
+    return counters.quiz_score_sum / counters.quizzes_completed
+
+
+@metric_counter(('count', 'notes_created'))
+def notes_created_counter(counters, user_level):
+    return counters.notes_created
+
+
+@metric_counter(('streak', 'learning_streak'))
+def learning_streak_counter(counters, user_level):
+    return user_level.current_learning_streak
+
+
+@metric_counter(('time', 'total_points'))
+def total_points_counter(counters, user_level):
+    return user_level.total_points
+
+
+@metric_counter(('badge', 'level'))
+def badge_level_counter(counters, user_level):
+    return user_level.current_level
+
+
+@metric_counter(('badge', 'points'))
+def badge_points_counter(counters, user_level):
+    return user_level.total_points
+
+
+@metric_counter(('badge', 'achievements'))
+def badge_achievements_counter(counters, user_level):
+    return counters.achievements_earned
+
+
+class AchievementEngine:
+    """Evaluates only the achievement and badge rules an event can affect.
+
+    Awards cascade: points from new achievements raise 'points_awarded' and
+    new achievements raise 'achievement_earned', which are evaluated in the
+    same call. Everything is committed once at the end. Candidate rules
+    come from the cached catalog snapshot, so only the user's earned ids
+    are queried.
+    """
+
+    @staticmethod
+    def _user_level(user_id):
+        """The user's level row, created if missing without committing (evaluate commits once at the end)"""
+        from src.services.gamification_service import GamificationService
+        return GamificationService._ensure_user_level(user_id)
+
+    @staticmethod
+    def handle_event(user_id, event):
+        """Evaluate the rules affected by an event; failures are logged, not raised"""
+        keys = EVENT_INDEX.get(event)
+        if not keys:
+            return {'achievements': [], 'badges': []}
+
+        try:
+            return AchievementEngine.evaluate(user_id, keys)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Achievement evaluation for {event} failed for user {user_id}: {str(e)}")
+            return {'achievements': [], 'badges': []}
+
+    @staticmethod
+    def evaluate(user_id, keys=None, commit=True):
+        """Award every unearned achievement and badge whose metric is in keys (default: all).
+
+        commit=False leaves the awards in the caller's transaction.
+        """
+        from src.services.gamification_service import GamificationService
+
+        user_level = AchievementEngine._user_level(user_id)
+        catalog = CatalogCache.get()
+        keys = set(METRICS) if keys is None else set(keys)
+        earned_achievements = []
+        earned_badges = []
+
+        while keys:
+            values = {key: METRICS[key](user_id, user_level) for key in keys if key in METRICS}
+            next_events = set()
+
+            achievement_keys = [key for key in values if key[0] != 'badge']
+            if achievement_keys:
+                earned_ids = set(db.session.execute(
+                    select(UserAchievement.achievement_id).where(UserAchievement.user_id == user_id)
+                ).scalars())
+                candidates = [
+                    achievement
+                    for key in achievement_keys
+                    for achievement in catalog.achievements_by_key.get(key, ())
+                    if achievement.id not in earned_ids
+                ]
+
+                rows = []
+                points = 0
+                for achievement in candidates:
+                    value = values[achievement_key(achievement)]
+                    if value is not None and value >= achievement.condition_target:
+                        rows.append({'user_id': user_id, 'achievement_id': achievement.id, 'progress_value': value})
+                        points += achievement.points or 0
+                        earned_achievements.append(achievement)
+
+                if rows:
+                    db.session.execute(insert(UserAchievement), rows)
+                    MetricsService.record_achievements(user_id, len(rows))
+                    next_events.add('achievement_earned')
+                if points:
+                    # Refreshes user_level in place from the UPDATE's RETURNING row
+                    GamificationService._add_points(user_id, {'achievement': points})
+                    next_events.add('points_awarded')
+
+            badge_types = [key[1] for key in values if key[0] == 'badge']
+            if badge_types:
+                earned_ids = set(db.session.execute(
+                    select(UserBadge.badge_id).where(UserBadge.user_id == user_id)
+                ).scalars())
+                candidates = [
+                    badge
+                    for badge_type in badge_types
+                    for badge in catalog.badges_by_type.get(badge_type, ())
+                    if badge.id not in earned_ids
+                ]
+
+                rows = []
+                for badge in candidates:
+                    value = values[badge_key(badge)]
+                    if value is not None and value >= badge.condition_value:
+                        rows.append({'user_id': user_id, 'badge_id': badge.id})
+                        earned_badges.append(badge)
+                if rows:
+                    db.session.execute(insert(UserBadge), rows)
+
+            keys = set().union(*(EVENT_INDEX[event] for event in next_events)) if next_events else set()
+
+        if commit:
+            db.session.commit()
+        return {'achievements': earned_achievements, 'badges': earned_badges}
+
+    @staticmethod
+    def progress_state(user_id):
+        """The user's (user_metrics row or None, user level), read in one query"""
+        counters, user_level = db.session.query(UserMetrics, UserLevel).select_from(User).outerjoin(
+            UserMetrics, UserMetrics.user_id == User.id
+        ).outerjoin(
+            UserLevel, UserLevel.user_id == User.id
+        ).filter(User.id == user_id).first() or (None, None)
+        if user_level is None:
+            from src.services.gamification_service import GamificationService
+            user_level = GamificationService.initialize_user_level(user_id)
+        return counters, user_level
+
+    @staticmethod
+    def progress_values(user_id, state=None):
+        """Every metric's current value for progress displays, from one read of the user's counters"""
+        counters, user_level = state or AchievementEngine.progress_state(user_id)
+
+        if counters is None or counters.reconciled_at is None:
+            # No counters yet, or a row holding only the increments since it was created:
+            # count from the source tables, then reconcile the row so later reads can use it
+            values = {key: compute(user_id, user_level) for key, compute in METRICS.items()}
+            try:
+                MetricsService.reconcile(user_id)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"Reconciling user_metrics failed for user {user_id}: {str(e)}")
+            return values
+        return {key: read(counters, user_level) for key, read in METRIC_COUNTERS.items()}
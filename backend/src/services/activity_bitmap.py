@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, union
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.activity import UserActivity
+from src.models.analytics import UserActivityBitmap, UserDailyStats, ACTIVITY_EPOCH
+from src.models.gamification import UserLevel
+from src.services.engagement_service import EngagementService
+from src.services.stats_service import _as_date
+
+
+class ActivityBitmapService:
+    """One bit per user per day recording whether the user was active.
+
+    The bitmap is the single source for learning streaks and the activity
+    heatmap; all queries are bit operations on one small blob.
+    """
+
+    @staticmethod
+    def _today():
+        return datetime.utcnow().date()
+
+    @staticmethod
+    def _offset(day):
+        return (day - ACTIVITY_EPOCH).days
+
+    @staticmethod
+    def mark_active(user_id, day=None):
+        """Set the user's bit for `day` (default today); the caller commits"""
+        day = day or ActivityBitmapService._today()
+        if isinstance(day, datetime):
+            day = day.date()
+        offset = ActivityBitmapService._offset(day)
+        if offset < 0:
+            return
+
+        # One atomic upsert: concurrent marks for the same user can't overwrite each other's days.
+        # It only writes (and returns a row) when the bit wasn't set yet.
+        stmt = sqlite_insert(UserActivityBitmap).values(
+            user_id=user_id, bits=func.bitmap_set(b"", offset), updated_at=datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={'bits': func.bitmap_set(UserActivityBitmap.bits, offset), 'updated_at': stmt.excluded.updated_at},
+            where=func.bitmap_test(UserActivityBitmap.bits, offset) == 0
+        ).returning(UserActivityBitmap.user_id)
+        if db.session.execute(stmt).first() is None:
+            return  # Already active that day
+
+        # First activity of the day, so the user is not in that day's engagement sketch yet
+        EngagementService.record_active(user_id, day)
+
+    @staticmethod
+    def get_bits(user_id):
+        """Return the user's bitmap as an int (bit n = ACTIVITY_EPOCH + n days)"""
+        # A column read, so marks made earlier in this session are seen
+        bits = db.session.execute(
+            select(UserActivityBitmap.bits).where(UserActivityBitmap.user_id == user_id)
+        ).scalar()
+        return int.from_bytes(bits, "little") if bits else 0
+
+    @staticmethod
+    def current_streak(bits, today=None):
+        """Consecutive active days ending today, or yesterday if today is not active yet"""
+        end = ActivityBitmapService._offset(today or ActivityBitmapService._today())
+        if end < 0:
+            return 0
+        if not (bits >> end) & 1:
+            end -= 1
+            if end < 0 or not (bits >> end) & 1:
+                return 0
+
+        # Zero bits at or below `end`; the highest one bounds the streak
+        window = (1 << (end + 1)) - 1
+        gaps = ~bits & window
+        return end + 1 - gaps.bit_length()
+
+    @staticmethod
+    def longest_streak(bits):
+        """Length of the longest run of set bits"""
+        length = 0
+        while bits:
+            bits &= bits >> 1
+            length += 1
+        return length
+
+    @staticmethod
+    def get_streaks(user_id, today=None):
+        bits = ActivityBitmapService.get_bits(user_id)
+        return {
+            'current': ActivityBitmapService.current_streak(bits, today),
+            'longest': ActivityBitmapService.longest_streak(bits),
+            'total_active_days': bits.bit_count()
+        }
+
+    @staticmethod
+    def heatmap(user_id, days=365, today=None):
+        """Activity flags for the `days` days ending today, oldest first"""
+        bits = ActivityBitmapService.get_bits(user_id)
+        today = today or ActivityBitmapService._today()
+        start_day = today - timedelta(days=days - 1)
+        start = ActivityBitmapService._offset(start_day)
+
+        if start >= 0:
+            window = (bits >> start) & ((1 << days) - 1)
+        else:
+            # Days before the epoch are never active
+            window = (bits << -start) & ((1 << days) - 1)
+
+        flags = [int(flag) for flag in reversed(format(window, f'0{days}b'))]
+        return {
+            'start_date': start_day.isoformat(),
+            'end_date': today.isoformat(),
+            'days': flags,
+            'active_days': window.bit_count(),
+            'current_streak': ActivityBitmapService.current_streak(bits, today),
+            'longest_streak': ActivityBitmapService.longest_streak(bits)
+        }
+
+    @staticmethod
+    def rebuild_from_daily_stats(user_id=None):
+        """Fill in bitmaps from every record of activity. Returns users written.
+
+        Sources are the daily rollup (quizzes taken, resources completed),
+        logged activities and each user's last streak update. Days already
+        set are kept: streak updates leave no other record of earlier days,
+        so rebuilding never shortens a streak.
+        """
+        activity_day = func.date(UserActivity.timestamp)
+        sources = [
+            select(UserDailyStats.user_id.label('user_id'), UserDailyStats.date.label('day')).where(
+                (UserDailyStats.resources_completed > 0) | (UserDailyStats.quizzes_taken > 0)
+            ),
+            select(UserActivity.user_id, activity_day).group_by(UserActivity.user_id, activity_day),
+            select(UserLevel.user_id, UserLevel.last_activity_date).where(UserLevel.last_activity_date.isnot(None)),
+        ]
+        if user_id is not None:
+            sources[0] = sources[0].where(UserDailyStats.user_id == user_id)
+            sources[1] = sources[1].where(UserActivity.user_id == user_id)
+            sources[2] = sources[2].where(UserLevel.user_id == user_id)
+
+        bits_by_user = {}
+        for uid, day in db.session.execute(union(*sources)):
+            offset = ActivityBitmapService._offset(_as_date(day))
+            if offset >= 0:
+                bits_by_user[uid] = bits_by_user.get(uid, 0) | (1 << offset)
+
+        existing = db.session.query(UserActivityBitmap.user_id, UserActivityBitmap.bits)
+        if user_id is not None:
+            existing = existing.filter(UserActivityBitmap.user_id == user_id)
+        for uid, bits in existing:
+            if uid in bits_by_user and bits:
+                bits_by_user[uid] |= int.from_bytes(bits, "little")
+
+        if bits_by_user:
+            stmt = sqlite_insert(UserActivityBitmap)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id'],
+                set_={'bits': stmt.excluded.bits, 'updated_at': stmt.excluded.updated_at}
+            )
+            now = datetime.utcnow()
+            db.session.execute(stmt, [
+                {'user_id': uid, 'bits': bits.to_bytes((bits.bit_length() + 7) // 8, "little"), 'updated_at': now}
+                for uid, bits in bits_by_user.items()
+            ])
+        db.session.commit()
+        return len(bits_by_user)
+
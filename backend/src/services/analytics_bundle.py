@@ -0,0 +1,365 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from functools import cached_property
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import selectinload
+from src.models.activity import UserActivity
+from src.models.learning import LearningPath, Topic, Resource, Quiz, QuizAttempt
+from src.database import db
+from src.services.activity_bitmap import ActivityBitmapService
+from src.services.stats_service import StatsService
+
+BUNDLE_SECTIONS = ('dashboard', 'learning_progress', 'quiz_analytics', 'study_time', 'activities')
+
+
+def _sorted_groups(groups):
+    """Group keys in the order SQLite's GROUP BY returns them (NULL first)"""
+    return sorted(groups.items(), key=lambda item: (item[0] is not None, item[0] or ''))
+
+
+class AnalyticsBundle:
+    """Builds several analytics sections from base datasets loaded once.
+
+    Each dataset is a single query run the first time a section needs it;
+    sections return the same payloads as the standalone /analytics and
+    /activities endpoints.
+    """
+
+    RECENT_ACTIVITY_DAYS = 7
+
+    def __init__(self, user, days=30, activity_limit=5):
+        self.user = user
+        self.days = days
+        self.activity_limit = activity_limit
+        self.now = datetime.utcnow()
+        self.start_date = self.now - timedelta(days=days)
+        self.recent_start = self.now - timedelta(days=self.RECENT_ACTIVITY_DAYS)
+
+    # Base datasets
+
+    @cached_property
+    def paths(self):
+        """All of the user's learning paths with their topics"""
+        return LearningPath.query.options(selectinload(LearningPath.topics)).filter(
+            LearningPath.user_id == self.user.id
+        ).order_by(LearningPath.id).all()
+
+    @cached_property
+    def active_paths(self):
+        return [path for path in self.paths if path.is_active]
+
+    @cached_property
+    def resource_totals(self):
+        """(resources, completed, completed minutes) per learning path id"""
+        rows = db.session.query(
+            Topic.learning_path_id,
+            func.count(Resource.id),
+            func.sum(case((Resource.is_completed == True, 1), else_=0)),
+            func.sum(case((Resource.is_completed == True, Resource.duration_minutes), else_=0))
+        ).join(Resource, Resource.topic_id == Topic.id).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).filter(LearningPath.user_id == self.user.id).group_by(Topic.learning_path_id).all()
+        return {path_id: (total, completed or 0, minutes or 0) for path_id, total, completed, minutes in rows}
+
+    @cached_property
+    def attempt_window(self):
+        """Filter for the user's attempts completed in the window"""
+        return (
+            QuizAttempt.user_id == self.user.id,
+            QuizAttempt.completed_at.isnot(None),
+            QuizAttempt.completed_at >= self.start_date
+        )
+
+    @cached_property
+    def attempt_totals(self):
+        """(attempts, average score, best score) over the window"""
+        return db.session.query(
+            func.count(QuizAttempt.id),
+            func.avg(QuizAttempt.percentage),
+            func.max(QuizAttempt.percentage)
+        ).filter(*self.attempt_window).one()
+
+    @cached_property
+    def weekly_scores(self):
+        """(year, week, average score, attempts) per week of the window, oldest first"""
+        week = func.extract('week', QuizAttempt.completed_at)
+        year = func.extract('year', QuizAttempt.completed_at)
+        return db.session.query(
+            year, week, func.avg(QuizAttempt.percentage), func.count(QuizAttempt.id)
+        ).filter(*self.attempt_window).group_by(year, week).order_by(year, week).all()
+
+    @cached_property
+    def daily_stats(self):
+        return StatsService.get_daily_stats(self.user.id, self.start_date)
+
+    @cached_property
+    def study_days(self):
+        return [day for day in self.daily_stats if day.minutes_studied > 0]
+
+    # Sections
+
+    def dashboard(self):
+        total_learning_paths = len(self.active_paths)
+        completed_learning_paths = sum(
+            1 for path in self.active_paths if (path.progress_percentage or 0) >= 100
+        )
+
+        lifetime_totals = StatsService.get_totals(self.user.id)
+        window_quizzes = sum(day.quizzes_taken or 0 for day in self.daily_stats)
+        window_score_sum = sum(day.quiz_score_sum or 0 for day in self.daily_stats)
+        average_quiz_score = window_score_sum / window_quizzes if window_quizzes else 0
+
+        total_study_time = lifetime_totals['minutes_studied']
+
+        subjects = defaultdict(list)
+        for path in self.active_paths:
+            subjects[path.subject].append(path.progress_percentage)
+
+        subject_progress = []
+        for subject, progress in _sorted_groups(subjects):
+            known = [value for value in progress if value is not None]
+            subject_progress.append({
+                'subject': subject,
+                'average_progress': round(sum(known) / len(known), 1) if known else 0,
+                'learning_paths_count': len(progress)
+            })
+
+        return {
+            'overview': {
+                'total_learning_paths': total_learning_paths,
+                'completed_learning_paths': completed_learning_paths,
+                'completion_rate': (completed_learning_paths / total_learning_paths * 100) if total_learning_paths > 0 else 0,
+                'total_quizzes_taken': lifetime_totals['quizzes_taken'],
+                'average_quiz_score': round(average_quiz_score, 1),
+                'learning_streak_days': ActivityBitmapService.get_streaks(self.user.id)['current'],
+                'total_study_time_minutes': total_study_time,
+                'total_study_time_hours': round(total_study_time / 60, 1)
+            },
+            'subject_progress': subject_progress,
+            'recent_activity': self._recent_activity(),
+            'quiz_performance_trends': self._quiz_performance_trends(),
+            'daily_goal_progress': self._daily_goal_progress()
+        }
+
+    def _recent_activity(self):
+        activity = []
+
+        recent_quizzes = db.session.query(
+            QuizAttempt.percentage, QuizAttempt.completed_at, Quiz.title, LearningPath.subject
+        ).join(Quiz, QuizAttempt.quiz_id == Quiz.id).join(
+            Topic, Quiz.topic_id == Topic.id
+        ).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).filter(
+            QuizAttempt.user_id == self.user.id,
+            QuizAttempt.completed_at.isnot(None),
+            QuizAttempt.completed_at >= self.recent_start
+        ).order_by(QuizAttempt.completed_at.desc()).limit(5).all()
+        for score, completed_on, quiz_title, subject in recent_quizzes:
+            activity.append({
+                'type': 'quiz_completed',
+                'title': f"Completed quiz: {quiz_title}",
+                'score': score,
+                'date': completed_on.isoformat(),
+                'subject': subject
+            })
+
+        completed_at = func.coalesce(Resource.completed_at, Resource.created_at).label('completed_at')
+        recent_resources = db.session.query(
+            Resource.title, Resource.resource_type, completed_at, LearningPath.subject
+        ).join(Topic, Resource.topic_id == Topic.id).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).filter(
+            LearningPath.user_id == self.user.id,
+            Resource.is_completed == True,
+            completed_at >= self.recent_start
+        ).order_by(completed_at.desc()).limit(5).all()
+        for title, resource_type, completed_on, subject in recent_resources:
+            activity.append({
+                'type': 'resource_completed',
+                'title': f"Completed: {title}",
+                'resource_type': resource_type,
+                'date': completed_on.isoformat(),
+                'subject': subject
+            })
+
+        activity.sort(key=lambda x: x['date'], reverse=True)
+        return activity[:10]
+
+    def _quiz_performance_trends(self):
+        return [
+            {
+                'week': int(week),
+                'year': int(year),
+                'average_score': round(average, 1),
+                'attempts_count': count
+            }
+            for year, week, average, count in self.weekly_scores
+        ]
+
+    def _daily_goal_progress(self):
+        daily_goal = self.user.daily_goal_minutes
+        days_met_goal = sum(1 for day in self.study_days if day.minutes_studied >= daily_goal)
+        total_days = len(self.study_days) if self.study_days else self.days
+
+        return {
+            'daily_goal_minutes': daily_goal,
+            'days_met_goal': days_met_goal,
+            'total_active_days': len(self.study_days),
+            'goal_achievement_rate': round((days_met_goal / total_days * 100) if total_days > 0 else 0, 1),
+            'average_daily_minutes': round(sum(day.minutes_studied for day in self.study_days) / len(self.study_days), 1) if self.study_days else 0
+        }
+
+    def learning_progress(self):
+        progress_data = []
+        for path in self.active_paths:
+            topics = path.topics
+            total_topics = len(topics)
+            completed_topics = sum(1 for topic in topics if topic.is_completed)
+
+            total_resources, completed_resources, time_spent = self.resource_totals.get(path.id, (0, 0, 0))
+
+            progress_data.append({
+                'learning_path': path.to_dict(),
+                'topics_progress': {
+                    'total': total_topics,
+                    'completed': completed_topics,
+                    'percentage': (completed_topics / total_topics * 100) if total_topics > 0 else 0
+                },
+                'resources_progress': {
+                    'total': total_resources,
+                    'completed': completed_resources,
+                    'percentage': (completed_resources / total_resources * 100) if total_resources > 0 else 0
+                },
+                'time_spent_minutes': time_spent,
+                'time_spent_hours': round(time_spent / 60, 1)
+            })
+
+        return {'learning_progress': progress_data}
+
+    def quiz_analytics(self):
+        total_attempts, average_score, best_score = self.attempt_totals
+        if not total_attempts:
+            return {
+                'total_attempts': 0,
+                'average_score': 0,
+                'best_score': 0,
+                'improvement_trend': 0,
+                'performance_by_difficulty': [],
+                'performance_by_subject': [],
+                'recent_attempts': []
+            }
+
+        # Compare the newer half of the attempts with the older half
+        mid_point = total_attempts // 2
+        improvement_trend = 0
+        if mid_point > 0:
+            newest_first = db.session.query(QuizAttempt.percentage.label('percentage')).filter(
+                *self.attempt_window
+            ).order_by(QuizAttempt.completed_at.desc())
+            newer_half = newest_first.limit(mid_point).subquery()
+            older_half = newest_first.offset(mid_point).subquery()
+            newer_average, older_average = db.session.query(
+                select(func.avg(newer_half.c.percentage)).scalar_subquery(),
+                select(func.avg(older_half.c.percentage)).scalar_subquery()
+            ).one()
+            improvement_trend = newer_average - older_average
+
+        def performance(column, label):
+            rows = db.session.query(
+                column,
+                func.avg(QuizAttempt.percentage),
+                func.count(QuizAttempt.id),
+                func.max(QuizAttempt.percentage)
+            ).join(Quiz, QuizAttempt.quiz_id == Quiz.id).join(
+                Topic, Quiz.topic_id == Topic.id
+            ).join(
+                LearningPath, Topic.learning_path_id == LearningPath.id
+            ).filter(*self.attempt_window).group_by(column).all()
+            return [
+                {label: key, 'average_score': average, 'attempts_count': count, 'best_score': best}
+                for key, average, count, best in rows
+            ]
+
+        recent_rows = db.session.query(
+            QuizAttempt, Quiz.title, Topic.title, LearningPath.subject
+        ).join(Quiz, QuizAttempt.quiz_id == Quiz.id).join(
+            Topic, Quiz.topic_id == Topic.id
+        ).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).filter(*self.attempt_window).order_by(QuizAttempt.completed_at.desc()).limit(10).all()
+
+        recent_attempts = []
+        for attempt, quiz_title, topic_title, subject in recent_rows:
+            attempt_data = attempt.to_dict()
+            attempt_data['quiz_title'] = quiz_title
+            attempt_data['topic_title'] = topic_title
+            attempt_data['subject'] = subject
+            recent_attempts.append(attempt_data)
+
+        return {
+            'total_attempts': total_attempts,
+            'average_score': round(average_score, 1),
+            'best_score': round(best_score, 1),
+            'improvement_trend': round(improvement_trend, 1),
+            'performance_by_difficulty': performance(Quiz.difficulty_level, 'difficulty'),
+            'performance_by_subject': performance(LearningPath.subject, 'subject'),
+            'recent_attempts': recent_attempts
+        }
+
+    def study_time(self):
+        completed_at = func.coalesce(Resource.completed_at, Resource.created_at)
+        subject_study_time = db.session.query(
+            LearningPath.subject, func.sum(Resource.duration_minutes)
+        ).join(Topic, Topic.learning_path_id == LearningPath.id).join(
+            Resource, Resource.topic_id == Topic.id
+        ).filter(
+            LearningPath.user_id == self.user.id,
+            Resource.is_completed == True,
+            completed_at >= self.start_date,
+            Resource.duration_minutes.isnot(None)
+        ).group_by(LearningPath.subject).all()
+
+        minutes_by_date = {day.date: day.minutes_studied for day in self.study_days}
+        weekly_averages = []
+        current_date = self.start_date.date()
+        today = self.now.date()
+        while current_date <= today:
+            week_study_time = sum(
+                minutes_by_date.get(current_date + timedelta(days=offset), 0)
+                for offset in range(7)
+            )
+            weekly_averages.append({
+                'week_start': current_date.strftime('%Y-%m-%d'),
+                'total_minutes': week_study_time,
+                'daily_average': week_study_time / 7
+            })
+            current_date += timedelta(days=7)
+
+        return {
+            'daily_study_time': [
+                {
+                    'date': day.date.strftime('%Y-%m-%d'),
+                    'minutes': day.minutes_studied,
+                    'hours': round(day.minutes_studied / 60, 1)
+                }
+                for day in self.study_days
+            ],
+            'subject_study_time': [
+                {
+                    'subject': subject,
+                    'total_minutes': minutes,
+                    'total_hours': round(minutes / 60, 1)
+                }
+                for subject, minutes in subject_study_time
+            ],
+            'weekly_averages': weekly_averages,
+            'total_study_time': sum(minutes for _, minutes in subject_study_time),
+            'daily_goal_minutes': self.user.daily_goal_minutes
+        }
+
+    def activities(self):
+        recent = UserActivity.query.filter_by(user_id=self.user.id).order_by(
+            UserActivity.timestamp.desc()
+        ).limit(self.activity_limit).all()
+        return {'activities': [activity.to_dict() for activity in recent]}
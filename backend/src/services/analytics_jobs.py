@@ -0,0 +1,139 @@
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, update
+from src.database import db
+from src.models.analytics import AnalyticsJob, UserDailyStats
+from src.models.user import User
+from src.services.stats_service import StatsService
+
+
+class AnalyticsJobs:
+    """Runs expensive analytics requests on a small per-process thread pool.
+
+    A request is deferred when its estimated row count reaches
+    ASYNC_ROW_THRESHOLD. The client gets a job id straight away and polls
+    /analytics/jobs/<id>. Job status and results live in the shared
+    analytics_jobs table, so any worker can answer the poll; the job runs
+    on the worker that accepted it. Finished results are kept for
+    RESULT_TTL_SECONDS, and identical requests from the same user share
+    one job while it runs.
+    """
+
+    MAX_WORKERS = 2  # Per process
+    MAX_PENDING = 20  # Queued plus running jobs across all users and workers
+    RESULT_TTL_SECONDS = 600
+    STALE_AFTER_SECONDS = 900  # A job still unfinished this long was lost with its worker
+    ASYNC_ROW_THRESHOLD = 5000
+    ACTIVE = ('queued', 'running')
+
+    _lock = threading.Lock()
+    _executor = None
+
+    @staticmethod
+    def estimate_rows(user_id, start_date):
+        """Rows an analytics query over the window would touch, from the daily rollup"""
+        days, quizzes, resources = db.session.query(
+            func.count(UserDailyStats.id),
+            func.coalesce(func.sum(UserDailyStats.quizzes_taken), 0),
+            func.coalesce(func.sum(UserDailyStats.resources_completed), 0)
+        ).filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.date >= StatsService._day(start_date)
+        ).one()
+        return days + quizzes + resources
+
+    @classmethod
+    def should_defer(cls, user_id, start_date):
+        threshold = current_app.config.get('ANALYTICS_ASYNC_ROW_THRESHOLD', cls.ASYNC_ROW_THRESHOLD)
+        return cls.estimate_rows(user_id, start_date) >= threshold
+
+    @classmethod
+    def sweep(cls, now=None):
+        """Delete expired results and fail jobs lost with their worker; returns rows changed"""
+        now = now or datetime.utcnow()
+        deleted = db.session.execute(delete(AnalyticsJob).where(AnalyticsJob.expires_at <= now)).rowcount
+        failed = db.session.execute(
+            update(AnalyticsJob).where(
+                AnalyticsJob.status.in_(cls.ACTIVE),
+                AnalyticsJob.created_at < now - timedelta(seconds=cls.STALE_AFTER_SECONDS)
+            ).values(
+                status='failed',
+                error='Analytics job was interrupted',
+                finished_at=now,
+                expires_at=now + timedelta(seconds=cls.RESULT_TTL_SECONDS)
+            )
+        ).rowcount
+        db.session.commit()
+        return deleted + failed
+
+    @classmethod
+    def submit(cls, user_id, name, params, compute):
+        """Queue compute(user, **params); returns the job, or None when the queue is full"""
+        params_key = json.dumps(params, sort_keys=True)
+        app = current_app._get_current_object()
+
+        cls.sweep()
+        job = AnalyticsJob.query.filter(
+            AnalyticsJob.status.in_(cls.ACTIVE),
+            AnalyticsJob.user_id == user_id,
+            AnalyticsJob.name == name,
+            AnalyticsJob.params_key == params_key
+        ).first()
+        if job:
+            return job
+        pending = db.session.query(func.count(AnalyticsJob.id)).filter(AnalyticsJob.status.in_(cls.ACTIVE)).scalar()
+        if pending >= cls.MAX_PENDING:
+            return None
+
+        job = AnalyticsJob(
+            id=uuid.uuid4().hex, user_id=user_id, name=name, params=params, params_key=params_key, status='queued'
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=cls.MAX_WORKERS, thread_name_prefix='analytics-job')
+        cls._executor.submit(cls._run, app, job.id, compute)
+        return job
+
+    @classmethod
+    def _run(cls, app, job_id, compute):
+        with app.app_context():
+            job = db.session.get(AnalyticsJob, job_id)
+            if job is None or job.status != 'queued':
+                return
+            job.status = 'running'
+            db.session.commit()
+            try:
+                user = db.session.get(User, job.user_id)
+                job.result = compute(user, **job.params)
+                job.status = 'done'
+                cls._finish(job)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Analytics job {job_id} ({job.name}) failed: {str(e)}")
+                job.result = None
+                job.error = 'Analytics job failed'
+                job.status = 'failed'
+                cls._finish(job)
+            finally:
+                db.session.remove()
+
+    @classmethod
+    def _finish(cls, job):
+        job.finished_at = datetime.utcnow()
+        job.expires_at = job.finished_at + timedelta(seconds=cls.RESULT_TTL_SECONDS)
+        db.session.commit()
+
+    @staticmethod
+    def get(job_id, user_id):
+        """The user's job, or None if it does not exist, has expired or belongs to someone else"""
+        job = db.session.get(AnalyticsJob, job_id)
+        if not job or job.user_id != user_id or (job.expires_at and job.expires_at <= datetime.utcnow()):
+            return None
+        return job
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from src.database import db
+from src.models.learning import Quiz, Question
+
+AnswerKey = namedtuple('AnswerKey', ['quiz_id', 'version', 'questions', 'total_points'])
+KeyedQuestion = namedtuple('KeyedQuestion', ['id', 'points', 'correct_answer', 'explanation', 'matcher', 'data'])
+GradedAnswer = namedtuple('GradedAnswer', ['question', 'user_answer', 'is_correct', 'points_earned'])
+
+
+def _exact_matcher(expected):
+    return lambda answer: answer.lower() == expected
+
+
+def _compile_matcher(question):
+    """Answer checker for a question with its expected answer normalized once"""
+    if question.question_type in ('multiple_choice', 'true_false'):
+        return _exact_matcher(question.correct_answer.lower())
+    if question.question_type == 'short_answer':
+        # Simple string comparison (could be enhanced with fuzzy matching)
+        return _exact_matcher(question.correct_answer.lower().strip())
+    return lambda answer: False
+
+
+def compile_answer_key(quiz_id, version):
+    """Build the answer key for a quiz's questions, in display order"""
+    questions = Question.query.filter(Question.quiz_id == quiz_id).order_by(
+        Question.order_index, Question.id
+    ).all()
+    keyed = tuple(
+        KeyedQuestion(
+            id=question.id,
+            points=question.points or 0,
+            correct_answer=question.correct_answer,
+            explanation=question.explanation,
+            matcher=_compile_matcher(question),
+            data=MappingProxyType(question.to_dict())
+        )
+        for question in questions
+    )
+    return AnswerKey(
+        quiz_id=quiz_id,
+        version=version,
+        questions=keyed,
+        total_points=sum(question.points for question in keyed)
+    )
+
+
+def grade(answer_key, answers):
+    """(earned points, [GradedAnswer]) for an {question_id: answer} dict"""
+    answers = answers or {}
+    earned_points = 0
+    graded = []
+    for question in answer_key.questions:
+        user_answer = (answers.get(str(question.id)) or '').strip()
+        is_correct = question.matcher(user_answer)
+        points_earned = question.points if is_correct else 0
+        earned_points += points_earned
+        graded.append(GradedAnswer(question, user_answer, is_correct, points_earned))
+    return earned_points, graded
+
+
+class AnswerKeyCache:
+    """Per-process compiled answer keys, keyed by quiz and checked against Quiz.version.
+
+    Every flush that adds, changes or deletes a Question bumps its quiz's
+    version in the same transaction, so a key is reused only while it
+    matches the version the caller just read and grading never sees a
+    stale key. Bulk SQL changes to questions must bump the version too.
+    """
+
+    MAX_QUIZZES = 1000
+
+    _lock = threading.Lock()
+    _keys = OrderedDict()  # quiz_id -> AnswerKey, least recently used first
+
+    @classmethod
+    def get(cls, quiz_id, version=None):
+        """The key for the quiz's current version (read from the database unless given)"""
+        if version is None:
+            version = db.session.query(Quiz.version).filter(Quiz.id == quiz_id).scalar()
+
+        with cls._lock:
+            answer_key = cls._keys.get(quiz_id)
+            if answer_key is not None and answer_key.version == version:
+                cls._keys.move_to_end(quiz_id)
+                return answer_key
+
+        # The version was read before the questions, so a concurrent change can only make this key look older
+        answer_key = compile_answer_key(quiz_id, version)
+        with cls._lock:
+            cls._keys[quiz_id] = answer_key
+            cls._keys.move_to_end(quiz_id)
+            while len(cls._keys) > cls.MAX_QUIZZES:
+                cls._keys.popitem(last=False)
+        return answer_key
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._keys.clear()
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_quiz_versions(session, flush_context):
+    """Version a quiz in the same transaction as any change to its questions"""
+    quiz_ids = {
+        obj.quiz_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Question) and obj.quiz_id is not None
+    }
+    if quiz_ids:
+        session.connection().execute(
+            update(Quiz).where(Quiz.id.in_(quiz_ids)).values(version=Quiz.version + 1)
+        )
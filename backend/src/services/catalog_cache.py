@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from src.database import db
+from src.models.gamification import Achievement, Badge, CatalogVersion
+
+CATALOG_NAME = 'gamification'
+
+CatalogSnapshot = namedtuple('CatalogSnapshot', [
+    'version', 'achievements', 'badges', 'achievements_by_key', 'badges_by_type'
+])
+
+
+class CatalogItem:
+    """Read-only achievement or badge: its serialized fields as attributes"""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        object.__setattr__(self, '_data', MappingProxyType(data))
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError('catalog items are read-only')
+
+    def to_dict(self):
+        """A fresh copy of the serialized row, safe for callers to extend"""
+        return dict(self._data)
+
+
+def _group(items, key):
+    groups = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return MappingProxyType({k: tuple(group) for k, group in groups.items()})
+
+
+class CatalogCache:
+    """Per-process snapshot of the active achievement and badge catalogs.
+
+    Every flush that touches an Achievement or Badge bumps the row in
+    catalog_versions inside the same transaction. A process compares its
+    snapshot's version with that row at most once every CHECK_SECONDS, so
+    requests in between run no catalog queries, and rebuilds only when the
+    number has moved. Bulk SQL changes to the catalog tables bypass the
+    session events and should call bump() themselves.
+    """
+
+    CHECK_SECONDS = 5
+
+    _lock = threading.Lock()
+    _snapshot = None
+    _checked_at = 0.0
+
+    @classmethod
+    def get(cls):
+        snapshot = cls._snapshot
+        if snapshot is not None and time.monotonic() - cls._checked_at < cls.CHECK_SECONDS:
+            return snapshot
+
+        with cls._lock:
+            snapshot = cls._snapshot
+            if snapshot is not None and time.monotonic() - cls._checked_at < cls.CHECK_SECONDS:
+                return snapshot
+
+            version = cls._current_version()
+            if snapshot is None or snapshot.version != version:
+                snapshot = cls._build(version)
+                cls._snapshot = snapshot
+            cls._checked_at = time.monotonic()
+            return snapshot
+
+    @staticmethod
+    def _current_version():
+        return db.session.query(CatalogVersion.version).filter_by(name=CATALOG_NAME).scalar() or 0
+
+    @staticmethod
+    def _build(version):
+        achievements = tuple(
+            CatalogItem(achievement.to_dict())
+            for achievement in Achievement.query.filter_by(is_active=True).order_by(Achievement.id)
+        )
+        badges = tuple(
+            CatalogItem(badge.to_dict())
+            for badge in Badge.query.filter_by(is_active=True).order_by(Badge.id)
+        )
+        return CatalogSnapshot(
+            version=version,
+            achievements=achievements,
+            badges=badges,
+            achievements_by_key=_group(achievements, lambda a: (a.condition_type, a.condition_resource)),
+            badges_by_type=_group(badges, lambda b: b.condition_type)
+        )
+
+    @classmethod
+    def invalidate(cls):
+        """Rebuild on the next get() in this process"""
+        with cls._lock:
+            cls._snapshot = None
+
+    @staticmethod
+    def bump(connection=None):
+        """Move the catalog version on so every process rebuilds its snapshot"""
+        stmt = sqlite_insert(CatalogVersion).values(name=CATALOG_NAME, version=1, updated_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': CatalogVersion.version + 1, 'updated_at': stmt.excluded.updated_at}
+        )
+        (connection or db.session).execute(stmt)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_catalog_version(session, flush_context):
+    """Version the catalog in the same transaction as the change"""
+    if session.info.get('catalog_changed'):
+        return
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Achievement, Badge)):
+            CatalogCache.bump(session.connection())
+            session.info['catalog_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_catalog_change(session):
+    if session.info.pop('catalog_changed', None):
+        CatalogCache.invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_catalog_change(session, previous_transaction):
+    # A snapshot built inside the rolled back transaction may hold its changes
+    if session.info.pop('catalog_changed', None):
+        CatalogCache.invalidate()
@@ -0,0 +1,404 @@
+import io
+import json
+import os
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+from src.database import db
+from src.models.user import User
+from src.models.learning import LearningPath, Topic, Resource, Quiz, QuizAttempt
+from src.models.activity import UserActivity
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+EXPORT_CHUNK_SIZE = 50000
+SECONDS_PER_WEEK = 7 * 86400
+MONDAY_OFFSET = 3 * 86400  # The unix epoch fell on a Thursday
+
+# Exported tables: column name -> numpy dtype. Timestamps are unix seconds (0 = NULL),
+# strings are dictionary-encoded into int32 codes stored in the manifest.
+SNAPSHOT_SCHEMAS = {
+    'quiz_attempts': {
+        'id': 'int64', 'user_id': 'int32', 'quiz_id': 'int32', 'subject': 'int32', 'difficulty': 'int32',
+        'percentage': 'float32', 'time_taken_minutes': 'int32', 'completed_at': 'int64'
+    },
+    'user_activity': {
+        'id': 'int64', 'user_id': 'int32', 'activity_type': 'int32', 'timestamp': 'int64'
+    },
+    'resources': {
+        'id': 'int64', 'user_id': 'int32', 'subject': 'int32', 'is_completed': 'int8',
+        'duration_minutes': 'int32', 'created_at': 'int64', 'completed_at': 'int64'
+    },
+    'users': {
+        'id': 'int64', 'created_at': 'int64'
+    },
+}
+
+
+def _unix(value):
+    return int((value - UNIX_EPOCH).total_seconds()) if value else 0
+
+
+def _week(timestamps):
+    """Monday-based week numbers for unix timestamps"""
+    return (timestamps + MONDAY_OFFSET) // SECONDS_PER_WEEK
+
+
+def snapshot_dir():
+    return current_app.config.get('ANALYTICS_SNAPSHOT_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'database', 'snapshots'
+    )
+
+
+class SnapshotExporter:
+    """Exports selected columns to memory-mapped .npy files, one file per column.
+
+    quiz_attempts, user_activity and users are append-only and are exported
+    incrementally from a watermark kept in manifest.json. Resource completion
+    flags change in place, so the resources table is rewritten on every export.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or snapshot_dir()
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        self.manifest = self._load_manifest()
+        self._indexes = {}
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {'tables': {}, 'dictionaries': {}, 'exported_at': None}
+
+    def _save_manifest(self):
+        self.manifest['exported_at'] = datetime.utcnow().isoformat()
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _encode(self, dictionary, value):
+        """Map a string to its stable int code in the named dictionary"""
+        values = self.manifest['dictionaries'].setdefault(dictionary, [])
+        index = self._indexes.get(dictionary)
+        if index is None:
+            index = self._indexes[dictionary] = {v: i for i, v in enumerate(values)}
+        if value not in index:
+            index[value] = len(values)
+            values.append(value)
+        return index[value]
+
+    def _column_path(self, table, column):
+        return os.path.join(self.directory, f'{table}.{column}.npy')
+
+    def _append_column(self, table, column, values, committed_rows):
+        """Append values to a column file in place, trimming rows left by an interrupted export"""
+        path = self._column_path(table, column)
+        dtype = np.dtype(SNAPSHOT_SCHEMAS[table][column])
+        values = np.asarray(values, dtype=dtype)
+
+        if not os.path.exists(path) or committed_rows == 0:
+            np.save(path, values)
+            return
+
+        existing = np.load(path, mmap_mode='r')
+        if existing.shape[0] != committed_rows:
+            kept = np.array(existing[:committed_rows])
+            del existing
+            np.save(path, np.concatenate([kept, values]))
+            return
+        del existing
+
+        with open(path, 'r+b') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                np.lib.format.read_array_header_1_0(f)
+            else:
+                np.lib.format.read_array_header_2_0(f)
+            header_length = f.tell()
+
+            header = io.BytesIO()
+            header_fields = {
+                'descr': np.lib.format.dtype_to_descr(dtype),
+                'fortran_order': False,
+                'shape': (committed_rows + len(values),)
+            }
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(header, header_fields)
+            else:
+                np.lib.format.write_array_header_2_0(header, header_fields)
+
+            if len(header.getvalue()) == header_length:
+                f.seek(0)
+                f.write(header.getvalue())
+                f.seek(0, os.SEEK_END)
+                f.write(values.tobytes())
+                return
+
+        # The header cannot grow in place; fall back to rewriting the file
+        existing = np.array(np.load(path, mmap_mode='r'))
+        np.save(path, np.concatenate([existing, values]))
+
+    def _write_chunks(self, table, rows, to_columns, replace=False):
+        """Append rows (an iterable of result chunks) to the table's column files"""
+        table_state = self.manifest['tables'].setdefault(table, {'rows': 0, 'watermark': None})
+        committed_rows = 0 if replace else table_state['rows']
+        last_row = None
+
+        for chunk in rows:
+            if not chunk:
+                continue
+            columns = to_columns(chunk)
+            for column, values in columns.items():
+                self._append_column(table, column, values, committed_rows)
+            committed_rows += len(chunk)
+            last_row = chunk[-1]
+
+        if replace and last_row is None:
+            for column in SNAPSHOT_SCHEMAS[table]:
+                np.save(self._column_path(table, column), np.zeros(0, dtype=SNAPSHOT_SCHEMAS[table][column]))
+
+        table_state['rows'] = committed_rows
+        table_state['columns'] = SNAPSHOT_SCHEMAS[table]
+        return last_row
+
+    @staticmethod
+    def _chunks(statement):
+        result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        for partition in result.partitions(EXPORT_CHUNK_SIZE):
+            yield partition
+
+    def export_quiz_attempts(self):
+        state = self.manifest['tables'].get('quiz_attempts', {})
+        statement = select(
+            QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.quiz_id, LearningPath.subject,
+            Quiz.difficulty_level, QuizAttempt.percentage, QuizAttempt.time_taken_minutes, QuizAttempt.completed_at
+        ).join(Quiz, QuizAttempt.quiz_id == Quiz.id).join(
+            Topic, Quiz.topic_id == Topic.id
+        ).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).where(QuizAttempt.completed_at.isnot(None))
+        if state.get('watermark'):
+            statement = statement.where(QuizAttempt.completed_at > datetime.fromisoformat(state['watermark']))
+        statement = statement.order_by(QuizAttempt.completed_at, QuizAttempt.id)
+
+        def to_columns(chunk):
+            return {
+                'id': [row[0] for row in chunk],
+                'user_id': [row[1] for row in chunk],
+                'quiz_id': [row[2] for row in chunk],
+                'subject': [self._encode('subject', row[3]) for row in chunk],
+                'difficulty': [self._encode('difficulty', row[4]) for row in chunk],
+                'percentage': [row[5] or 0.0 for row in chunk],
+                'time_taken_minutes': [row[6] if row[6] is not None else -1 for row in chunk],
+                'completed_at': [_unix(row[7]) for row in chunk],
+            }
+
+        last_row = self._write_chunks('quiz_attempts', self._chunks(statement), to_columns)
+        if last_row is not None:
+            self.manifest['tables']['quiz_attempts']['watermark'] = last_row[7].isoformat()
+
+    def export_user_activity(self):
+        state = self.manifest['tables'].get('user_activity', {})
+        statement = select(UserActivity.id, UserActivity.user_id, UserActivity.activity_type, UserActivity.timestamp)
+        if state.get('watermark'):
+            statement = statement.where(UserActivity.id > state['watermark'])
+        statement = statement.order_by(UserActivity.id)
+
+        def to_columns(chunk):
+            return {
+                'id': [row[0] for row in chunk],
+                'user_id': [row[1] for row in chunk],
+                'activity_type': [self._encode('activity_type', row[2]) for row in chunk],
+                'timestamp': [_unix(row[3]) for row in chunk],
+            }
+
+        last_row = self._write_chunks('user_activity', self._chunks(statement), to_columns)
+        if last_row is not None:
+            self.manifest['tables']['user_activity']['watermark'] = last_row[0]
+
+    def export_users(self):
+        state = self.manifest['tables'].get('users', {})
+        statement = select(User.id, User.created_at)
+        if state.get('watermark'):
+            statement = statement.where(User.id > state['watermark'])
+        statement = statement.order_by(User.id)
+
+        def to_columns(chunk):
+            return {
+                'id': [row[0] for row in chunk],
+                'created_at': [_unix(row[1]) for row in chunk],
+            }
+
+        last_row = self._write_chunks('users', self._chunks(statement), to_columns)
+        if last_row is not None:
+            self.manifest['tables']['users']['watermark'] = last_row[0]
+
+    def export_resources(self):
+        statement = select(
+            Resource.id, LearningPath.user_id, LearningPath.subject, Resource.is_completed,
+            Resource.duration_minutes, Resource.created_at, Resource.completed_at
+        ).join(Topic, Resource.topic_id == Topic.id).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).order_by(Resource.id)
+
+        def to_columns(chunk):
+            return {
+                'id': [row[0] for row in chunk],
+                'user_id': [row[1] for row in chunk],
+                'subject': [self._encode('subject', row[2]) for row in chunk],
+                'is_completed': [1 if row[3] else 0 for row in chunk],
+                'duration_minutes': [row[4] or 0 for row in chunk],
+                'created_at': [_unix(row[5]) for row in chunk],
+                'completed_at': [_unix(row[6]) for row in chunk],
+            }
+
+        self._write_chunks('resources', self._chunks(statement), to_columns, replace=True)
+
+    def export_all(self):
+        """Run an incremental export of every table. Returns the row count per table."""
+        self.export_quiz_attempts()
+        self.export_user_activity()
+        self.export_users()
+        self.export_resources()
+        self._save_manifest()
+        return {table: state['rows'] for table, state in self.manifest['tables'].items()}
+
+
+class ColumnarAnalytics:
+    """Vectorized platform-wide aggregates over the exported snapshots.
+
+    Reads only the memory-mapped column files, never the live database.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or snapshot_dir()
+        manifest_path = os.path.join(self.directory, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'tables': {}, 'dictionaries': {}, 'exported_at': None}
+
+    def column(self, table, column):
+        rows = self.manifest['tables'].get(table, {}).get('rows', 0)
+        path = os.path.join(self.directory, f'{table}.{column}.npy')
+        if not rows or not os.path.exists(path):
+            return np.zeros(0, dtype=SNAPSHOT_SCHEMAS[table][column])
+        return np.load(path, mmap_mode='r')[:rows]
+
+    def _labels(self, dictionary):
+        return self.manifest['dictionaries'].get(dictionary, [])
+
+    def score_distribution(self, group_by='subject', percentiles=(10, 25, 50, 75, 90), bins=10):
+        """Count, mean, percentiles and a histogram of quiz percentages per group"""
+        scores = self.column('quiz_attempts', 'percentage')
+        codes = self.column('quiz_attempts', group_by)
+        labels = self._labels(group_by)
+        if not len(scores):
+            return {'exported_at': self.manifest.get('exported_at'), 'groups': []}
+
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        sorted_scores = scores[order]
+        group_codes, starts = np.unique(sorted_codes, return_index=True)
+        ends = np.append(starts[1:], len(sorted_codes))
+
+        groups = []
+        for code, start, end in zip(group_codes, starts, ends):
+            group_scores = sorted_scores[start:end]
+            histogram, edges = np.histogram(group_scores, bins=bins, range=(0, 100))
+            groups.append({
+                group_by: labels[code] if code < len(labels) else None,
+                'attempts_count': int(end - start),
+                'average_score': round(float(group_scores.mean()), 2),
+                'percentiles': {
+                    str(p): round(float(v), 2)
+                    for p, v in zip(percentiles, np.percentile(group_scores, percentiles))
+                },
+                'histogram': {
+                    'bin_edges': [float(edge) for edge in edges],
+                    'counts': histogram.tolist()
+                }
+            })
+
+        return {'exported_at': self.manifest.get('exported_at'), 'groups': groups}
+
+    def completion_funnel(self, pass_mark=80):
+        """Distinct users reaching each stage, overall and per subject"""
+        resource_users = self.column('resources', 'user_id')
+        resource_subjects = self.column('resources', 'subject')
+        completed = self.column('resources', 'is_completed').astype(bool)
+        attempt_users = self.column('quiz_attempts', 'user_id')
+        attempt_subjects = self.column('quiz_attempts', 'subject')
+        passed = self.column('quiz_attempts', 'percentage') >= pass_mark
+
+        def stages(resource_mask, attempt_mask):
+            return {
+                'users_with_resources': int(np.unique(resource_users[resource_mask]).size),
+                'users_completing_resources': int(np.unique(resource_users[resource_mask & completed]).size),
+                'users_taking_quizzes': int(np.unique(attempt_users[attempt_mask]).size),
+                'users_passing_quizzes': int(np.unique(attempt_users[attempt_mask & passed]).size),
+                'resources_total': int(resource_mask.sum()),
+                'resources_completed': int((resource_mask & completed).sum())
+            }
+
+        labels = self._labels('subject')
+        by_subject = []
+        for code in np.union1d(np.unique(resource_subjects), np.unique(attempt_subjects)):
+            subject_stages = stages(resource_subjects == code, attempt_subjects == code)
+            subject_stages['subject'] = labels[code] if code < len(labels) else None
+            by_subject.append(subject_stages)
+
+        return {
+            'exported_at': self.manifest.get('exported_at'),
+            'pass_mark': pass_mark,
+            'overall': stages(np.ones(len(resource_users), dtype=bool), np.ones(len(attempt_users), dtype=bool)),
+            'by_subject': by_subject
+        }
+
+    def cohort_retention(self, weeks=8):
+        """Share of each signup-week cohort active in each following week"""
+        user_ids = self.column('users', 'id')
+        signup_weeks = _week(self.column('users', 'created_at'))
+        if not len(user_ids):
+            return {'exported_at': self.manifest.get('exported_at'), 'weeks': weeks, 'cohorts': []}
+
+        # Dense lookup from user id to signup week
+        cohort_of = np.full(int(user_ids.max()) + 1, -1, dtype=np.int64)
+        cohort_of[user_ids] = signup_weeks
+
+        active_users = np.concatenate([
+            self.column('user_activity', 'user_id'), self.column('quiz_attempts', 'user_id')
+        ]).astype(np.int64)
+        active_weeks = _week(np.concatenate([
+            self.column('user_activity', 'timestamp'), self.column('quiz_attempts', 'completed_at')
+        ]))
+
+        known = active_users < len(cohort_of)
+        active_users, active_weeks = active_users[known], active_weeks[known]
+        cohorts = cohort_of[active_users]
+        week_index = active_weeks - cohorts
+        valid = (cohorts >= 0) & (week_index >= 0) & (week_index < weeks)
+
+        # Distinct (user, week) pairs, then count users per (cohort, week)
+        pairs = np.unique(active_users[valid] * weeks + week_index[valid])
+        pair_users = pairs // weeks
+        pair_weeks = pairs % weeks
+
+        cohort_weeks, cohort_sizes = np.unique(signup_weeks, return_counts=True)
+        position = np.searchsorted(cohort_weeks, cohort_of[pair_users])
+        active_counts = np.zeros((len(cohort_weeks), weeks), dtype=np.int64)
+        np.add.at(active_counts, (position, pair_weeks), 1)
+
+        cohorts_out = []
+        for row, (cohort_week, size) in enumerate(zip(cohort_weeks, cohort_sizes)):
+            week_start = datetime.utcfromtimestamp(int(cohort_week) * SECONDS_PER_WEEK - MONDAY_OFFSET)
+            cohorts_out.append({
+                'cohort_week_start': week_start.date().isoformat(),
+                'users': int(size),
+                'retention': [round(float(count) / size * 100, 1) for count in active_counts[row]]
+            })
+
+        return {'exported_at': self.manifest.get('exported_at'), 'weeks': weeks, 'cohorts': cohorts_out}
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from src.models.learning import LearningPath, Topic, Resource, QuizAttempt
+from src.models.activity import UserActivity
+from src.models.user import User
+
+CacheEntry = namedtuple('CacheEntry', ['payload', 'etag', 'generation', 'expires_at'])
+
+
+class DashboardCache:
+    """Per-process cache of dashboard payloads keyed by (user_id, days).
+
+    Entries are dropped when the session commits a write to one of the user's
+    QuizAttempt, LearningPath, UserActivity rows, a change to a Resource's
+    completion state or counted minutes, or a change to the user's daily goal. Other worker processes only learn about a write through
+    the TTL, so it is kept short.
+    """
+
+    TTL_SECONDS = 300
+    MAX_USERS = 5000
+    WAIT_SECONDS = 30
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # user_id -> {days: CacheEntry}, least recently used first
+    _generations = {}  # user_id -> invalidation counter
+    _inflight = {}  # (user_id, days) -> threading.Event for the computing request
+
+    @classmethod
+    def get_or_compute(cls, user_id, days, compute):
+        """Return a fresh entry, running compute() at most once per key across threads"""
+        key = (user_id, days)
+        while True:
+            with cls._lock:
+                generation = cls._generations.get(user_id, 0)
+                entry = cls._entries.get(user_id, {}).get(days)
+                if entry and entry.generation == generation and entry.expires_at > time.monotonic():
+                    cls._entries.move_to_end(user_id)
+                    return entry
+
+                waiter = cls._inflight.get(key)
+                is_leader = waiter is None
+                if is_leader:
+                    waiter = threading.Event()
+                    cls._inflight[key] = waiter
+
+            if not is_leader:
+                # Another request is computing this key; reuse its result
+                waiter.wait(cls.WAIT_SECONDS)
+                continue
+
+            try:
+                payload = compute()
+                body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+                entry = CacheEntry(
+                    payload=payload,
+                    etag=hashlib.sha256(body.encode('utf-8')).hexdigest(),
+                    generation=generation,
+                    expires_at=time.monotonic() + cls.TTL_SECONDS
+                )
+                with cls._lock:
+                    # A write committed while computing makes this result stale
+                    if cls._generations.get(user_id, 0) == generation:
+                        cls._entries.setdefault(user_id, {})[days] = entry
+                        cls._entries.move_to_end(user_id)
+                        while len(cls._entries) > cls.MAX_USERS:
+                            cls._entries.popitem(last=False)
+                return entry
+            finally:
+                with cls._lock:
+                    cls._inflight.pop(key, None)
+                waiter.set()
+
+    @classmethod
+    def invalidate(cls, user_id):
+        """Drop every cached dashboard for a user"""
+        with cls._lock:
+            cls._generations[user_id] = cls._generations.get(user_id, 0) + 1
+            cls._entries.pop(user_id, None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            for user_id in cls._entries:
+                cls._generations[user_id] = cls._generations.get(user_id, 0) + 1
+            cls._entries.clear()
+
+
+def _resource_completion_changed(session, resource):
+    """Whether the change moves the resource's completed count or minutes"""
+    if resource in session.new or resource in session.deleted:
+        return bool(resource.is_completed)
+    attrs = inspect(resource).attrs
+    return attrs.is_completed.history.has_changes() or (
+        bool(resource.is_completed) and attrs.duration_minutes.history.has_changes()
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_dashboard_invalidations(session, flush_context):
+    """Remember which users' dashboards the flushed rows affect"""
+    user_ids = session.info.setdefault('dashboard_invalidations', set())
+    topic_ids = set()
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (QuizAttempt, LearningPath, UserActivity)):
+            if obj.user_id is not None:
+                user_ids.add(obj.user_id)
+        elif isinstance(obj, Resource) and _resource_completion_changed(session, obj):
+            topic_ids.add(obj.topic_id)
+        elif isinstance(obj, User) and obj in session.dirty:
+            if inspect(obj).attrs.daily_goal_minutes.history.has_changes():
+                user_ids.add(obj.id)
+
+    if topic_ids:
+        owners = session.connection().execute(
+            select(LearningPath.user_id).join(Topic, Topic.learning_path_id == LearningPath.id)
+            .where(Topic.id.in_(topic_ids))
+        )
+        user_ids.update(row[0] for row in owners)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_dashboard_invalidations(session):
+    for user_id in session.info.pop('dashboard_invalidations', ()):
+        DashboardCache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_dashboard_invalidations(session, previous_transaction):
+    session.info.pop('dashboard_invalidations', None)
@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.activity import UserActivity
+from src.models.analytics import DailyActiveUsers, UserDailyStats
+from src.models.learning import QuizAttempt
+from src.utils.sketches import HyperLogLog
+
+
+class EngagementService:
+    """Approximate distinct active users per day, week and month.
+
+    Each day keeps one HyperLogLog sketch of the ids of users active that
+    day. A window's distinct count is the register-wise max of its days, so
+    DAU/WAU/MAU cost at most 30 small blob reads regardless of traffic.
+    """
+
+    PRECISION = 12
+
+    @staticmethod
+    def _day(when):
+        when = when or datetime.utcnow()
+        return when.date() if isinstance(when, datetime) else when
+
+    @staticmethod
+    def record_active(user_id, when=None):
+        """Add a user to the day's sketch; the caller commits.
+
+        The user maps to one register, which is raised in a single atomic
+        upsert, so concurrent requests can't overwrite each other's
+        registers; the row is only written when that register grows.
+        """
+        day = EngagementService._day(when)
+        sketch = HyperLogLog(EngagementService.PRECISION)
+        index, rank = sketch.position(user_id)
+        sketch.add(user_id)
+
+        stmt = sqlite_insert(DailyActiveUsers).values(date=day, registers=sketch.to_bytes(), updated_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['date'],
+            set_={
+                'registers': func.byte_max(DailyActiveUsers.registers, index, rank),
+                'updated_at': stmt.excluded.updated_at
+            },
+            where=func.byte_at(DailyActiveUsers.registers, index) < rank
+        )
+        db.session.execute(stmt)
+
+    @staticmethod
+    def _window(end, days):
+        start = end - timedelta(days=days - 1)
+        return DailyActiveUsers.query.filter(
+            DailyActiveUsers.date >= start,
+            DailyActiveUsers.date <= end
+        ).all()
+
+    @staticmethod
+    def get_engagement(days=30, today=None):
+        """DAU/WAU/MAU as of today plus the daily active user series"""
+        today = today or datetime.utcnow().date()
+        rows = {row.date: row for row in EngagementService._window(today, max(days, 30))}
+
+        def merged(window):
+            sketch = HyperLogLog(EngagementService.PRECISION)
+            for offset in range(window):
+                row = rows.get(today - timedelta(days=offset))
+                if row:
+                    sketch.merge(HyperLogLog.from_bytes(row.registers))
+            return sketch.count()
+
+        daily = []
+        for offset in range(days - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            row = rows.get(day)
+            daily.append({
+                'date': day.isoformat(),
+                'active_users': HyperLogLog.from_bytes(row.registers).count() if row else 0
+            })
+
+        dau = daily[-1]['active_users']
+        mau = merged(30)
+        return {
+            'date': today.isoformat(),
+            'dau': dau,
+            'wau': merged(7),
+            'mau': mau,
+            'stickiness': round(dau / mau * 100, 1) if mau else 0,  # DAU/MAU percentage
+            'daily': daily,
+            'approximate': True
+        }
+
+    @staticmethod
+    def rebuild(since=None):
+        """Recreate the daily sketches from activity, quiz and rollup rows. Returns days written."""
+        sketches = {}
+
+        def add(user_id, day):
+            if day is not None:
+                sketches.setdefault(EngagementService._day(day), HyperLogLog(EngagementService.PRECISION)).add(user_id)
+
+        activities = db.session.query(UserActivity.user_id, UserActivity.timestamp)
+        attempts = db.session.query(QuizAttempt.user_id, QuizAttempt.completed_at).filter(
+            QuizAttempt.completed_at.isnot(None)
+        )
+        # Resource completions are only kept per day in the rollup
+        completions = db.session.query(UserDailyStats.user_id, UserDailyStats.date).filter(
+            UserDailyStats.resources_completed > 0
+        )
+        if since is not None:
+            activities = activities.filter(UserActivity.timestamp >= since)
+            attempts = attempts.filter(QuizAttempt.completed_at >= since)
+            completions = completions.filter(UserDailyStats.date >= since)
+
+        for query in (activities, attempts, completions):
+            for user_id, when in query.yield_per(10000):
+                add(user_id, when)
+
+        delete_query = DailyActiveUsers.query
+        if since is not None:
+            delete_query = delete_query.filter(DailyActiveUsers.date >= EngagementService._day(since))
+        delete_query.delete(synchronize_session=False)
+
+        for day, sketch in sketches.items():
+            db.session.add(DailyActiveUsers(date=day, registers=sketch.to_bytes()))
+        db.session.commit()
+        return len(sketches)
@@ -0,0 +1,161 @@
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, select, update
+from src.database import db
+from src.models.outbox import OutboxEvent
+from src.services.achievement_rules import AchievementEngine, EVENT_INDEX
+from src.services.gamification_service import GamificationService
+
+# Events that mean the user studied that day and so extend their learning streak
+STREAK_EVENTS = ('quiz_submitted', 'resource_completed')
+
+
+def rule_events(event, payload):
+    """Achievement rule events an outbox event stands for"""
+    if event == 'activity_logged':
+        # Activity types double as rule events (e.g. resource_viewed)
+        return {(payload or {}).get('activity_type')}
+    return {event}
+
+
+class EventOutbox:
+    """Durable queue of domain events, consumed off the request path.
+
+    Write paths call emit() before their commit, so an event exists exactly
+    when the write does. The consumer (a scheduler job) reads pending
+    events in id order, coalesces each user's events into one streak
+    refresh and one rule evaluation, and marks them processed in the same
+    transaction as the awards. A crash before that commit leaves them
+    pending; evaluation only awards what is still unearned, so the retry
+    is harmless. Events that keep failing are given up after MAX_ATTEMPTS.
+    """
+
+    BATCH_SIZE = 500
+    DRAIN_SECONDS = 30  # Longest a single drain keeps taking batches
+    MAX_ATTEMPTS = 5
+    RETENTION_DAYS = 7  # Processed events kept for inspection
+
+    _lock = threading.Lock()
+    _metrics = {
+        'batches': 0, 'events_processed': 0, 'users_processed': 0, 'failures': 0,
+        'last_batch_ms': None, 'last_lag_seconds': None, 'max_lag_seconds': 0
+    }
+
+    @staticmethod
+    def emit(user_id, event, payload=None):
+        """Stage an event on the current session; the caller's commit publishes it"""
+        db.session.execute(insert(OutboxEvent).values(
+            user_id=user_id, event=event, payload=payload, created_at=datetime.utcnow(), attempts=0
+        ))
+
+    @staticmethod
+    def _process_user(user_id, events):
+        keys = set()
+        for event in events:
+            for name in rule_events(event.event, event.payload):
+                keys |= EVENT_INDEX.get(name, set())
+
+        streak_days = [event.created_at.date() for event in events if event.event in STREAK_EVENTS]
+        if streak_days:
+            GamificationService._refresh_learning_streak(user_id, max(streak_days))
+            keys |= EVENT_INDEX['streak_updated']
+
+        db.session.execute(
+            update(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events]))
+            .values(processed_at=datetime.utcnow(), attempts=OutboxEvent.attempts + 1)
+        )
+        # Commits the awards and the processed marks together
+        AchievementEngine.evaluate(user_id, keys)
+
+    @staticmethod
+    def _record_failure(events, error):
+        db.session.execute(
+            update(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events])).values(
+                attempts=OutboxEvent.attempts + 1,
+                last_error=error,
+                # Given up: stays in the table with its error but leaves the queue
+                processed_at=case((OutboxEvent.attempts + 1 >= EventOutbox.MAX_ATTEMPTS, datetime.utcnow()), else_=None)
+            )
+        )
+        db.session.commit()
+
+    @classmethod
+    def process_batch(cls, limit=None):
+        """Process up to `limit` pending events; returns how many were taken"""
+        # Plain rows rather than entities: they stay readable across the per-user commits
+        events = db.session.execute(
+            select(OutboxEvent.id, OutboxEvent.user_id, OutboxEvent.event, OutboxEvent.payload, OutboxEvent.created_at)
+            .where(OutboxEvent.processed_at.is_(None))
+            .order_by(OutboxEvent.id).limit(limit or cls.BATCH_SIZE)
+        ).all()
+        if not events:
+            return 0
+
+        started = time.monotonic()
+        lag = (datetime.utcnow() - events[0].created_at).total_seconds()
+        by_user = {}
+        for event in events:
+            by_user.setdefault(event.user_id, []).append(event)
+
+        failures = 0
+        for user_id, user_events in by_user.items():
+            try:
+                cls._process_user(user_id, user_events)
+            except Exception as e:
+                db.session.rollback()
+                failures += 1
+                current_app.logger.warning(f"Outbox events {[event.id for event in user_events]} failed: {str(e)}")
+                cls._record_failure(user_events, str(e))
+
+        with cls._lock:
+            metrics = cls._metrics
+            metrics['batches'] += 1
+            metrics['events_processed'] += len(events)
+            metrics['users_processed'] += len(by_user)
+            metrics['failures'] += failures
+            metrics['last_batch_ms'] = int((time.monotonic() - started) * 1000)
+            metrics['last_lag_seconds'] = lag
+            metrics['max_lag_seconds'] = max(metrics['max_lag_seconds'], lag)
+        return len(events)
+
+    @classmethod
+    def drain(cls):
+        """Take batches until the outbox is empty or DRAIN_SECONDS have passed; returns events taken"""
+        deadline = time.monotonic() + cls.DRAIN_SECONDS
+        total = 0
+        while time.monotonic() < deadline:
+            taken = cls.process_batch()
+            total += taken
+            if taken < cls.BATCH_SIZE:
+                break
+        return total
+
+    @classmethod
+    def prune(cls, before):
+        """Delete events processed before `before`; returns the number removed"""
+        result = db.session.execute(delete(OutboxEvent).where(OutboxEvent.processed_at < before))
+        db.session.commit()
+        return result.rowcount
+
+    @classmethod
+    def status(cls):
+        """Backlog and lag from the shared table plus this process's consumer metrics"""
+        pending, oldest = db.session.query(
+            func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)
+        ).filter(OutboxEvent.processed_at.is_(None)).one()
+        given_up = db.session.query(func.count(OutboxEvent.id)).filter(
+            OutboxEvent.processed_at.isnot(None),
+            OutboxEvent.attempts >= cls.MAX_ATTEMPTS,
+            OutboxEvent.last_error.isnot(None)
+        ).scalar()
+        with cls._lock:
+            metrics = dict(cls._metrics)
+        return {
+            'pending_events': pending,
+            'oldest_pending_at': oldest.isoformat() if oldest else None,
+            'lag_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0,
+            'failed_events': given_up,
+            'process_metrics': metrics
+        }
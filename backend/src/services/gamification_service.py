@@ -1,9 +1,25 @@
 from datetime import datetime, date, timedelta
-from src.models.learning import db, User, QuizAttempt, LearningPath, Quiz, Resource, Note
-from src.models.gamification import Achievement, UserAchievement, UserLevel, Badge, UserBadge, Leaderboard
+from src.models.user import User
+from src.models.learning import db, QuizAttempt, LearningPath, Quiz, Resource, Note
+from src.models.gamification import Achievement, UserAchievement, UserLevel, Badge, UserBadge
 from src.models.activity import UserActivity
+from src.services.achievement_rules import AchievementEngine, METRICS, achievement_key
+from src.services.activity_bitmap import ActivityBitmapService
+from src.services.catalog_cache import CatalogCache
+from src.services.leaderboard_index import LeaderboardIndex, leaderboard_period, record_level_change
+from src.services.stats_service import StatsService
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import math
 
+# Award category -> UserLevel column it accumulates in ('general' only counts towards the total)
+POINT_CATEGORIES = {
+    'learning': 'learning_points',
+    'quiz': 'quiz_points',
+    'achievement': 'achievement_points',
+    'social': 'social_points'
+}
+
 class GamificationService:
     
     @staticmethod
@@ -17,41 +33,82 @@ class GamificationService:
             return user_level
         return existing_level
     
+    @staticmethod
+    def _ensure_user_level(user_id):
+        """The user's UserLevel row, created if missing without committing; the caller's commit keeps it"""
+        user_level = UserLevel.query.filter_by(user_id=user_id).first()
+        if user_level is None:
+            db.session.execute(
+                sqlite_insert(UserLevel).values(user_id=user_id).on_conflict_do_nothing(index_elements=['user_id'])
+            )
+            user_level = UserLevel.query.filter_by(user_id=user_id).one()
+        return user_level
+    
     @staticmethod
     def award_points(user_id, points, category='general'):
         """Award points to a user and update their level"""
-        user_level = UserLevel.query.filter_by(user_id=user_id).first()
-        if not user_level:
-            user_level = GamificationService.initialize_user_level(user_id)
-        
-        # Add points to appropriate category
-        if category == 'learning':
-            user_level.learning_points += points
-        elif category == 'quiz':
-            user_level.quiz_points += points
-        elif category == 'achievement':
-            user_level.achievement_points += points
-        elif category == 'social':
-            user_level.social_points += points
-        
-        user_level.total_points += points
-        
-        # Check for level up
-        GamificationService._check_level_up(user_level)
-        
+        return GamificationService.award_points_batch(user_id, {category: points})
+    
+    @staticmethod
+    def award_points_batch(user_id, awards):
+        """Award points in several categories at once ({category: points}) with a single level update"""
+        user_level = GamificationService._add_points(user_id, awards)
         db.session.commit()
+        
+        # Points-based achievements and level badges
+        AchievementEngine.handle_event(user_id, 'points_awarded')
         return user_level
     
     @staticmethod
-    def _check_level_up(user_level):
-        """Check if user should level up and update accordingly"""
-        points_for_next_level = GamificationService._calculate_points_for_level(user_level.current_level + 1)
-        
-        while user_level.total_points >= points_for_next_level:
-            user_level.current_level += 1
-            points_for_next_level = GamificationService._calculate_points_for_level(user_level.current_level + 1)
-        
-        user_level.points_to_next_level = points_for_next_level - user_level.total_points
+    def _add_points(user_id, awards):
+        """Add points to the user's categories, total and level without committing.
+        
+        The increments are done in SQL, so concurrent awards to the same user
+        cannot overwrite each other. points_to_next_level is derived in the
+        same UPDATE; a second statement runs only when the award crosses a
+        level, while the transaction still holds the write lock.
+        """
+        awards = {category: points for category, points in awards.items() if points}
+        total = sum(awards.values())
+        for category, points in awards.items():
+            StatsService.record_points(user_id, points, category)
+        
+        values = {
+            field: getattr(UserLevel, field) + awards[category]
+            for category, field in POINT_CATEGORIES.items() if category in awards
+        }
+        values['total_points'] = UserLevel.total_points + total
+        # _calculate_points_for_level(current_level + 1) minus the new total
+        values['points_to_next_level'] = (
+            (UserLevel.current_level + 1) * (UserLevel.current_level + 1) * 100 - (UserLevel.total_points + total)
+        )
+        stmt = update(UserLevel).where(UserLevel.user_id == user_id).values(**values).returning(UserLevel)
+        
+        user_level = db.session.execute(stmt).scalar_one_or_none()
+        if user_level is None:
+            db.session.execute(
+                sqlite_insert(UserLevel).values(user_id=user_id).on_conflict_do_nothing(index_elements=['user_id'])
+            )
+            user_level = db.session.execute(stmt).scalar_one()
+        
+        if user_level.points_to_next_level <= 0:
+            level = GamificationService._level_for_points(user_level.current_level, user_level.total_points)
+            db.session.execute(
+                update(UserLevel).where(UserLevel.id == user_level.id).values(
+                    current_level=level,
+                    points_to_next_level=GamificationService._calculate_points_for_level(level + 1) - UserLevel.total_points
+                ).returning(UserLevel)
+            ).scalar_one()
+        
+        record_level_change(db.session, user_level)
+        return user_level
+    
+    @staticmethod
+    def _level_for_points(level, total_points):
+        """Level reached with total_points, starting from level; levels never go down"""
+        while total_points >= GamificationService._calculate_points_for_level(level + 1):
+            level += 1
+        return level
     
     @staticmethod
     def _calculate_points_for_level(level):
@@ -62,292 +119,157 @@ class GamificationService:
     @staticmethod
     def update_learning_streak(user_id):
         """Update user's learning streak"""
-        user_level = UserLevel.query.filter_by(user_id=user_id).first()
-        if not user_level:
-            user_level = GamificationService.initialize_user_level(user_id)
-        
-        today = date.today()
-        
-        if user_level.last_activity_date:
-            days_diff = (today - user_level.last_activity_date).days
-            
-            if days_diff == 1:
-                # Consecutive day - increment streak
-                user_level.current_learning_streak += 1
-            elif days_diff > 1:
-                # Streak broken - reset
-                user_level.current_learning_streak = 1
-            # If days_diff == 0, same day activity, don't change streak
-        else:
-            # First activity
-            user_level.current_learning_streak = 1
-        
-        # Update longest streak if current is longer
-        if user_level.current_learning_streak > user_level.longest_learning_streak:
-            user_level.longest_learning_streak = user_level.current_learning_streak
-        
-        user_level.last_activity_date = today
+        user_level = GamificationService._refresh_learning_streak(user_id, datetime.utcnow().date())
         db.session.commit()
         
         # Check for streak-based achievements
-        GamificationService.check_achievements(user_id)
+        AchievementEngine.handle_event(user_id, 'streak_updated')
         
         return user_level
     
     @staticmethod
-    def check_achievements(user_id):
-        """Check and award achievements for a user"""
-        user = User.query.get(user_id)
-        if not user:
-            return []
+    def _refresh_learning_streak(user_id, day):
+        """Mark day active and recompute the user's streaks without committing"""
+        user_level = GamificationService._ensure_user_level(user_id)
         
-        # Get all active achievements
-        achievements = Achievement.query.filter_by(is_active=True).all()
-        newly_earned = []
+        # Streaks are derived from the activity bitmap so they agree with analytics
+        ActivityBitmapService.mark_active(user_id, day)
         
-        for achievement in achievements:
-            # Check if user already has this achievement
-            existing = UserAchievement.query.filter_by(
-                user_id=user_id, 
-                achievement_id=achievement.id
-            ).first()
-            
-            if existing:
-                continue
-            
-            # Check if user meets the achievement criteria
-            if GamificationService._check_achievement_criteria(user_id, achievement):
-                # Award the achievement
-                user_achievement = UserAchievement(
-                    user_id=user_id,
-                    achievement_id=achievement.id
-                )
-                db.session.add(user_achievement)
-                
-                # Award points for the achievement
-                GamificationService.award_points(user_id, achievement.points, 'achievement')
-                
-                newly_earned.append(achievement)
+        # Events can be processed late or out of order; never move the streak back in time
+        if user_level.last_activity_date and user_level.last_activity_date > day:
+            day = user_level.last_activity_date
+        streaks = ActivityBitmapService.get_streaks(user_id, day)
+        user_level.current_learning_streak = streaks['current']
         
+        # Update longest streak if current is longer
+        if streaks['longest'] > user_level.longest_learning_streak:
+            user_level.longest_learning_streak = streaks['longest']
+        
+        user_level.last_activity_date = day
+        return user_level
+    
+    @staticmethod
+    def reset_lapsed_streaks(today=None):
+        """Zero the current streak of users with no activity yesterday or today (run after midnight UTC)"""
+        today = today or datetime.utcnow().date()
+        result = db.session.execute(
+            update(UserLevel).where(
+                UserLevel.current_learning_streak > 0,
+                or_(UserLevel.last_activity_date.is_(None), UserLevel.last_activity_date < today - timedelta(days=1))
+            ).values(current_learning_streak=0)
+        )
         db.session.commit()
-        return newly_earned
+        return result.rowcount
     
     @staticmethod
-    def _check_achievement_criteria(user_id, achievement):
-        """Check if user meets specific achievement criteria"""
-        condition_type = achievement.condition_type
-        condition_target = achievement.condition_target
-        condition_resource = achievement.condition_resource
-        
-        if condition_type == 'count':
-            if condition_resource == 'learning_paths_completed':
-                count = db.session.query(UserActivity).filter_by(
-                    user_id=user_id,
-                    activity_type='learning_path_completed'
-                ).count()
-            elif condition_resource == 'quizzes_completed':
-                count = QuizAttempt.query.filter_by(user_id=user_id).count()
-            elif condition_resource == 'resources_viewed':
-                count = db.session.query(UserActivity).filter_by(
-                    user_id=user_id,
-                    activity_type='resource_viewed'
-                ).count()
-            elif condition_resource == 'notes_created':
-                count = Note.query.filter_by(user_id=user_id).count()
-            else:
-                return False
-            
-            return count >= condition_target
-        
-        elif condition_type == 'streak':
-            user_level = UserLevel.query.filter_by(user_id=user_id).first()
-            if not user_level:
-                return False
-            
-            if condition_resource == 'learning_streak':
-                return user_level.current_learning_streak >= condition_target
-        
-        elif condition_type == 'score':
-            if condition_resource == 'average_quiz_score':
-                attempts = QuizAttempt.query.filter_by(user_id=user_id).all()
-                if not attempts:
-                    return False
-                
-                avg_score = sum(attempt.percentage for attempt in attempts) / len(attempts)
-                return avg_score >= condition_target
+    def check_achievements(user_id):
+        """Check and award achievements for a user against the whole catalog.
         
-        elif condition_type == 'time':
-            user_level = UserLevel.query.filter_by(user_id=user_id).first()
-            if not user_level:
-                return False
-            
-            if condition_resource == 'total_points':
-                return user_level.total_points >= condition_target
+        Write paths should emit an EventOutbox event instead; its consumer
+        only evaluates the rules the event can affect.
+        """
+        user = User.query.get(user_id)
+        if not user:
+            return []
         
-        return False
+        keys = [key for key in METRICS if key[0] != 'badge']
+        return AchievementEngine.evaluate(user_id, keys)['achievements']
     
     @staticmethod
     def check_badges(user_id):
         """Check and award badges for a user"""
-        badges = Badge.query.filter_by(is_active=True).all()
-        newly_earned = []
-        
-        for badge in badges:
-            # Check if user already has this badge
-            existing = UserBadge.query.filter_by(
-                user_id=user_id,
-                badge_id=badge.id
-            ).first()
-            
-            if existing:
-                continue
-            
-            # Check badge criteria (similar to achievements but simpler)
-            if GamificationService._check_badge_criteria(user_id, badge):
-                user_badge = UserBadge(
-                    user_id=user_id,
-                    badge_id=badge.id
-                )
-                db.session.add(user_badge)
-                newly_earned.append(badge)
-        
-        db.session.commit()
-        return newly_earned
+        keys = [key for key in METRICS if key[0] == 'badge']
+        return AchievementEngine.evaluate(user_id, keys)['badges']
     
     @staticmethod
-    def _check_badge_criteria(user_id, badge):
-        """Check if user meets badge criteria"""
-        condition_type = badge.condition_type
-        condition_value = badge.condition_value
-        
-        if condition_type == 'level':
-            user_level = UserLevel.query.filter_by(user_id=user_id).first()
-            return user_level and user_level.current_level >= condition_value
-        
-        elif condition_type == 'achievements':
-            achievement_count = UserAchievement.query.filter_by(user_id=user_id).count()
-            return achievement_count >= condition_value
-        
-        elif condition_type == 'points':
-            user_level = UserLevel.query.filter_by(user_id=user_id).first()
-            return user_level and user_level.total_points >= condition_value
-        
-        return False
+    def update_leaderboards():
+        """Snapshot the in-memory leaderboards for restart recovery (run every 5 minutes by the scheduler)"""
+        return LeaderboardIndex.snapshot()
     
     @staticmethod
-    def update_leaderboards():
-        """Update all leaderboards (should be run periodically)"""
-        today = date.today()
-        
-        # Weekly leaderboard (Monday to Sunday)
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        
-        # Monthly leaderboard
-        month_start = today.replace(day=1)
-        if today.month == 12:
-            month_end = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            month_end = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
-        
-        # Update weekly leaderboards
-        GamificationService._update_leaderboard_category('weekly', 'points', week_start, week_end)
-        GamificationService._update_leaderboard_category('weekly', 'quizzes', week_start, week_end)
-        
-        # Update monthly leaderboards
-        GamificationService._update_leaderboard_category('monthly', 'points', month_start, month_end)
-        GamificationService._update_leaderboard_category('monthly', 'quizzes', month_start, month_end)
-        
-        # Update all-time leaderboards
-        GamificationService._update_leaderboard_category('all_time', 'points', None, None)
-        GamificationService._update_leaderboard_category('all_time', 'streak', None, None)
+    def _leaderboard_entries(leaderboard_type, category, rows, period_start, period_end):
+        """Leaderboard entry dicts for (rank, user_id, score) rows"""
+        usernames = dict(
+            db.session.query(User.id, User.username).filter(User.id.in_([user_id for _, user_id, _ in rows]))
+        ) if rows else {}
+        
+        return [
+            {
+                'user_id': user_id,
+                'leaderboard_type': leaderboard_type,
+                'category': category,
+                'score': score,
+                'rank': rank,
+                'period_start': period_start.isoformat(),
+                'period_end': period_end.isoformat(),
+                'user': {
+                    'id': user_id,
+                    'username': usernames[user_id]
+                } if user_id in usernames else None
+            }
+            for rank, user_id, score in rows
+        ]
     
     @staticmethod
-    def _update_leaderboard_category(leaderboard_type, category, period_start, period_end):
-        """Update a specific leaderboard category"""
-        if leaderboard_type == 'all_time':
-            if category == 'points':
-                # All-time points leaderboard
-                users = db.session.query(UserLevel).order_by(UserLevel.total_points.desc()).all()
-            elif category == 'streak':
-                # All-time streak leaderboard
-                users = db.session.query(UserLevel).order_by(UserLevel.longest_learning_streak.desc()).all()
-            else:
-                return
-            
-            period_start = date(2024, 1, 1)  # Project start date
-            period_end = date.today()
-        else:
-            # For weekly/monthly, we need to calculate scores for the period
-            if category == 'points':
-                # Points earned in the period (simplified - using total points for now)
-                users = db.session.query(UserLevel).order_by(UserLevel.total_points.desc()).all()
-            elif category == 'quizzes':
-                # Quizzes completed in the period
-                users = db.session.query(UserLevel).order_by(UserLevel.quiz_points.desc()).all()
-            else:
-                return
+    def _leaderboard_response(leaderboard_type, category, user_id, rows, **extra):
+        period_start, period_end = leaderboard_period(leaderboard_type)
+        position = LeaderboardIndex.position(leaderboard_type, category, user_id)
+        user_position = None
+        if position:
+            user_position = GamificationService._leaderboard_entries(
+                leaderboard_type, category, [(position[0], user_id, position[1])], period_start, period_end
+            )[0]
         
-        # Clear existing leaderboard entries for this period
-        Leaderboard.query.filter_by(
-            leaderboard_type=leaderboard_type,
-            category=category,
-            period_start=period_start
-        ).delete()
-        
-        # Create new leaderboard entries
-        for rank, user_level in enumerate(users[:100], 1):  # Top 100
-            if category == 'points':
-                score = user_level.total_points
-            elif category == 'quizzes':
-                score = user_level.quiz_points
-            elif category == 'streak':
-                score = user_level.longest_learning_streak
-            else:
-                continue
-            
-            leaderboard_entry = Leaderboard(
-                user_id=user_level.user_id,
-                leaderboard_type=leaderboard_type,
-                category=category,
-                score=score,
-                rank=rank,
-                period_start=period_start,
-                period_end=period_end
-            )
-            db.session.add(leaderboard_entry)
-        
-        db.session.commit()
+        return {
+            'leaderboard': GamificationService._leaderboard_entries(
+                leaderboard_type, category, rows, period_start, period_end
+            ),
+            'user_position': user_position,
+            'leaderboard_type': leaderboard_type,
+            'category': category,
+            'period_start': period_start.isoformat(),
+            'total_entries': LeaderboardIndex.size(leaderboard_type, category),
+            **extra
+        }
     
     @staticmethod
-    def get_user_stats(user_id):
-        """Get comprehensive gamification stats for a user"""
-        user_level = UserLevel.query.filter_by(user_id=user_id).first()
-        if not user_level:
-            user_level = GamificationService.initialize_user_level(user_id)
-        
-        # Get achievements
+    def get_leaderboard(leaderboard_type, category, user_id, limit=50):
+        """Top entries of a leaderboard plus the user's own position, ranked over all users"""
+        rows = LeaderboardIndex.top(leaderboard_type, category, limit)
+        return GamificationService._leaderboard_response(leaderboard_type, category, user_id, rows)
+    
+    @staticmethod
+    def get_leaderboard_range(leaderboard_type, category, user_id, from_rank, to_rank):
+        """Entries ranked from_rank..to_rank (1-based, inclusive) plus the user's own position"""
+        rows = LeaderboardIndex.top(leaderboard_type, category, to_rank - from_rank + 1, offset=from_rank - 1)
+        return GamificationService._leaderboard_response(
+            leaderboard_type, category, user_id, rows, from_rank=from_rank, to_rank=to_rank
+        )
+    
+    @staticmethod
+    def get_leaderboard_context(leaderboard_type, category, user_id, radius):
+        """The user's entry with up to radius entries ranked directly above and below"""
+        rows = LeaderboardIndex.around(leaderboard_type, category, user_id, radius)
+        return GamificationService._leaderboard_response(
+            leaderboard_type, category, user_id, rows, radius=radius
+        )
+    
+    @staticmethod
+    def _earned(user_id):
+        """The user's (UserAchievement, Achievement) and (UserBadge, Badge) pairs, one query each"""
         achievements = db.session.query(UserAchievement, Achievement).join(
             Achievement
         ).filter(UserAchievement.user_id == user_id).all()
         
-        # Get badges
         badges = db.session.query(UserBadge, Badge).join(
             Badge
         ).filter(UserBadge.user_id == user_id).all()
         
-        # Get leaderboard positions
-        leaderboard_positions = {}
-        for lb_type in ['weekly', 'monthly', 'all_time']:
-            for category in ['points', 'quizzes', 'streak']:
-                entry = Leaderboard.query.filter_by(
-                    user_id=user_id,
-                    leaderboard_type=lb_type,
-                    category=category
-                ).first()
-                if entry:
-                    leaderboard_positions[f"{lb_type}_{category}"] = entry.rank
-        
+        return achievements, badges
+    
+    @staticmethod
+    def profile(user_level, achievements, badges, leaderboard_positions):
+        """Profile section: level, earned achievement and badge pairs, leaderboard positions"""
         return {
             'level': user_level.to_dict(),
             'achievements': [
@@ -366,4 +288,125 @@ class GamificationService:
             ],
             'leaderboard_positions': leaderboard_positions
         }
+    
+    @staticmethod
+    def get_user_stats(user_id):
+        """Get comprehensive gamification stats for a user"""
+        user_level = UserLevel.query.filter_by(user_id=user_id).first()
+        if not user_level:
+            user_level = GamificationService.initialize_user_level(user_id)
+        
+        achievements, badges = GamificationService._earned(user_id)
+        return GamificationService.profile(user_level, achievements, badges, LeaderboardIndex.positions(user_id))
+    
+    @staticmethod
+    def achievement_list(catalog, user_achievements, progress_values):
+        """Active achievements with the user's earned state and progress, earned first"""
+        achievement_list = []
+        for achievement in catalog.achievements:
+            achievement_dict = achievement.to_dict()
+            user_achievement = user_achievements.get(achievement.id)
+            
+            achievement_dict['earned'] = user_achievement is not None
+            achievement_dict['earned_at'] = user_achievement.earned_at.isoformat() if user_achievement else None
+            achievement_dict['progress'] = user_achievement.progress_value if user_achievement else 0
+            
+            # Calculate current progress for unearned achievements
+            if not achievement_dict['earned']:
+                progress = progress_values.get(achievement_key(achievement)) or 0
+                achievement_dict['progress'] = progress
+                achievement_dict['progress_percentage'] = min(100, (progress / achievement.condition_target) * 100)
+            else:
+                achievement_dict['progress_percentage'] = 100
+            
+            achievement_list.append(achievement_dict)
+        
+        # Sort by earned status and then by category
+        achievement_list.sort(key=lambda x: (not x['earned'], x['category'], x['name']))
+        return achievement_list
+    
+    @staticmethod
+    def badge_list(catalog, user_badges):
+        """Active badges with the user's earned state, earned first"""
+        badge_list = []
+        for badge in catalog.badges:
+            badge_dict = badge.to_dict()
+            user_badge = user_badges.get(badge.id)
+            
+            badge_dict['earned'] = user_badge is not None
+            badge_dict['earned_at'] = user_badge.earned_at.isoformat() if user_badge else None
+            
+            badge_list.append(badge_dict)
+        
+        # Sort by earned status and then by category
+        badge_list.sort(key=lambda x: (not x['earned'], x['category'], x['name']))
+        return badge_list
+    
+    @staticmethod
+    def level_progress(user_level):
+        """Points into the current level and needed for the next one"""
+        current_level_points = GamificationService._calculate_points_for_level(user_level.current_level)
+        next_level_points = GamificationService._calculate_points_for_level(user_level.current_level + 1)
+        progress_in_level = user_level.total_points - current_level_points
+        points_needed_for_level = next_level_points - current_level_points
+        progress_percentage = (progress_in_level / points_needed_for_level) * 100
+        
+        return {
+            'level_info': user_level.to_dict(),
+            'progress': {
+                'current_level_points': current_level_points,
+                'next_level_points': next_level_points,
+                'progress_in_level': progress_in_level,
+                'points_needed_for_level': points_needed_for_level,
+                'progress_percentage': progress_percentage
+            }
+        }
+    
+    @staticmethod
+    def stats_summary(user_level, catalog, achievements_count, badges_count, leaderboard_positions):
+        """Headline numbers: level, points, completion rates, streaks and leaderboard positions"""
+        total_achievements = len(catalog.achievements)
+        total_badges = len(catalog.badges)
+        
+        return {
+            'level': user_level.current_level,
+            'total_points': user_level.total_points,
+            'achievements_earned': achievements_count,
+            'total_achievements': total_achievements,
+            'achievement_completion_rate': (achievements_count / total_achievements * 100) if total_achievements > 0 else 0,
+            'badges_earned': badges_count,
+            'total_badges': total_badges,
+            'badge_completion_rate': (badges_count / total_badges * 100) if total_badges > 0 else 0,
+            'current_streak': user_level.current_learning_streak,
+            'longest_streak': user_level.longest_learning_streak,
+            'leaderboard_positions': leaderboard_positions
+        }
+    
+    @staticmethod
+    def get_overview(user_id):
+        """Every section of the gamification page from one load of the user's data.
+        
+        Reads the user's counters and level in one query and their earned
+        achievements and badges in one query each; the catalogs and
+        leaderboard positions come from the in-process caches.
+        """
+        state = AchievementEngine.progress_state(user_id)
+        user_level = state[1]
+        achievements, badges = GamificationService._earned(user_id)
+        leaderboard_positions = LeaderboardIndex.positions(user_id)
+        catalog = CatalogCache.get()
+        
+        return {
+            'profile': GamificationService.profile(user_level, achievements, badges, leaderboard_positions),
+            'achievements': GamificationService.achievement_list(
+                catalog,
+                {ua.achievement_id: ua for ua, _ in achievements},
+                AchievementEngine.progress_values(user_id, state)
+            ),
+            'badges': GamificationService.badge_list(catalog, {ub.badge_id: ub for ub, _ in badges}),
+            'stats': GamificationService.stats_summary(
+                user_level, catalog, len(achievements), len(badges), leaderboard_positions
+            ),
+            'level_progress': GamificationService.level_progress(user_level)
+        }
 
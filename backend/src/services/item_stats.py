@@ -0,0 +1,185 @@
+import math
+from datetime import datetime
+from sqlalchemy import case, delete, func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.analytics import QuestionStats
+from src.models.learning import Quiz, Question, QuizAttempt, QuestionResult
+from src.services.answer_keys import AnswerKeyCache
+
+STAT_FIELDS = (
+    'attempts', 'correct_count', 'rest_score_sum', 'rest_score_sq_sum', 'rest_score_correct_sum', 'seconds_sum'
+)
+
+
+def _rest_score(earned_points, total_points, question_points, points_earned):
+    """Percentage on the attempt's other questions"""
+    rest_total = total_points - question_points
+    return (earned_points - points_earned) / rest_total * 100 if rest_total > 0 else 0.0
+
+
+def item_statistics(stats):
+    """Difficulty (share answered correctly) and point-biserial discrimination from the running sums"""
+    attempts = stats.attempts or 0
+    correct = stats.correct_count or 0
+    if not attempts:
+        return None, None, None
+
+    difficulty = correct / attempts
+    mean = stats.rest_score_sum / attempts
+    variance = stats.rest_score_sq_sum / attempts - mean * mean
+    discrimination = None
+    if 0 < correct < attempts and variance > 1e-9:
+        mean_correct = stats.rest_score_correct_sum / correct
+        mean_incorrect = (stats.rest_score_sum - stats.rest_score_correct_sum) / (attempts - correct)
+        discrimination = (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(difficulty * (1 - difficulty))
+    return difficulty, discrimination, stats.seconds_sum / attempts
+
+
+class ItemStatsService:
+    """Per-question item statistics for quiz authors, kept as running sums in question_stats.
+
+    Each submission adds its graded questions to the sums in one upsert,
+    committed with the attempt, so item analysis reads one row per
+    question. Discrimination is the point-biserial correlation between
+    getting the item right and the attempt's score on the other questions.
+    rebuild() recomputes the sums from question_results.
+    """
+
+    CHUNK_SIZE = 200  # Quizzes per rebuild transaction
+    MIN_ATTEMPTS = 10  # Before questions are flagged
+    EASY_ABOVE = 0.9
+    HARD_BELOW = 0.3
+    LOW_DISCRIMINATION = 0.2
+
+    @staticmethod
+    def record_attempt(quiz_id, graded, earned_points, total_points, seconds):
+        """Stage the submitted attempt's contribution to each question's sums; the caller commits"""
+        if not graded:
+            return
+        stmt = sqlite_insert(QuestionStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['question_id'],
+            set_={
+                **{field: getattr(QuestionStats, field) + stmt.excluded[field] for field in STAT_FIELDS},
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        now = datetime.utcnow()
+        seconds_per_question = (seconds or 0) / len(graded)
+        rows = []
+        for result in graded:
+            rest = _rest_score(earned_points, total_points, result.question.points, result.points_earned)
+            rows.append({
+                'question_id': result.question.id,
+                'quiz_id': quiz_id,
+                'attempts': 1,
+                'correct_count': 1 if result.is_correct else 0,
+                'rest_score_sum': rest,
+                'rest_score_sq_sum': rest * rest,
+                'rest_score_correct_sum': rest if result.is_correct else 0.0,
+                'seconds_sum': seconds_per_question,
+                'updated_at': now
+            })
+        db.session.execute(stmt, rows)
+
+    @staticmethod
+    def item_analysis(quiz_id):
+        """Statistics for each of the quiz's current questions, in display order"""
+        answer_key = AnswerKeyCache.get(quiz_id)
+        stats = {row.question_id: row for row in QuestionStats.query.filter(QuestionStats.quiz_id == quiz_id)}
+
+        items = []
+        for question in answer_key.questions:
+            row = stats.get(question.id)
+            attempts = row.attempts if row else 0
+            difficulty, discrimination, mean_seconds = item_statistics(row) if row else (None, None, None)
+
+            flags = []
+            if attempts >= ItemStatsService.MIN_ATTEMPTS:
+                if difficulty > ItemStatsService.EASY_ABOVE:
+                    flags.append('too_easy')
+                elif difficulty < ItemStatsService.HARD_BELOW:
+                    flags.append('too_hard')
+                if discrimination is not None and discrimination < 0:
+                    flags.append('negative_discrimination')  # Stronger students miss it more: check the answer key
+                elif discrimination is not None and discrimination < ItemStatsService.LOW_DISCRIMINATION:
+                    flags.append('low_discrimination')
+
+            items.append({
+                'question_id': question.id,
+                'question_text': question.data['question_text'],
+                'question_type': question.data['question_type'],
+                'order_index': question.data['order_index'],
+                'points': question.points,
+                'attempts': attempts,
+                'correct_count': row.correct_count if row else 0,
+                'difficulty': round(difficulty, 3) if difficulty is not None else None,
+                'discrimination': round(discrimination, 3) if discrimination is not None else None,
+                'mean_seconds': round(mean_seconds, 1) if mean_seconds is not None else None,
+                'flags': flags
+            })
+        return {
+            'quiz_id': quiz_id,
+            'min_attempts_for_flags': ItemStatsService.MIN_ATTEMPTS,
+            'questions': items
+        }
+
+    @staticmethod
+    def _rebuild_range(first_quiz_id, last_quiz_id):
+        in_range = Question.quiz_id.between(first_quiz_id, last_quiz_id)
+        attempt_sizes = select(
+            QuestionResult.attempt_id.label('attempt_id'), func.count(QuestionResult.id).label('questions')
+        ).join(
+            Question, Question.id == QuestionResult.question_id
+        ).where(in_range).group_by(QuestionResult.attempt_id).subquery()
+
+        rest_total = QuizAttempt.max_score - Question.points
+        rest = case(
+            (rest_total > 0, (QuizAttempt.score - QuestionResult.points_earned) * 100.0 / rest_total), else_=0.0
+        )
+        seconds = (
+            (func.julianday(QuizAttempt.completed_at) - func.julianday(QuizAttempt.started_at)) * 86400.0
+            / attempt_sizes.c.questions
+        )
+        sums = select(
+            QuestionResult.question_id,
+            Question.quiz_id,
+            func.count(QuestionResult.id),
+            func.sum(case((QuestionResult.is_correct, 1), else_=0)),
+            func.sum(rest),
+            func.sum(rest * rest),
+            func.sum(case((QuestionResult.is_correct, rest), else_=0.0)),
+            func.coalesce(func.sum(seconds), 0.0),
+            literal(datetime.utcnow())
+        ).select_from(QuestionResult).join(
+            Question, Question.id == QuestionResult.question_id
+        ).join(
+            QuizAttempt, QuizAttempt.id == QuestionResult.attempt_id
+        ).join(
+            attempt_sizes, attempt_sizes.c.attempt_id == QuestionResult.attempt_id
+        ).where(in_range).group_by(QuestionResult.question_id)
+
+        db.session.execute(delete(QuestionStats).where(QuestionStats.quiz_id.between(first_quiz_id, last_quiz_id)))
+        written = db.session.execute(
+            sqlite_insert(QuestionStats).from_select(['question_id', 'quiz_id', *STAT_FIELDS, 'updated_at'], sums)
+        ).rowcount
+        db.session.commit()
+        return written
+
+    @staticmethod
+    def rebuild(quiz_id=None, chunk_size=None):
+        """Recompute question_stats from question_results, in quiz id ranges; returns rows written"""
+        if quiz_id is not None:
+            return ItemStatsService._rebuild_range(quiz_id, quiz_id)
+
+        chunk_size = chunk_size or ItemStatsService.CHUNK_SIZE
+        written = 0
+        after_quiz_id = 0
+        while True:
+            ids = select(Quiz.id).where(Quiz.id > after_quiz_id).order_by(Quiz.id).limit(chunk_size).subquery()
+            last_quiz_id, quizzes = db.session.query(func.max(ids.c.id), func.count(ids.c.id)).one()
+            if not quizzes:
+                return written
+            written += ItemStatsService._rebuild_range(after_quiz_id + 1, last_quiz_id)
+            after_quiz_id = last_quiz_id
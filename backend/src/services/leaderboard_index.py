@@ -0,0 +1,497 @@
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from sqlalchemy import event, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from src.database import db
+from src.models.analytics import ACTIVITY_EPOCH, UserDailyStats
+from src.models.gamification import LeaderboardSnapshot, UserLevel
+from src.utils.skiplist import IndexableSkipList
+
+# Lifetime board -> UserLevel attribute holding the score
+BOARD_SCORES = {
+    'points': 'total_points',
+    'streak': 'longest_learning_streak'
+}
+
+# Period board category -> UserDailyStats counter summed over the period
+PERIOD_SCORES = {
+    'points': 'points_earned',
+    'quizzes': 'quizzes_taken'
+}
+
+PERIOD_TYPES = ('weekly', 'monthly')
+
+LEADERBOARDS = [('all_time', category) for category in BOARD_SCORES] + [
+    (leaderboard_type, category) for leaderboard_type in PERIOD_TYPES for category in PERIOD_SCORES
+]
+
+USER_SPACE = 1 << 32  # Ranking keys pack (score descending, user id ascending) into one int
+
+
+def leaderboard_period(leaderboard_type, today=None):
+    """(period_start, period_end) of the current weekly, monthly or all-time leaderboard (UTC days, like the rollup)"""
+    today = today or datetime.utcnow().date()
+    if leaderboard_type == 'weekly':
+        # Monday to Sunday
+        week_start = today - timedelta(days=today.weekday())
+        return week_start, week_start + timedelta(days=6)
+    if leaderboard_type == 'monthly':
+        month_start = today.replace(day=1)
+        if today.month == 12:
+            month_end = today.replace(year=today.year + 1, month=1, day=1) - timedelta(days=1)
+        else:
+            month_end = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
+        return month_start, month_end
+    return ACTIVITY_EPOCH, today  # Project start date
+
+
+class Board:
+    """One ranking: a skip list of packed keys plus each user's current score"""
+
+    def __init__(self, keys=()):
+        """keys: packed ranking keys in ascending order"""
+        self.entries = IndexableSkipList.from_sorted(keys)
+        self.scores = {key % USER_SPACE: -(key // USER_SPACE) for key in keys}
+
+    @staticmethod
+    def _key(user_id, score):
+        return -score * USER_SPACE + user_id
+
+    @staticmethod
+    def _unpack(key):
+        return -(key // USER_SPACE), key % USER_SPACE
+
+    @classmethod
+    def from_scores(cls, scores):
+        """Build from (user_id, score) pairs in O(n log n)"""
+        return cls(sorted(cls._key(user_id, score or 0) for user_id, score in scores))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(array('q', data))
+
+    def to_bytes(self):
+        return array('q', self.entries).tobytes()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def set(self, user_id, score):
+        score = score or 0
+        previous = self.scores.get(user_id)
+        if previous == score:
+            return
+        if previous is not None:
+            self.entries.remove(self._key(user_id, previous))
+        self.entries.insert(self._key(user_id, score))
+        self.scores[user_id] = score
+
+    def discard(self, user_id):
+        previous = self.scores.pop(user_id, None)
+        if previous is not None:
+            self.entries.remove(self._key(user_id, previous))
+
+    def rank(self, user_id):
+        """1-based rank, or None if the user is not on the board"""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.entries.index(self._key(user_id, score)) + 1
+
+    def page(self, start, stop):
+        """(rank, user_id, score) for 0-based positions start..stop-1"""
+        return [
+            (position + 1, user_id, score)
+            for position, (score, user_id) in enumerate(map(self._unpack, self.entries.slice(start, stop)), start)
+        ]
+
+
+class LeaderboardIndex:
+    """Per-process rankings, kept in memory and updated in place.
+
+    All-time boards rank every user with a level. Committed UserLevel
+    changes made through this process's session are applied straight
+    away; changes from other processes and bulk SQL updates are picked up
+    by replaying rows whose updated_at moved, at most every SYNC_SECONDS.
+    They are restored from the latest snapshot (or built from user_levels)
+    and then caught up.
+
+    Weekly and monthly boards rank the users active in the period by range
+    sums over user_daily_stats, refreshed for the users whose rollup rows
+    changed on the same schedule, and rebuilt when a new period starts.
+
+    Boards are built and caught up outside the lock, one build per board
+    and one catch-up per kind of board at a time; readers of a board being
+    built wait for that build only, and readers arriving during a catch-up
+    use the boards as they are. warm() builds
+    every board in a background thread when a worker starts. A board costs
+    about 340 bytes per ranked user in every process: ~680 MB per worker
+    for the two all-time boards at 1M users (benchmark in
+    tests/test_leaderboard_index.py).
+    """
+
+    SYNC_SECONDS = 5
+    CATCH_UP_OVERLAP = timedelta(minutes=1)  # Re-read recent rows in case a slow transaction committed late
+    SUM_BATCH_SIZE = 500
+
+    _lock = threading.RLock()  # Guards the loaded boards and watermarks; not held while querying
+    _catching_up = threading.Lock()
+    _catching_up_periods = threading.Lock()
+    _applied_while_catching_up = None  # User ids apply() set during an all-time catch-up's query
+    _loading = {}  # 'all_time' or (leaderboard type, category) -> Event set when its build finishes
+    _warm_thread = None
+    _boards = None  # board name -> Board
+    _watermark = None  # Latest UserLevel.updated_at replayed
+    _synced_at = 0.0
+    _period_boards = {}  # (leaderboard type, category) -> (period_start, Board)
+    _stats_watermark = None  # Latest UserDailyStats.updated_at replayed
+    _periods_synced_at = 0.0
+
+    @staticmethod
+    def _level_rows(since=None):
+        query = db.session.query(
+            UserLevel.user_id, UserLevel.updated_at,
+            *(getattr(UserLevel, column) for column in BOARD_SCORES.values())
+        )
+        if since is not None:
+            query = query.filter(UserLevel.updated_at >= since)
+        return query.all()
+
+    @staticmethod
+    def _period_sums(category, period_start, user_ids=None):
+        """(user_id, total) over the period's rollup rows, for all active users or just user_ids"""
+        total = func.sum(getattr(UserDailyStats, PERIOD_SCORES[category]))
+        query = db.session.query(UserDailyStats.user_id, total).filter(UserDailyStats.date >= period_start)
+        if user_ids is None:
+            return query.group_by(UserDailyStats.user_id).having(total > 0).all()
+
+        sums = []
+        for offset in range(0, len(user_ids), LeaderboardIndex.SUM_BATCH_SIZE):
+            batch = user_ids[offset:offset + LeaderboardIndex.SUM_BATCH_SIZE]
+            sums.extend(query.filter(UserDailyStats.user_id.in_(batch)).group_by(UserDailyStats.user_id).all())
+        return sums
+
+    @classmethod
+    def _build_once(cls, name, build):
+        """Run build() unless another thread is already building `name`, in which case wait for it"""
+        with cls._lock:
+            loading = cls._loading.get(name)
+            building = loading is None
+            if building:
+                loading = cls._loading[name] = threading.Event()
+        if not building:
+            loading.wait()
+            return
+        try:
+            build()
+        finally:
+            with cls._lock:
+                cls._loading.pop(name, None)
+            loading.set()
+
+    @classmethod
+    def _load(cls):
+        """Build the all-time boards from the snapshots or user_levels, then install and catch them up"""
+        snapshots = {snapshot.board: snapshot for snapshot in LeaderboardSnapshot.query.all()}
+        if set(snapshots) >= set(BOARD_SCORES):
+            boards = {name: Board.from_bytes(snapshots[name].data) for name in BOARD_SCORES}
+            watermarks = [snapshots[name].watermark for name in BOARD_SCORES]
+            watermark = None if None in watermarks else min(watermarks)
+        else:
+            rows = cls._level_rows()
+            boards = {
+                name: Board.from_scores((row[0], row[index]) for row in rows)
+                for index, name in enumerate(BOARD_SCORES, 2)
+            }
+            watermark = max((row[1] for row in rows if row[1]), default=None)
+
+        with cls._lock:
+            cls._boards = boards
+            cls._watermark = watermark
+        cls._catch_up()  # Rows committed while the boards were built
+
+    @classmethod
+    def _load_period(cls, leaderboard_type, category, period_start):
+        """Build a period board from the rollup, then install it"""
+        if cls._stats_watermark is None:
+            latest = db.session.query(func.max(UserDailyStats.updated_at)).scalar()
+            with cls._lock:
+                if cls._stats_watermark is None:
+                    # Rollup changes from here on are replayed by _catch_up_periods
+                    cls._stats_watermark = latest
+                    cls._periods_synced_at = time.monotonic()
+        board = Board.from_scores(cls._period_sums(category, period_start))
+        with cls._lock:
+            cls._period_boards[(leaderboard_type, category)] = (period_start, board)
+
+    @classmethod
+    def _catch_up(cls, wait=True):
+        """Replay user_levels rows changed since the watermark: query without the lock, then apply under it.
+
+        With wait=False, return straight away if another thread is already catching up.
+        """
+        if not cls._catching_up.acquire(blocking=wait):
+            return
+        try:
+            with cls._lock:
+                watermark = cls._watermark
+                cls._applied_while_catching_up = set()
+            try:
+                rows = cls._level_rows(watermark - cls.CATCH_UP_OVERLAP if watermark else None)
+            except Exception:
+                with cls._lock:
+                    cls._applied_while_catching_up = None
+                raise
+
+            with cls._lock:
+                # Scores committed in this process after the query are newer than its rows
+                applied = cls._applied_while_catching_up
+                cls._applied_while_catching_up = None
+                if cls._boards is None:  # reset() while querying
+                    return
+                for row in rows:
+                    if row[0] not in applied:
+                        for index, name in enumerate(BOARD_SCORES, 2):
+                            cls._boards[name].set(row[0], row[index])
+                    if row[1] and (cls._watermark is None or row[1] > cls._watermark):
+                        cls._watermark = row[1]
+                cls._synced_at = time.monotonic()
+        finally:
+            cls._catching_up.release()
+
+    @classmethod
+    def _catch_up_periods(cls, wait=True):
+        """Recompute period totals for the users whose rollup rows changed since the watermark.
+
+        Queries run without the lock; boards rebuilt in the meantime are left alone.
+        """
+        if not cls._catching_up_periods.acquire(blocking=wait):
+            return
+        try:
+            with cls._lock:
+                cls._periods_synced_at = time.monotonic()
+                boards = dict(cls._period_boards)
+                watermark = cls._stats_watermark
+            if not boards:
+                return
+
+            earliest = min(period_start for period_start, _ in boards.values())
+            query = db.session.query(UserDailyStats.user_id, func.max(UserDailyStats.updated_at)).filter(
+                UserDailyStats.date >= earliest
+            )
+            if watermark:
+                query = query.filter(UserDailyStats.updated_at >= watermark - cls.CATCH_UP_OVERLAP)
+            changed = query.group_by(UserDailyStats.user_id).all()
+            if not changed:
+                return
+
+            user_ids = [user_id for user_id, _ in changed]
+            totals = {
+                (leaderboard_type, category): dict(cls._period_sums(category, period_start, user_ids))
+                for (leaderboard_type, category), (period_start, _) in boards.items()
+            }
+
+            with cls._lock:
+                for key, (_, board) in boards.items():
+                    current = cls._period_boards.get(key)
+                    if current is None or current[1] is not board:
+                        continue
+                    for user_id in user_ids:
+                        if totals[key].get(user_id, 0) > 0:
+                            board.set(user_id, totals[key][user_id])
+                        else:
+                            board.discard(user_id)
+
+                latest = max(updated_at for _, updated_at in changed if updated_at)
+                if cls._stats_watermark is None or latest > cls._stats_watermark:
+                    cls._stats_watermark = latest
+        finally:
+            cls._catching_up_periods.release()
+
+    @classmethod
+    def _ensure_loaded(cls, *leaderboards):
+        """Build whichever of the (leaderboard type, category) boards are missing and catch up the loaded
+        ones when due; call without the lock"""
+        for leaderboard_type, category in leaderboards:
+            if leaderboard_type == 'all_time':
+                if cls._boards is None:
+                    cls._build_once('all_time', cls._load)
+            elif leaderboard_type in PERIOD_TYPES and category in PERIOD_SCORES:
+                period_start, _ = leaderboard_period(leaderboard_type)
+                cached = cls._period_boards.get((leaderboard_type, category))
+                if not cached or cached[0] != period_start:
+                    cls._build_once(
+                        (leaderboard_type, category),
+                        lambda: cls._load_period(leaderboard_type, category, period_start)
+                    )
+
+        now = time.monotonic()
+        types = {leaderboard_type for leaderboard_type, _ in leaderboards}
+        if 'all_time' in types and cls._boards is not None and now - cls._synced_at >= cls.SYNC_SECONDS:
+            cls._catch_up(wait=False)
+        if types & set(PERIOD_TYPES) and now - cls._periods_synced_at >= cls.SYNC_SECONDS:
+            cls._catch_up_periods(wait=False)
+
+    @classmethod
+    def _board(cls, leaderboard_type, category):
+        """The loaded board or None; call with the lock held, after _ensure_loaded"""
+        if leaderboard_type == 'all_time':
+            return cls._boards.get(category) if cls._boards is not None else None
+        cached = cls._period_boards.get((leaderboard_type, category))
+        return cached[1] if cached else None
+
+    @classmethod
+    def warm(cls, app):
+        """Build every board in a background thread, once per process, so requests don't wait for the first build"""
+        if cls._warm_thread is not None:
+            return
+        with cls._lock:
+            if cls._warm_thread is not None:
+                return
+            cls._warm_thread = threading.Thread(target=cls._warm, args=(app,), name='leaderboard-warmup', daemon=True)
+        cls._warm_thread.start()
+
+    @classmethod
+    def _warm(cls, app):
+        with app.app_context():
+            try:
+                cls._ensure_loaded(*LEADERBOARDS)
+            except Exception as e:
+                app.logger.warning(f"Leaderboard warm-up failed: {str(e)}")
+
+    @classmethod
+    def top(cls, leaderboard_type, category, limit, offset=0):
+        """(rank, user_id, score) rows for ranks offset+1..offset+limit"""
+        cls._ensure_loaded((leaderboard_type, category))
+        with cls._lock:
+            board = cls._board(leaderboard_type, category)
+            return board.page(offset, offset + limit) if board else []
+
+    @classmethod
+    def position(cls, leaderboard_type, category, user_id):
+        """(rank, score) for a user, or None if they are not ranked"""
+        cls._ensure_loaded((leaderboard_type, category))
+        with cls._lock:
+            board = cls._board(leaderboard_type, category)
+            rank = board.rank(user_id) if board else None
+            return (rank, board.scores[user_id]) if rank else None
+
+    @classmethod
+    def around(cls, leaderboard_type, category, user_id, radius):
+        """Rows for the users ranked within radius places of user_id"""
+        cls._ensure_loaded((leaderboard_type, category))
+        with cls._lock:
+            board = cls._board(leaderboard_type, category)
+            rank = board.rank(user_id) if board else None
+            if rank is None:
+                return []
+            return board.page(max(rank - 1 - radius, 0), rank + radius)
+
+    @classmethod
+    def size(cls, leaderboard_type, category):
+        cls._ensure_loaded((leaderboard_type, category))
+        with cls._lock:
+            board = cls._board(leaderboard_type, category)
+            return len(board) if board else 0
+
+    @classmethod
+    def positions(cls, user_id):
+        """{'<type>_<category>': rank} for every leaderboard the user is on"""
+        cls._ensure_loaded(*LEADERBOARDS)
+        with cls._lock:
+            boards = [
+                (f"{leaderboard_type}_{category}", cls._board(leaderboard_type, category))
+                for leaderboard_type, category in LEADERBOARDS
+            ]
+            ranks = {key: board.rank(user_id) for key, board in boards if board}
+        return {key: rank for key, rank in ranks.items() if rank is not None}
+
+    @classmethod
+    def apply(cls, changes):
+        """Apply committed scores ({user_id: {board: score}}, None for a deleted row) to loaded boards"""
+        with cls._lock:
+            if cls._boards is None:
+                return
+            if cls._applied_while_catching_up is not None:
+                cls._applied_while_catching_up.update(changes)
+            for user_id, scores in changes.items():
+                for name, board in cls._boards.items():
+                    if scores is None:
+                        board.discard(user_id)
+                    else:
+                        board.set(user_id, scores[name])
+
+    @classmethod
+    def snapshot(cls):
+        """Write every board to leaderboard_snapshots; returns {board: entries}"""
+        now = datetime.utcnow()
+        cls._ensure_loaded(*(('all_time', name) for name in BOARD_SCORES))
+        cls._catch_up()
+        with cls._lock:
+            rows = [
+                {
+                    'board': name, 'entries': len(board), 'data': board.to_bytes(),
+                    'watermark': cls._watermark, 'created_at': now, 'updated_at': now
+                }
+                for name, board in cls._boards.items()
+            ]
+
+        stmt = sqlite_insert(LeaderboardSnapshot)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['board'],
+            set_={
+                'entries': stmt.excluded.entries,
+                'data': stmt.excluded.data,
+                'watermark': stmt.excluded.watermark,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        db.session.execute(stmt, rows)
+        db.session.commit()
+        return {row['board']: row['entries'] for row in rows}
+
+    @classmethod
+    def reset(cls):
+        """Forget the in-memory boards; the next read reloads them"""
+        with cls._lock:
+            cls._boards = None
+            cls._watermark = None
+            cls._period_boards = {}
+            cls._stats_watermark = None
+
+
+def record_level_change(session, user_level):
+    """Queue a UserLevel row's scores for the boards once the session commits.
+
+    Flushed ORM changes are collected automatically; callers that update
+    user_levels with an UPDATE ... RETURNING pass the returned row here.
+    """
+    session.info.setdefault('leaderboard_changes', {})[user_level.user_id] = {
+        name: getattr(user_level, column) for name, column in BOARD_SCORES.items()
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_leaderboard_changes(session, flush_context):
+    """Remember the scores of flushed UserLevel rows"""
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, UserLevel) and obj.user_id is not None:
+            record_level_change(session, obj)
+    for obj in session.deleted:
+        if isinstance(obj, UserLevel) and obj.user_id is not None:
+            session.info.setdefault('leaderboard_changes', {})[obj.user_id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_leaderboard_changes(session):
+    changes = session.info.pop('leaderboard_changes', None)
+    if changes:
+        LeaderboardIndex.apply(changes)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_leaderboard_changes(session, previous_transaction):
+    session.info.pop('leaderboard_changes', None)
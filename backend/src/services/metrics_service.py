@@ -0,0 +1,184 @@
+from datetime import datetime
+from sqlalchemy import case, func, literal, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.activity import UserActivity
+from src.models.analytics import UserMetrics
+from src.models.gamification import UserAchievement
+from src.models.learning import QuizAttempt, Note
+from src.models.user import User
+
+# Activity type -> user_metrics column it counts
+ACTIVITY_COUNTERS = {
+    'resource_viewed': 'resources_viewed',
+    'learning_path_completed': 'paths_completed',
+}
+
+METRIC_FIELDS = (
+    'quizzes_completed', 'quiz_score_sum', 'notes_created',
+    'resources_viewed', 'paths_completed', 'achievements_earned'
+)
+
+
+class MetricsService:
+    """Maintains each user's lifetime counters (user_metrics) for achievement progress.
+
+    Like StatsService, the record_* methods stage an atomic upsert on the
+    current session and the caller's commit makes it durable with the
+    write it counts. reconcile() recomputes the counters from the source
+    tables and repairs any drift.
+
+    A row created by an increment holds only the counts since it was
+    created (e.g. the user's first write after the table was introduced),
+    so its reconciled_at stays NULL and readers count from the source
+    tables until reconcile() has filled it in.
+    """
+
+    CHUNK_SIZE = 5000
+
+    @staticmethod
+    def _increment(user_id, **deltas):
+        stmt = sqlite_insert(UserMetrics).values(user_id=user_id, updated_at=datetime.utcnow(), **deltas)
+        update_values = {
+            field: getattr(UserMetrics, field) + stmt.excluded[field]
+            for field in deltas
+        }
+        update_values['updated_at'] = stmt.excluded.updated_at
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['user_id'], set_=update_values))
+
+    @staticmethod
+    def record_activity(user_id, activity_type):
+        """Count a logged activity if it feeds a counter"""
+        field = ACTIVITY_COUNTERS.get(activity_type)
+        if field:
+            MetricsService._increment(user_id, **{field: 1})
+
+    @staticmethod
+    def record_quiz_submitted(user_id, percentage):
+        MetricsService._increment(user_id, quizzes_completed=1, quiz_score_sum=percentage or 0.0)
+
+    @staticmethod
+    def record_note(user_id, delta=1):
+        """Count a created (delta=1) or deleted (delta=-1) note"""
+        MetricsService._increment(user_id, notes_created=delta)
+
+    @staticmethod
+    def record_achievements(user_id, count):
+        if count:
+            MetricsService._increment(user_id, achievements_earned=count)
+
+    @staticmethod
+    def record_achievements_bulk(user_ids, now=None):
+        """One achievement each for many users, in a single executemany upsert"""
+        if not user_ids:
+            return
+        stmt = sqlite_insert(UserMetrics)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={
+                'achievements_earned': UserMetrics.achievements_earned + stmt.excluded.achievements_earned,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        now = now or datetime.utcnow()
+        db.session.execute(stmt, [
+            {
+                'user_id': user_id, 'quizzes_completed': 0, 'quiz_score_sum': 0.0, 'notes_created': 0,
+                'resources_viewed': 0, 'paths_completed': 0, 'achievements_earned': 1, 'updated_at': now
+            }
+            for user_id in user_ids
+        ])
+
+    @staticmethod
+    def _source_counts(first_user_id, last_user_id, now):
+        """SELECT of (user_id, *METRIC_FIELDS, updated_at, reconciled_at) computed from the source tables"""
+        activity = select(
+            UserActivity.user_id.label('user_id'),
+            *[
+                func.sum(case((UserActivity.activity_type == activity_type, 1), else_=0)).label(field)
+                for activity_type, field in ACTIVITY_COUNTERS.items()
+            ]
+        ).where(
+            UserActivity.user_id.between(first_user_id, last_user_id),
+            UserActivity.activity_type.in_(list(ACTIVITY_COUNTERS))
+        ).group_by(UserActivity.user_id).subquery()
+
+        quizzes = select(
+            QuizAttempt.user_id.label('user_id'),
+            func.count(QuizAttempt.id).label('quizzes_completed'),
+            func.sum(QuizAttempt.percentage).label('quiz_score_sum')
+        ).where(
+            QuizAttempt.user_id.between(first_user_id, last_user_id),
+            QuizAttempt.completed_at.isnot(None)
+        ).group_by(QuizAttempt.user_id).subquery()
+
+        notes = select(Note.user_id.label('user_id'), func.count(Note.id).label('notes_created')).where(
+            Note.user_id.between(first_user_id, last_user_id)
+        ).group_by(Note.user_id).subquery()
+
+        achievements = select(
+            UserAchievement.user_id.label('user_id'), func.count(UserAchievement.id).label('achievements_earned')
+        ).where(
+            UserAchievement.user_id.between(first_user_id, last_user_id)
+        ).group_by(UserAchievement.user_id).subquery()
+
+        sources = {'quizzes_completed': quizzes, 'quiz_score_sum': quizzes, 'notes_created': notes,
+                   'achievements_earned': achievements}
+        sources.update({field: activity for field in ACTIVITY_COUNTERS.values()})
+
+        return select(
+            User.id,
+            *[func.coalesce(sources[field].c[field], 0) for field in METRIC_FIELDS],
+            literal(now),
+            literal(now)
+        ).select_from(User).outerjoin(
+            activity, activity.c.user_id == User.id
+        ).outerjoin(
+            quizzes, quizzes.c.user_id == User.id
+        ).outerjoin(
+            notes, notes.c.user_id == User.id
+        ).outerjoin(
+            achievements, achievements.c.user_id == User.id
+        ).where(User.id.between(first_user_id, last_user_id))
+
+    @staticmethod
+    def _reconcile_range(first_user_id, last_user_id):
+        stmt = sqlite_insert(UserMetrics).from_select(
+            ['user_id', *METRIC_FIELDS, 'updated_at', 'reconciled_at'],
+            MetricsService._source_counts(first_user_id, last_user_id, datetime.utcnow())
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id'],
+            set_={field: stmt.excluded[field] for field in (*METRIC_FIELDS, 'updated_at', 'reconciled_at')},
+            where=or_(
+                UserMetrics.reconciled_at.is_(None),
+                func.abs(UserMetrics.quiz_score_sum - stmt.excluded.quiz_score_sum) > 0.001,
+                *[getattr(UserMetrics, field) != stmt.excluded[field]
+                  for field in METRIC_FIELDS if field != 'quiz_score_sum']
+            )
+        )
+        repaired = db.session.execute(stmt).rowcount
+        db.session.commit()
+        return repaired
+
+    @staticmethod
+    def reconcile(user_id=None, chunk_size=None):
+        """Recompute the counters from the source tables and fix the rows that drifted.
+
+        Users are processed in id ranges, each one INSERT ... SELECT upsert
+        that only writes missing, never reconciled or differing rows.
+        Returns the number of rows written.
+        """
+        if user_id is not None:
+            return MetricsService._reconcile_range(user_id, user_id)
+
+        chunk_size = chunk_size or MetricsService.CHUNK_SIZE
+        repaired = 0
+        after_user_id = 0
+        while True:
+            ids = select(User.id).where(User.id > after_user_id).order_by(User.id).limit(chunk_size).subquery()
+            last_user_id, users = db.session.query(func.max(ids.c.id), func.count(ids.c.id)).one()
+            if not users:
+                return repaired
+            repaired += MetricsService._reconcile_range(after_user_id + 1, last_user_id)
+            after_user_id = last_user_id
@@ -0,0 +1,88 @@
+from src.database import db
+from src.models.analytics import ScoreSketch
+from src.models.learning import LearningPath, Topic, Quiz, QuizAttempt
+from src.utils.sketches import KLLSketch
+
+
+class PercentileService:
+    """Peer percentiles for quiz scores from per-quiz and per-subject KLL sketches"""
+
+    @staticmethod
+    def _load(scope, scope_key):
+        row = ScoreSketch.query.filter_by(scope=scope, scope_key=str(scope_key)).first()
+        sketch = KLLSketch.from_bytes(row.data) if row else KLLSketch()
+        return row, sketch
+
+    @staticmethod
+    def _store(row, scope, scope_key, sketch):
+        if row is None:
+            row = ScoreSketch(scope=scope, scope_key=str(scope_key))
+            db.session.add(row)
+        row.data = sketch.to_bytes()
+        row.count = sketch.n
+
+    @staticmethod
+    def _percentile(sketch, score):
+        if not sketch.n:
+            return None
+        return {
+            'percentile': round(sketch.cdf(score) * 100, 1),  # Share of attempts scoring lower
+            'sample_size': sketch.n
+        }
+
+    @staticmethod
+    def get_subject(quiz_id):
+        return db.session.query(LearningPath.subject).join(
+            Topic, Topic.learning_path_id == LearningPath.id
+        ).join(
+            Quiz, Quiz.topic_id == Topic.id
+        ).filter(Quiz.id == quiz_id).scalar()
+
+    @staticmethod
+    def record_score(quiz_id, percentage, subject=None):
+        """Add a submitted score to the quiz and subject sketches; the caller commits.
+
+        Returns the score's peer percentiles including the new score.
+        """
+        subject = subject or PercentileService.get_subject(quiz_id)
+        result = {}
+        for scope, scope_key in (('quiz', quiz_id), ('subject', subject)):
+            if scope_key is None:
+                continue
+            row, sketch = PercentileService._load(scope, scope_key)
+            sketch.update(percentage)
+            PercentileService._store(row, scope, scope_key, sketch)
+            result[scope] = PercentileService._percentile(sketch, percentage)
+        return result
+
+    @staticmethod
+    def get_percentiles(quiz_id, score, subject=None):
+        """Where a score falls among all attempts at the quiz and in its subject"""
+        subject = subject or PercentileService.get_subject(quiz_id)
+        result = {}
+        for scope, scope_key in (('quiz', quiz_id), ('subject', subject)):
+            _, sketch = PercentileService._load(scope, scope_key)
+            result[scope] = PercentileService._percentile(sketch, score)
+        return result
+
+    @staticmethod
+    def rebuild_sketches():
+        """Recreate every sketch from completed quiz attempts. Returns sketches written."""
+        sketches = {}
+        attempts = db.session.query(
+            QuizAttempt.quiz_id, LearningPath.subject, QuizAttempt.percentage
+        ).join(Quiz, QuizAttempt.quiz_id == Quiz.id).join(
+            Topic, Quiz.topic_id == Topic.id
+        ).join(
+            LearningPath, Topic.learning_path_id == LearningPath.id
+        ).filter(QuizAttempt.completed_at.isnot(None)).yield_per(10000)
+
+        for quiz_id, subject, percentage in attempts:
+            for key in (('quiz', str(quiz_id)), ('subject', subject)):
+                sketches.setdefault(key, KLLSketch()).update(percentage or 0.0)
+
+        ScoreSketch.query.delete(synchronize_session=False)
+        for (scope, scope_key), sketch in sketches.items():
+            db.session.add(ScoreSketch(scope=scope, scope_key=scope_key, data=sketch.to_bytes(), count=sketch.n))
+        db.session.commit()
+        return len(sketches)
@@ -0,0 +1,116 @@
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.learning import Quiz, Question, QuizAttempt, QuestionResult
+from src.services.answer_keys import AnswerKeyCache, grade
+
+
+class QuestionResultService:
+    """Per-question grading results, stored once when an attempt is submitted.
+
+    Reads of how questions were answered (attempt details, missed
+    questions, item statistics) go to question_results through its
+    attempt and question indexes instead of re-grading the answers JSON.
+    """
+
+    CHUNK_SIZE = 1000
+
+    @staticmethod
+    def record(attempt_id, graded):
+        """Stage one row per graded question in a single bulk insert; the caller commits.
+
+        Questions that already have a row for the attempt are left as they are.
+        """
+        if not graded:
+            return
+        db.session.execute(sqlite_insert(QuestionResult).on_conflict_do_nothing(
+            index_elements=['attempt_id', 'question_id']
+        ), [
+            {
+                'attempt_id': attempt_id,
+                'question_id': result.question.id,
+                'answer': result.user_answer,
+                'is_correct': result.is_correct,
+                'points_earned': result.points_earned
+            }
+            for result in graded
+        ])
+
+    @staticmethod
+    def for_attempt(attempt_id):
+        """{question_id: QuestionResult} for an attempt"""
+        return {
+            result.question_id: result
+            for result in QuestionResult.query.filter(QuestionResult.attempt_id == attempt_id)
+        }
+
+    @staticmethod
+    def usually_missed(user_id, min_attempts=2, limit=20, quiz_id=None):
+        """Questions the user got wrong in more than half of their answers, worst first"""
+        answered = func.count(QuestionResult.id)
+        missed = func.sum(case((QuestionResult.is_correct, 0), else_=1))
+        per_question = select(
+            QuestionResult.question_id.label('question_id'),
+            answered.label('answered'),
+            missed.label('missed')
+        ).join(
+            QuizAttempt, QuizAttempt.id == QuestionResult.attempt_id
+        ).where(QuizAttempt.user_id == user_id)
+        if quiz_id:
+            per_question = per_question.where(QuizAttempt.quiz_id == quiz_id)
+        per_question = per_question.group_by(QuestionResult.question_id).having(
+            answered >= min_attempts, missed * 2 > answered
+        ).subquery()
+
+        miss_rate = per_question.c.missed * 1.0 / per_question.c.answered
+        rows = db.session.query(
+            Question.id, Question.quiz_id, Question.question_text, Question.question_type,
+            Quiz.title, per_question.c.answered, per_question.c.missed, miss_rate
+        ).join(
+            per_question, per_question.c.question_id == Question.id
+        ).join(
+            Quiz, Quiz.id == Question.quiz_id
+        ).order_by(miss_rate.desc(), per_question.c.missed.desc(), Question.id).limit(limit).all()
+
+        return [
+            {
+                'question_id': question_id,
+                'quiz_id': row_quiz_id,
+                'quiz_title': quiz_title,
+                'question_text': question_text,
+                'question_type': question_type,
+                'times_answered': answered_count,
+                'times_missed': missed_count,
+                'miss_rate': round(rate * 100, 1)
+            }
+            for (question_id, row_quiz_id, question_text, question_type, quiz_title,
+                 answered_count, missed_count, rate) in rows
+        ]
+
+    @staticmethod
+    def backfill(chunk_size=None):
+        """Grade completed attempts that predate question_results; returns attempts written.
+
+        Legacy attempts are graded against their quiz's current questions,
+        which is what the details view showed for them before.
+        """
+        chunk_size = chunk_size or QuestionResultService.CHUNK_SIZE
+        has_results = select(QuestionResult.id).where(QuestionResult.attempt_id == QuizAttempt.id).exists()
+        written = 0
+        after_attempt_id = 0
+        while True:
+            attempts = db.session.execute(
+                select(QuizAttempt.id, QuizAttempt.quiz_id, QuizAttempt.answers).where(
+                    QuizAttempt.id > after_attempt_id,
+                    QuizAttempt.completed_at.isnot(None),
+                    ~has_results
+                ).order_by(QuizAttempt.id).limit(chunk_size)
+            ).all()
+            if not attempts:
+                return written
+            for attempt_id, quiz_id, answers in attempts:
+                _, graded = grade(AnswerKeyCache.get(quiz_id), answers)
+                QuestionResultService.record(attempt_id, graded)
+            db.session.commit()
+            written += len(attempts)
+            after_attempt_id = attempts[-1].id
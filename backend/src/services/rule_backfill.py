@@ -0,0 +1,193 @@
+from datetime import datetime
+from sqlalchemy import Integer, bindparam, cast, exists, func, insert, literal, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.analytics import UserDailyStats
+from src.models.gamification import Achievement, Badge, UserAchievement, UserBadge, UserLevel, RuleBackfillJob, PointsLedgerEntry
+from src.models.user import User
+from src.services.achievement_rules import AchievementEngine, EVENT_INDEX, METRIC_QUERIES, achievement_key, badge_key
+from src.services.metrics_service import MetricsService
+
+
+class RuleBackfill:
+    """Awards one achievement or badge to every qualifying user with set-based SQL.
+
+    Users are processed in id ranges. Each chunk is one transaction: an
+    INSERT ... SELECT of the qualifying user ids, bulk point and level
+    updates for the users it returned, the achievements and badges those
+    awards unlock in turn (AchievementEngine, per awarded user) and the
+    job's cursor. An interrupted run resumes from the last committed chunk.
+    """
+
+    CHUNK_SIZE = 5000
+
+    def __init__(self, rule_type, rule_id, chunk_size=None, progress=None):
+        if rule_type not in ('achievement', 'badge'):
+            raise ValueError(f"Unknown rule type {rule_type}")
+        self.rule_type = rule_type
+        self.rule = db.session.get(Achievement if rule_type == 'achievement' else Badge, rule_id)
+        if self.rule is None:
+            raise ValueError(f"{rule_type.capitalize()} {rule_id} not found")
+
+        key = achievement_key(self.rule) if rule_type == 'achievement' else badge_key(self.rule)
+        self.build_metric = METRIC_QUERIES.get(key)
+        if self.build_metric is None:
+            raise ValueError(f"No set-based metric registered for {key}")
+
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.progress = progress
+
+    def _job(self):
+        job = RuleBackfillJob.query.filter_by(
+            rule_type=self.rule_type, rule_id=self.rule.id, status='running'
+        ).order_by(RuleBackfillJob.id.desc()).first()
+        if job is None:
+            job = RuleBackfillJob(
+                rule_type=self.rule_type,
+                rule_id=self.rule.id,
+                last_user_id=0,
+                users_processed=0,
+                awarded_count=0,
+                total_users=db.session.query(func.count(User.id)).scalar()
+            )
+            db.session.add(job)
+            db.session.commit()
+        return job
+
+    def _chunk_end(self, after_user_id):
+        """(last user id, user count) for the next chunk_size users after a cursor"""
+        ids = select(User.id).where(User.id > after_user_id).order_by(User.id).limit(self.chunk_size).subquery()
+        return db.session.query(func.max(ids.c.id), func.count(ids.c.id)).one()
+
+    def _award_achievements(self, first_user_id, last_user_id, now):
+        achievement = self.rule
+        metric = self.build_metric(first_user_id, last_user_id).subquery()
+        qualifying = select(
+            metric.c.user_id, literal(achievement.id), literal(now), cast(metric.c.value, Integer)
+        ).where(
+            metric.c.value >= achievement.condition_target,
+            ~exists().where(
+                UserAchievement.user_id == metric.c.user_id,
+                UserAchievement.achievement_id == achievement.id
+            )
+        )
+        awarded = db.session.execute(
+            insert(UserAchievement).from_select(
+                ['user_id', 'achievement_id', 'earned_at', 'progress_value'], qualifying
+            ).returning(UserAchievement.user_id)
+        ).scalars().all()
+        MetricsService.record_achievements_bulk(awarded, now)
+
+        if awarded:
+            events = ['achievement_earned']
+            if achievement.points:
+                self._award_points(awarded, achievement.points, now)
+                events.append('points_awarded')
+            self._cascade(awarded, events)
+        return len(awarded)
+
+    def _cascade(self, user_ids, events):
+        """Evaluate the rules the bulk awards can unlock (points, level and achievement-count thresholds)"""
+        keys = set().union(*(EVENT_INDEX[event] for event in events))
+        # The bulk updates bypassed the identity map; reload level rows the session already holds
+        db.session.expire_all()
+        for user_id in user_ids:
+            AchievementEngine.evaluate(user_id, keys, commit=False)
+
+    def _award_points(self, user_ids, points, now):
+        # Users without a level row get one first so the bulk UPDATE reaches them
+        missing = select(User.id, literal(now), literal(now)).where(
+            User.id.in_(user_ids),
+            ~exists().where(UserLevel.user_id == User.id)
+        )
+        db.session.execute(insert(UserLevel).from_select(['user_id', 'created_at', 'updated_at'], missing))
+
+        db.session.execute(
+            update(UserLevel).where(UserLevel.user_id.in_(user_ids)).values(
+                total_points=UserLevel.total_points + points,
+                achievement_points=UserLevel.achievement_points + points,
+                updated_at=now
+            )
+        )
+
+        # Levels only move up, so each row walks up from its current level
+        from src.services.gamification_service import GamificationService
+        level_updates = []
+        for level_id, level, total in db.session.query(
+            UserLevel.id, UserLevel.current_level, UserLevel.total_points
+        ).filter(UserLevel.user_id.in_(user_ids)):
+            level = GamificationService._level_for_points(level, total)
+            level_updates.append({
+                'level_id': level_id,
+                'level': level,
+                'to_next': GamificationService._calculate_points_for_level(level + 1) - total
+            })
+        if not level_updates:
+            return
+        db.session.execute(
+            update(UserLevel.__table__).where(UserLevel.__table__.c.id == bindparam('level_id')).values(
+                current_level=bindparam('level'),
+                points_to_next_level=bindparam('to_next')
+            ),
+            level_updates
+        )
+
+        db.session.execute(insert(PointsLedgerEntry), [
+            {'user_id': user_id, 'category': 'achievement', 'points': points, 'entries': 1, 'created_at': now}
+            for user_id in user_ids
+        ])
+
+        stmt = sqlite_insert(UserDailyStats)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_={
+                'points_earned': UserDailyStats.points_earned + stmt.excluded.points_earned,
+                'updated_at': stmt.excluded.updated_at
+            }
+        )
+        db.session.execute(stmt, [
+            {
+                'user_id': user_id, 'date': now.date(), 'minutes_studied': 0, 'resources_completed': 0,
+                'quizzes_taken': 0, 'quiz_score_sum': 0.0, 'points_earned': points, 'updated_at': now
+            }
+            for user_id in user_ids
+        ])
+
+    def _award_badges(self, first_user_id, last_user_id, now):
+        badge = self.rule
+        metric = self.build_metric(first_user_id, last_user_id).subquery()
+        qualifying = select(metric.c.user_id, literal(badge.id), literal(now)).where(
+            metric.c.value >= badge.condition_value,
+            ~exists().where(UserBadge.user_id == metric.c.user_id, UserBadge.badge_id == badge.id)
+        )
+        result = db.session.execute(
+            insert(UserBadge).from_select(['user_id', 'badge_id', 'earned_at'], qualifying)
+        )
+        return result.rowcount
+
+    def run(self):
+        """Process every remaining chunk; returns the finished job"""
+        job = self._job()
+        while True:
+            last_user_id, users = self._chunk_end(job.last_user_id)
+            if not users:
+                break
+
+            now = datetime.utcnow()
+            if self.rule_type == 'achievement':
+                awarded = self._award_achievements(job.last_user_id + 1, last_user_id, now)
+            else:
+                awarded = self._award_badges(job.last_user_id + 1, last_user_id, now)
+
+            job.last_user_id = last_user_id
+            job.users_processed += users
+            job.awarded_count += awarded
+            db.session.commit()
+
+            if self.progress:
+                self.progress(job)
+
+        job.status = 'completed'
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        return job
@@ -0,0 +1,230 @@
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, time as time_of_day, timedelta
+from sqlalchemy import or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.scheduler import ScheduledJobLease
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class ScheduledJob:
+    """A periodic job: every `every` seconds (aligned to the epoch) or daily at `daily_at` (UTC)"""
+
+    def __init__(self, name, func, every=None, daily_at=None, jitter=0, lease=900):
+        if (every is None) == (daily_at is None):
+            raise ValueError(f"Job {name} needs exactly one of every or daily_at")
+        self.name = name
+        self.func = func
+        self.every = every
+        self.daily_at = daily_at
+        self.jitter = jitter
+        self.lease = lease  # Seconds before a crashed worker's claim can be taken over
+        self.next_attempt = None
+        self.running = threading.Lock()  # Overlap prevention within the process
+
+    def slot(self, now):
+        """Start of the schedule slot containing now; each slot runs at most once across workers"""
+        if self.every:
+            return EPOCH + timedelta(seconds=(now - EPOCH).total_seconds() // self.every * self.every)
+        today = datetime.combine(now.date(), self.daily_at)
+        return today if now >= today else today - timedelta(days=1)
+
+    def next_slot(self, now):
+        return self.slot(now) + (timedelta(seconds=self.every) if self.every else timedelta(days=1))
+
+
+class Scheduler:
+    """Runs registered jobs on a background thread in every worker process.
+
+    Before running a job a worker claims its row in scheduled_job_leases
+    with one conditional UPDATE: only if no live lease is held and nobody
+    has started the current slot yet. So each slot runs once across all
+    workers, and a run that outlasts its slot is never overlapped. Random
+    jitter spreads the workers' attempts; durations and outcomes are kept
+    on the lease row and in per-process metrics.
+    """
+
+    POLL_SECONDS = 30  # Longest sleep between schedule checks
+
+    _lock = threading.Lock()
+    _jobs = {}  # name -> ScheduledJob
+    _metrics = {}  # name -> per-process counters
+    _thread = None
+    _stop = threading.Event()
+
+    @classmethod
+    def register(cls, name, func, every=None, daily_at=None, jitter=0, lease=900):
+        job = ScheduledJob(name, func, every=every, daily_at=daily_at, jitter=jitter, lease=lease)
+        with cls._lock:
+            cls._jobs[name] = job
+            cls._metrics.setdefault(name, {
+                'runs': 0, 'failures': 0, 'skipped': 0,
+                'last_duration_ms': None, 'max_duration_ms': 0, 'total_duration_ms': 0
+            })
+        return job
+
+    @staticmethod
+    def owner():
+        """Lease owner id of this worker (computed per call so forked workers differ)"""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @classmethod
+    def start(cls, app):
+        """Start the scheduler thread once per process"""
+        if cls._thread is not None:
+            return
+        with cls._lock:
+            if cls._thread is not None:
+                return
+            cls._stop.clear()
+            cls._thread = threading.Thread(target=cls._loop, args=(app,), name='scheduler', daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls):
+        cls._stop.set()
+        with cls._lock:
+            thread, cls._thread = cls._thread, None
+        if thread:
+            thread.join(cls.POLL_SECONDS)
+
+    @classmethod
+    def _loop(cls, app):
+        while not cls._stop.is_set():
+            now = datetime.utcnow()
+            for job in list(cls._jobs.values()):
+                if job.next_attempt is None:
+                    # A slot nobody has run yet (e.g. all workers were down) is picked up straight away
+                    job.next_attempt = job.slot(now) + timedelta(seconds=random.uniform(0, job.jitter))
+                if now >= job.next_attempt:
+                    slot = job.slot(now)
+                    job.next_attempt = job.next_slot(now) + timedelta(seconds=random.uniform(0, job.jitter))
+                    threading.Thread(
+                        target=cls.run_job, args=(app, job, slot), name=f"scheduler-{job.name}", daemon=True
+                    ).start()
+
+            wake = min((job.next_attempt for job in cls._jobs.values()), default=None)
+            timeout = (wake - datetime.utcnow()).total_seconds() if wake else cls.POLL_SECONDS
+            cls._stop.wait(min(max(timeout, 0.5), cls.POLL_SECONDS))
+
+    @classmethod
+    def _claim(cls, job, slot):
+        now = datetime.utcnow()
+        db.session.execute(
+            sqlite_insert(ScheduledJobLease).values(job_name=job.name, run_count=0, failure_count=0)
+            .on_conflict_do_nothing(index_elements=['job_name'])
+        )
+        claimed = db.session.execute(
+            update(ScheduledJobLease).where(
+                ScheduledJobLease.job_name == job.name,
+                or_(ScheduledJobLease.lease_expires_at.is_(None), ScheduledJobLease.lease_expires_at < now),
+                or_(ScheduledJobLease.last_started_at.is_(None), ScheduledJobLease.last_started_at < slot)
+            ).values(
+                owner=cls.owner(),
+                lease_expires_at=now + timedelta(seconds=job.lease),
+                last_started_at=now
+            ).returning(ScheduledJobLease.job_name)
+        ).first()
+        db.session.commit()
+        return claimed is not None
+
+    @classmethod
+    def _release(cls, job, status, duration_ms, error=None):
+        db.session.execute(
+            update(ScheduledJobLease).where(
+                ScheduledJobLease.job_name == job.name,
+                ScheduledJobLease.owner == cls.owner()
+            ).values(
+                lease_expires_at=None,
+                last_finished_at=datetime.utcnow(),
+                last_duration_ms=duration_ms,
+                last_status=status,
+                last_error=error,
+                run_count=ScheduledJobLease.run_count + 1,
+                failure_count=ScheduledJobLease.failure_count + (1 if status == 'failed' else 0)
+            )
+        )
+        db.session.commit()
+
+    @classmethod
+    def run_job(cls, app, job, slot=None):
+        """Run one slot of a job if this worker wins its lease; returns True if it ran"""
+        if not job.running.acquire(blocking=False):
+            with cls._lock:
+                cls._metrics[job.name]['skipped'] += 1
+            return False
+
+        try:
+            with app.app_context():
+                if not cls._claim(job, slot or job.slot(datetime.utcnow())):
+                    return False
+
+                started = time.monotonic()
+                status, error = 'success', None
+                try:
+                    job.func()
+                except Exception as e:
+                    db.session.rollback()
+                    status, error = 'failed', str(e)
+                    app.logger.error(f"Scheduled job {job.name} failed: {error}")
+                duration_ms = int((time.monotonic() - started) * 1000)
+                cls._release(job, status, duration_ms, error)
+
+            with cls._lock:
+                metrics = cls._metrics[job.name]
+                metrics['runs'] += 1
+                metrics['failures'] += status == 'failed'
+                metrics['last_duration_ms'] = duration_ms
+                metrics['max_duration_ms'] = max(metrics['max_duration_ms'], duration_ms)
+                metrics['total_duration_ms'] += duration_ms
+            return True
+        finally:
+            job.running.release()
+
+    @classmethod
+    def status(cls):
+        """Every registered job with its shared lease row and this process's metrics"""
+        leases = {lease.job_name: lease for lease in ScheduledJobLease.query.all()}
+        jobs = []
+        for name, job in cls._jobs.items():
+            metrics = dict(cls._metrics[name])
+            metrics['average_duration_ms'] = (
+                metrics['total_duration_ms'] // metrics['runs'] if metrics['runs'] else None
+            )
+            jobs.append({
+                'name': name,
+                'schedule': f"every {job.every}s" if job.every else f"daily at {job.daily_at.isoformat()} UTC",
+                'jitter_seconds': job.jitter,
+                'next_attempt': job.next_attempt.isoformat() if job.next_attempt else None,
+                'lease': leases[name].to_dict() if name in leases else None,
+                'process_metrics': metrics
+            })
+        return {'owner': cls.owner(), 'running': cls._thread is not None, 'jobs': jobs}
+
+
+def register_default_jobs():
+    """Gamification event processing and periodic maintenance"""
+    from src.services.analytics_jobs import AnalyticsJobs
+    from src.services.event_outbox import EventOutbox
+    from src.services.gamification_service import GamificationService
+    from src.services.metrics_service import MetricsService
+    from src.services.stats_service import StatsService
+
+    def compact_points_ledger():
+        StatsService.compact_points_ledger(datetime.utcnow() - timedelta(days=StatsService.LEDGER_RETENTION_DAYS))
+
+    def prune_event_outbox():
+        EventOutbox.prune(datetime.utcnow() - timedelta(days=EventOutbox.RETENTION_DAYS))
+
+    Scheduler.register('event_outbox', EventOutbox.drain, every=5, lease=120)
+    Scheduler.register('leaderboard_snapshot', GamificationService.update_leaderboards, every=300, jitter=30)
+    Scheduler.register('streak_reset', GamificationService.reset_lapsed_streaks, daily_at=time_of_day(0, 5), jitter=60)
+    Scheduler.register('points_ledger_compaction', compact_points_ledger, daily_at=time_of_day(3, 0), jitter=300, lease=3600)
+    Scheduler.register('event_outbox_pruning', prune_event_outbox, daily_at=time_of_day(4, 0), jitter=300)
+    Scheduler.register('user_metrics_reconciliation', MetricsService.reconcile, daily_at=time_of_day(3, 30), jitter=300, lease=3600)
+    Scheduler.register('analytics_job_cleanup', AnalyticsJobs.sweep, every=300, jitter=30)
@@ -0,0 +1,250 @@
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import delete, func, insert, literal, or_, select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.database import db
+from src.models.analytics import UserDailyStats
+from src.models.gamification import PointsLedgerEntry
+from src.models.learning import LearningPath, Topic, Resource, QuizAttempt
+
+ROLLUP_FIELDS = ('minutes_studied', 'resources_completed', 'quizzes_taken', 'quiz_score_sum', 'points_earned')
+
+
+class StatsService:
+    """Maintains the per-user daily learning rollup (user_daily_stats).
+
+    The record_* methods only stage an atomic upsert on the current session;
+    the caller's commit makes them durable together with the write that
+    triggered them.
+    """
+
+    LEDGER_RETENTION_DAYS = 90  # Individual points ledger rows kept before compaction
+
+    @staticmethod
+    def _increment(user_id, day, **deltas):
+        """Add deltas to the user's row for `day`, creating it if needed"""
+        stmt = sqlite_insert(UserDailyStats).values(
+            user_id=user_id,
+            date=day,
+            updated_at=datetime.utcnow(),
+            **deltas
+        )
+        update_values = {
+            field: getattr(UserDailyStats, field) + stmt.excluded[field]
+            for field in deltas
+        }
+        update_values['updated_at'] = stmt.excluded.updated_at
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'date'],
+            set_=update_values
+        )
+        db.session.execute(stmt)
+
+    @staticmethod
+    def _day(when):
+        if when is None:
+            return datetime.utcnow().date()
+        if isinstance(when, datetime):
+            return when.date()
+        return when
+
+    @staticmethod
+    def record_resource_change(user_id, before=None, after=None):
+        """Move a resource's contribution to the rollup from `before` to `after`.
+
+        Each is (duration_minutes, completion time) while the resource counts
+        as completed, or None when it doesn't (not completed, created or deleted).
+        """
+        contributions = {}
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            minutes, when = state
+            day = contributions.setdefault(StatsService._day(when), [0, 0])
+            day[0] += sign * (minutes or 0)
+            day[1] += sign
+        for day, (minutes, resources) in contributions.items():
+            if minutes or resources:
+                StatsService._increment(user_id, day, minutes_studied=minutes, resources_completed=resources)
+
+    @staticmethod
+    def record_quiz_submitted(user_id, percentage, when=None):
+        """Count a completed quiz attempt and its score"""
+        StatsService._increment(
+            user_id,
+            StatsService._day(when),
+            quizzes_taken=1,
+            quiz_score_sum=percentage or 0.0
+        )
+
+    @staticmethod
+    def record_points(user_id, points, category='general', when=None):
+        """Append an award to the points ledger and add it to the day's points earned"""
+        if not points:
+            return
+        if when is None:
+            when = datetime.utcnow()
+        elif not isinstance(when, datetime):
+            when = datetime.combine(when, time())
+        db.session.execute(insert(PointsLedgerEntry).values(
+            user_id=user_id, category=category, points=points, entries=1, created_at=when
+        ))
+        StatsService._increment(user_id, when.date(), points_earned=points)
+    
+    @staticmethod
+    def compact_points_ledger(before):
+        """Fold ledger rows older than `before` into one row per user, category and day.
+
+        Period leaderboards read the daily rollup, so old awards only need
+        day granularity. Each day is compacted in its own transaction.
+        Returns the number of ledger rows removed.
+        """
+        day = func.date(PointsLedgerEntry.created_at)
+        duplicated_days = select(day.label('day')).where(
+            PointsLedgerEntry.created_at < before
+        ).group_by(
+            PointsLedgerEntry.user_id, PointsLedgerEntry.category, day
+        ).having(func.count(PointsLedgerEntry.id) > 1).subquery()
+
+        removed = 0
+        for (compact_day,) in db.session.query(duplicated_days.c.day).distinct().order_by(duplicated_days.c.day).all():
+            day_start = datetime.combine(_as_date(compact_day), time())
+            last_id = db.session.query(func.max(PointsLedgerEntry.id)).scalar()
+            in_day = (
+                PointsLedgerEntry.id <= last_id,
+                PointsLedgerEntry.created_at >= day_start,
+                PointsLedgerEntry.created_at < day_start + timedelta(days=1)
+            )
+            groups = select(PointsLedgerEntry.user_id, PointsLedgerEntry.category).where(*in_day).group_by(
+                PointsLedgerEntry.user_id, PointsLedgerEntry.category
+            ).having(func.count(PointsLedgerEntry.id) > 1)
+
+            db.session.execute(insert(PointsLedgerEntry).from_select(
+                ['user_id', 'category', 'points', 'entries', 'created_at'],
+                select(
+                    PointsLedgerEntry.user_id, PointsLedgerEntry.category,
+                    func.sum(PointsLedgerEntry.points), func.sum(PointsLedgerEntry.entries), literal(day_start)
+                ).where(*in_day).group_by(
+                    PointsLedgerEntry.user_id, PointsLedgerEntry.category
+                ).having(func.count(PointsLedgerEntry.id) > 1)
+            ))
+            result = db.session.execute(delete(PointsLedgerEntry).where(
+                *in_day,
+                tuple_(PointsLedgerEntry.user_id, PointsLedgerEntry.category).in_(groups)
+            ))
+            # The compacted rows were inserted after last_id, so the delete cannot reach them
+            removed += result.rowcount
+            db.session.commit()
+        return removed
+
+    @staticmethod
+    def get_daily_stats(user_id, start_date=None, end_date=None):
+        """Get the user's rollup rows, oldest first"""
+        query = UserDailyStats.query.filter(UserDailyStats.user_id == user_id)
+        if start_date:
+            query = query.filter(UserDailyStats.date >= StatsService._day(start_date))
+        if end_date:
+            query = query.filter(UserDailyStats.date <= StatsService._day(end_date))
+        return query.order_by(UserDailyStats.date.asc()).all()
+
+    @staticmethod
+    def get_totals(user_id, start_date=None):
+        """Sum the rollup counters for a user, optionally from start_date on"""
+        query = db.session.query(
+            *[func.coalesce(func.sum(getattr(UserDailyStats, field)), 0) for field in ROLLUP_FIELDS]
+        ).filter(UserDailyStats.user_id == user_id)
+        if start_date:
+            query = query.filter(UserDailyStats.date >= StatsService._day(start_date))
+        return dict(zip(ROLLUP_FIELDS, query.one()))
+
+    @staticmethod
+    def backfill_daily_stats(user_id=None):
+        """Rebuild the rollup from resources, quiz attempts and the points ledger.
+
+        Points earned before the points ledger existed have no history outside
+        the rollup itself, so a user's points_earned values for days before
+        their earliest ledger row are carried over. Returns the number of rows written.
+        """
+        rows = {}
+
+        def row_for(uid, day):
+            day = _as_date(day)
+            key = (uid, day)
+            if key not in rows:
+                rows[key] = {'user_id': uid, 'date': day, 'minutes_studied': 0, 'resources_completed': 0,
+                             'quizzes_taken': 0, 'quiz_score_sum': 0.0, 'points_earned': 0}
+            return rows[key]
+
+        ledger_day = func.date(PointsLedgerEntry.created_at)
+        ledger_query = db.session.query(
+            PointsLedgerEntry.user_id,
+            ledger_day.label('day'),
+            func.sum(PointsLedgerEntry.points)
+        ).group_by(PointsLedgerEntry.user_id, ledger_day)
+
+        first_ledger_day = select(func.date(func.min(PointsLedgerEntry.created_at))).where(
+            PointsLedgerEntry.user_id == UserDailyStats.user_id
+        ).correlate(UserDailyStats).scalar_subquery()
+        legacy_points_query = db.session.query(
+            UserDailyStats.user_id, UserDailyStats.date, UserDailyStats.points_earned
+        ).filter(
+            UserDailyStats.points_earned != 0,
+            or_(first_ledger_day.is_(None), UserDailyStats.date < first_ledger_day)
+        )
+
+        completed_on = func.date(func.coalesce(Resource.completed_at, Resource.created_at))
+        resource_query = db.session.query(
+            LearningPath.user_id,
+            completed_on.label('day'),
+            func.sum(func.coalesce(Resource.duration_minutes, 0)),
+            func.count(Resource.id)
+        ).select_from(Resource).join(Topic).join(LearningPath).filter(
+            Resource.is_completed == True
+        ).group_by(LearningPath.user_id, completed_on)
+
+        quiz_day = func.date(QuizAttempt.completed_at)
+        quiz_query = db.session.query(
+            QuizAttempt.user_id,
+            quiz_day.label('day'),
+            func.count(QuizAttempt.id),
+            func.sum(QuizAttempt.percentage)
+        ).filter(
+            QuizAttempt.completed_at.isnot(None)
+        ).group_by(QuizAttempt.user_id, quiz_day)
+
+        if user_id is not None:
+            ledger_query = ledger_query.filter(PointsLedgerEntry.user_id == user_id)
+            legacy_points_query = legacy_points_query.filter(UserDailyStats.user_id == user_id)
+            resource_query = resource_query.filter(LearningPath.user_id == user_id)
+            quiz_query = quiz_query.filter(QuizAttempt.user_id == user_id)
+
+        for uid, day, points in legacy_points_query:
+            row_for(uid, day)['points_earned'] = points
+        for uid, day, points in ledger_query:
+            row_for(uid, day)['points_earned'] = points
+        for uid, day, minutes, count in resource_query:
+            row = row_for(uid, day)
+            row['minutes_studied'] = minutes or 0
+            row['resources_completed'] = count
+        for uid, day, count, score_sum in quiz_query:
+            row = row_for(uid, day)
+            row['quizzes_taken'] = count
+            row['quiz_score_sum'] = score_sum or 0.0
+
+        delete_query = UserDailyStats.query
+        if user_id is not None:
+            delete_query = delete_query.filter(UserDailyStats.user_id == user_id)
+        delete_query.delete(synchronize_session=False)
+
+        if rows:
+            db.session.execute(insert(UserDailyStats), list(rows.values()))
+        db.session.commit()
+        return len(rows)
+
+
+def _as_date(value):
+    """SQLite's DATE() returns text; normalise to a date object"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
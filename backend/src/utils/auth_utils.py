@@ -24,3 +24,19 @@ def token_required(f):
         return f(current_user, *args, **kwargs)
 
     return decorated
+
+def is_admin(user):
+    """Admins are configured by username in the comma-separated ADMIN_USERS variable"""
+    admin_usernames = {name.strip() for name in os.environ.get('ADMIN_USERS', '').split(',') if name.strip()}
+    return user is not None and user.username in admin_usernames
+
+def admin_required(f):
+    """Restrict a token_required view to admins; apply below @token_required"""
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        if not is_admin(current_user):
+            return jsonify({'message': 'Admin access required!'}), 403
+
+        return f(current_user, *args, **kwargs)
+
+    return decorated
@@ -0,0 +1,19 @@
+from src.services.activity_bitmap import ActivityBitmapService
+from src.services.stats_service import StatsService
+
+def backfill_daily_stats(user_id=None):
+    """Rebuild the user_daily_stats rollup and the activity bitmaps derived from it"""
+    scope = f"user {user_id}" if user_id is not None else "all users"
+    print(f"Backfilling daily learning stats for {scope}...")
+    rows = StatsService.backfill_daily_stats(user_id)
+    print(f"Wrote {rows} daily stats rows")
+    users = ActivityBitmapService.rebuild_from_daily_stats(user_id)
+    print(f"Rebuilt activity bitmaps for {users} users")
+    return rows
+
+if __name__ == '__main__':
+    # This can be run standalone, optionally for a single user id
+    import sys
+    from src.main import app
+    with app.app_context():
+        backfill_daily_stats(int(sys.argv[1]) if len(sys.argv) > 1 else None)
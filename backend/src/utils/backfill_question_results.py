@@ -0,0 +1,14 @@
+from src.services.question_results import QuestionResultService
+
+def backfill_question_results():
+    """Write per-question results for completed attempts submitted before they were stored"""
+    print("Backfilling per-question results for completed quiz attempts...")
+    attempts = QuestionResultService.backfill()
+    print(f"Wrote results for {attempts} attempts")
+    return attempts
+
+if __name__ == '__main__':
+    # Run once after deploying; later submissions write their own results
+    from src.main import app
+    with app.app_context():
+        backfill_question_results()
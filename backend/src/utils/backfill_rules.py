@@ -0,0 +1,40 @@
+import argparse
+from src.models.gamification import Achievement, Badge
+from src.services.rule_backfill import RuleBackfill
+
+def print_progress(job):
+    print(f"  {job.users_processed}/{job.total_users} users, {job.awarded_count} awarded (cursor at user {job.last_user_id})")
+
+def backfill_rule(rule_type, rule_id, chunk_size=None):
+    """Award one achievement or badge to every qualifying user; resumes an interrupted run"""
+    print(f"Backfilling {rule_type} {rule_id}...")
+    job = RuleBackfill(rule_type, rule_id, chunk_size, progress=print_progress).run()
+    print(f"Awarded {rule_type} {rule_id} to {job.awarded_count} users")
+    return job
+
+def backfill_rules(achievements=(), badges=(), chunk_size=None):
+    """Backfill achievements first so achievement-count badges see their awards"""
+    for achievement in achievements:
+        backfill_rule('achievement', achievement.id, chunk_size)
+    for badge in badges:
+        backfill_rule('badge', badge.id, chunk_size)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Backfill achievements and badges for existing users')
+    parser.add_argument('rule_type', choices=['achievement', 'badge', 'all'])
+    parser.add_argument('rule_id', type=int, nargs='?')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    from src.main import app
+    with app.app_context():
+        if args.rule_type == 'all':
+            backfill_rules(
+                Achievement.query.filter_by(is_active=True).all(),
+                Badge.query.filter_by(is_active=True).all(),
+                args.chunk_size
+            )
+        elif args.rule_id is None:
+            parser.error('rule_id is required unless rule_type is all')
+        else:
+            backfill_rule(args.rule_type, args.rule_id, args.chunk_size)
@@ -0,0 +1,21 @@
+import argparse
+from datetime import datetime, timedelta
+from src.services.stats_service import StatsService
+
+def compact_points_ledger(retention_days=StatsService.LEDGER_RETENTION_DAYS):
+    """Fold points ledger rows older than the retention window into daily totals"""
+    before = datetime.utcnow() - timedelta(days=retention_days)
+    print(f"Compacting points ledger rows before {before.date().isoformat()}...")
+    removed = StatsService.compact_points_ledger(before)
+    print(f"Removed {removed} ledger rows")
+    return removed
+
+if __name__ == '__main__':
+    # Also run daily by the scheduler; awards inside the retention window keep their individual rows
+    parser = argparse.ArgumentParser(description='Compact the points ledger')
+    parser.add_argument('--days', type=int, default=StatsService.LEDGER_RETENTION_DAYS, help='Days of individual awards to keep')
+    args = parser.parse_args()
+
+    from src.main import app
+    with app.app_context():
+        compact_points_ledger(args.days)
@@ -1,5 +1,6 @@
 from src.models.learning import db
 from src.models.gamification import Achievement, Badge
+from src.utils.backfill_rules import backfill_rules
 
 def initialize_achievements():
     """Initialize default achievements"""
@@ -149,14 +150,17 @@ def initialize_achievements():
         }
     ]
     
+    created = []
     for achievement_data in achievements_data:
         existing = Achievement.query.filter_by(name=achievement_data['name']).first()
         if not existing:
             achievement = Achievement(**achievement_data)
             db.session.add(achievement)
+            created.append(achievement)
     
     db.session.commit()
     print(f"Initialized {len(achievements_data)} achievements")
+    return created
 
 def initialize_badges():
     """Initialize default badges"""
@@ -240,25 +244,31 @@ def initialize_badges():
         }
     ]
     
+    created = []
     for badge_data in badges_data:
         existing = Badge.query.filter_by(name=badge_data['name']).first()
         if not existing:
             badge = Badge(**badge_data)
             db.session.add(badge)
+            created.append(badge)
     
     db.session.commit()
     print(f"Initialized {len(badges_data)} badges")
+    return created
 
 def initialize_gamification_data():
-    """Initialize all gamification data"""
+    """Initialize all gamification data and award new rules to existing users"""
     print("Initializing gamification data...")
-    initialize_achievements()
-    initialize_badges()
+    new_achievements = initialize_achievements()
+    new_badges = initialize_badges()
+    
+    # Existing users would otherwise only earn new rules on their next matching event
+    backfill_rules(new_achievements, new_badges)
     print("Gamification data initialization complete!")
 
 if __name__ == '__main__':
     # This can be run standalone to initialize data
-    from src.models.learning import app
+    from src.main import app
     with app.app_context():
         initialize_gamification_data()
 
@@ -0,0 +1,46 @@
+from sqlalchemy import inspect, text
+from src.database import db
+
+def _column_ddl(column, dialect):
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        # Existing rows take the model's default (SQLite requires one for NOT NULL columns)
+        ddl += f" DEFAULT {int(default) if isinstance(default, bool) else repr(default)}"
+    if not column.nullable and default is not None:
+        ddl += " NOT NULL"
+    return ddl
+
+def migrate_schema():
+    """Add the columns and indexes that db.create_all() won't add to tables that already exist"""
+    print("Upgrading database schema...")
+    db.create_all()  # New tables, with their indexes
+    engine = db.engine
+    inspector = inspect(engine)
+    changes = 0
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    connection.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, engine.dialect)}"
+                    ))
+                    print(f"Added column {table.name}.{column.name}")
+                    changes += 1
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+                    print(f"Created index {index.name}")
+                    changes += 1
+    print(f"Applied {changes} schema changes")
+    return changes
+
+if __name__ == '__main__':
+    # Run once after deploying a version that adds columns or indexes to existing tables;
+    # safe to run again. Run it before starting the workers.
+    from src.main import app
+    with app.app_context():
+        migrate_schema()
@@ -0,0 +1,19 @@
+from src.services.event_outbox import EventOutbox
+
+def process_event_outbox():
+    """Process every pending gamification event"""
+    print("Processing pending gamification events...")
+    total = 0
+    while True:
+        taken = EventOutbox.drain()
+        total += taken
+        if not taken:
+            break
+    print(f"Processed {total} events")
+    return total
+
+if __name__ == '__main__':
+    # The scheduler drains the outbox every few seconds; use this when it is disabled (SCHEDULER_ENABLED=0)
+    from src.main import app
+    with app.app_context():
+        process_event_outbox()
@@ -0,0 +1,14 @@
+from src.services.engagement_service import EngagementService
+
+def rebuild_engagement_sketches():
+    """Rebuild the daily active user sketches from historical activity"""
+    print("Rebuilding daily active user sketches...")
+    count = EngagementService.rebuild()
+    print(f"Wrote sketches for {count} days")
+    return count
+
+if __name__ == '__main__':
+    # Run once after deploying, or to repair sketches after a data import
+    from src.main import app
+    with app.app_context():
+        rebuild_engagement_sketches()
@@ -0,0 +1,20 @@
+from src.services.item_stats import ItemStatsService
+from src.services.question_results import QuestionResultService
+
+def rebuild_item_stats(quiz_id=None):
+    """Recompute the per-question item statistics from the stored question results"""
+    # Older attempts only count once they have question_results rows
+    attempts = QuestionResultService.backfill()
+    print(f"Backfilled per-question results for {attempts} attempts")
+    scope = f"quiz {quiz_id}" if quiz_id is not None else "all quizzes"
+    print(f"Rebuilding item statistics for {scope}...")
+    rows = ItemStatsService.rebuild(quiz_id)
+    print(f"Wrote {rows} question_stats rows")
+    return rows
+
+if __name__ == '__main__':
+    # Run once after deploying, or to repair a quiz's statistics
+    import sys
+    from src.main import app
+    with app.app_context():
+        rebuild_item_stats(int(sys.argv[1]) if len(sys.argv) > 1 else None)
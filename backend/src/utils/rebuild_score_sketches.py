@@ -0,0 +1,14 @@
+from src.services.percentile_service import PercentileService
+
+def rebuild_score_sketches():
+    """Rebuild the per-quiz and per-subject score sketches from quiz attempts"""
+    print("Rebuilding quiz score sketches...")
+    count = PercentileService.rebuild_sketches()
+    print(f"Wrote {count} score sketches")
+    return count
+
+if __name__ == '__main__':
+    # This can be run standalone after importing historical attempts
+    from src.main import app
+    with app.app_context():
+        rebuild_score_sketches()
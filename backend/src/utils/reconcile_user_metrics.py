@@ -0,0 +1,16 @@
+from src.services.metrics_service import MetricsService
+
+def reconcile_user_metrics(user_id=None):
+    """Recompute the user_metrics counters from the source tables"""
+    scope = f"user {user_id}" if user_id is not None else "all users"
+    print(f"Reconciling achievement progress counters for {scope}...")
+    repaired = MetricsService.reconcile(user_id)
+    print(f"Wrote {repaired} user_metrics rows")
+    return repaired
+
+if __name__ == '__main__':
+    # Also run nightly by the scheduler; run once after deploying to fill the table
+    import sys
+    from src.main import app
+    with app.app_context():
+        reconcile_user_metrics(int(sys.argv[1]) if len(sys.argv) > 1 else None)
@@ -0,0 +1,194 @@
+import hashlib
+import math
+import random
+import struct
+from array import array
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang and Liberty).
+
+    Items live in a stack of compactors; an item at level h stands for 2**h
+    inputs. When the sketch is full, the lowest full compactor is sorted and
+    every other item is promoted one level up. Rank error is about 1.7/k.
+    """
+
+    FORMAT_VERSION = 2
+    # Item typecode per format version. Items are kept as doubles: float32 moved stored scores
+    # below the float64 values they are compared with, so a tie could count as beaten.
+    ITEM_TYPECODES = {1: 'f', 2: 'd'}
+
+    def __init__(self, k=200, c=2.0 / 3.0):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors = []
+        self.size = 0
+        self.max_size = 0
+        self._grow()
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            if len(self.compactors[level]) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self._grow()
+                items = sorted(self.compactors[level])
+                offset = random.randint(0, 1)
+                self.compactors[level + 1].extend(items[offset::2])
+                self.compactors[level] = []
+                self.size = sum(len(compactor) for compactor in self.compactors)
+                if self.size < self.max_size:
+                    break
+
+    def update(self, value):
+        self.compactors[0].append(float(value))
+        self.size += 1
+        self.n += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.n += other.n
+        self.size = sum(len(compactor) for compactor in self.compactors)
+        while self.size >= self.max_size:
+            self._compress()
+        return self
+
+    def rank(self, value, inclusive=False):
+        """Estimated number of inputs below (or at, if inclusive) value"""
+        total = 0
+        for level, compactor in enumerate(self.compactors):
+            weight = 1 << level
+            if inclusive:
+                total += weight * sum(1 for item in compactor if item <= value)
+            else:
+                total += weight * sum(1 for item in compactor if item < value)
+        return total
+
+    def cdf(self, value, inclusive=False):
+        """Estimated fraction of inputs below value"""
+        if not self.n:
+            return 0.0
+        # Weighted totals only approximate n, so normalise by the sketch's own weight
+        weight = sum(len(compactor) << level for level, compactor in enumerate(self.compactors))
+        return self.rank(value, inclusive) / weight
+
+    def quantile(self, q):
+        """Estimated value at fraction q (0..1) of the distribution"""
+        weighted = sorted(
+            (item, 1 << level)
+            for level, compactor in enumerate(self.compactors)
+            for item in compactor
+        )
+        if not weighted:
+            return None
+        target = q * sum(weight for _, weight in weighted)
+        cumulative = 0
+        for item, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return item
+        return weighted[-1][0]
+
+    def to_bytes(self):
+        """Header (version, k, n, levels), per-level item counts, then float64 items"""
+        counts = array('I', [len(compactor) for compactor in self.compactors])
+        items = array(self.ITEM_TYPECODES[self.FORMAT_VERSION], [item for compactor in self.compactors for item in compactor])
+        header = struct.pack('<BHQH', self.FORMAT_VERSION, self.k, self.n, len(self.compactors))
+        return header + counts.tobytes() + items.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, k, n, levels = struct.unpack_from('<BHQH', data)
+        if version not in cls.ITEM_TYPECODES:
+            raise ValueError(f"Unsupported sketch format {version}")
+        sketch = cls(k=k)
+        offset = struct.calcsize('<BHQH')
+        counts = array('I')
+        counts.frombytes(data[offset:offset + 4 * levels])
+        offset += 4 * levels
+        items = array(cls.ITEM_TYPECODES[version])
+        items.frombytes(data[offset:])
+
+        sketch.compactors = []
+        start = 0
+        for count in counts:
+            sketch.compactors.append(list(items[start:start + count]))
+            start += count
+        if not sketch.compactors:
+            sketch.compactors.append([])
+        sketch.max_size = sum(sketch._capacity(level) for level in range(len(sketch.compactors)))
+        sketch.n = n
+        sketch.size = len(items)
+        return sketch
+
+
+class HyperLogLog:
+    """Distinct-count sketch (Flajolet et al.) with 2**p one-byte registers.
+
+    Standard error is about 1.04 / sqrt(2**p), 1.6% at the default p=12.
+    Sketches with the same p merge losslessly by taking register maxima.
+    """
+
+    def __init__(self, p=12, registers=None):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(self.registers)}")
+
+    @staticmethod
+    def _hash(value):
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    def position(self, value):
+        """Register index and rank (position of the first set bit) for a value"""
+        x = self._hash(value)
+        width = 64 - self.p
+        index = x >> width
+        rest = x & ((1 << width) - 1)
+        return index, width - rest.bit_length() + 1
+
+    def add(self, value):
+        """Add a value; returns True when a register changed"""
+        index, rank = self.position(value)
+        if self.registers[index] >= rank:
+            return False
+        self.registers[index] = rank
+        return True
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(p=(len(data)).bit_length() - 1, registers=data)
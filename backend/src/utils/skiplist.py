@@ -0,0 +1,166 @@
+import random
+
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # width[i] is how many level-0 steps next[i] is ahead of this node
+        self.width = [1] * level
+
+
+class IndexableSkipList:
+    """Sorted collection of unique, comparable keys with positional access.
+
+    Every link records how many items it skips, so insert, remove, rank
+    and lookup by position are all O(log n) expected. A link to the end of
+    the list counts the steps to one past the last item.
+    """
+
+    MAX_LEVEL = 16  # Each level holds about a quarter of the one below: fine up to ~4**16 items
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1  # Levels in use; the head's links above them are not maintained
+        self._size = 0
+
+    @classmethod
+    def from_sorted(cls, keys, seed=None):
+        """Build from keys already in ascending order in O(n)"""
+        skiplist = cls(seed)
+        head = skiplist._head
+        last = [head] * cls.MAX_LEVEL
+        last_position = [0] * cls.MAX_LEVEL
+
+        position = 0
+        for key in keys:
+            position += 1
+            node = _Node(key, skiplist._random_level())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level] = node
+                last_position[level] = position
+
+        for level in range(cls.MAX_LEVEL):
+            last[level].width[level] = position + 1 - last_position[level]
+        skiplist._level = max((level + 1 for level in range(cls.MAX_LEVEL) if head.next[level]), default=1)
+        skiplist._size = position
+        return skiplist
+
+    def _random_level(self):
+        # Each extra level has probability 1/4: count trailing pairs of zero bits
+        bits = self._random.getrandbits(2 * self.MAX_LEVEL)
+        level = 1
+        while level < self.MAX_LEVEL and not bits & 3:
+            level += 1
+            bits >>= 2
+        return level
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def insert(self, key):
+        new_level = self._random_level()
+        if new_level > self._level:
+            for level in range(self._level, new_level):
+                self._head.width[level] = self._size + 1
+            self._level = new_level
+
+        update = [None] * self._level
+        steps = [0] * self._level
+        node = self._head
+        position = 0
+        for level in reversed(range(self._level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            steps[level] = position
+
+        new_node = _Node(key, new_level)
+        for level in range(new_level):
+            previous = update[level]
+            skipped = position - steps[level]
+            new_node.next[level] = previous.next[level]
+            new_node.width[level] = previous.width[level] - skipped
+            previous.next[level] = new_node
+            previous.width[level] = skipped + 1
+        for level in range(new_level, self._level):
+            update[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key):
+        """Remove key; raises KeyError if it is not present"""
+        update = [None] * self._level
+        node = self._head
+        for level in reversed(range(self._level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            update[level] = node
+
+        target = node.next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for level in range(self._level):
+            previous = update[level]
+            if previous.next[level] is target:
+                previous.width[level] += target.width[level] - 1
+                previous.next[level] = target.next[level]
+            else:
+                previous.width[level] -= 1
+        self._size -= 1
+
+    def index(self, key):
+        """Zero-based position of key; raises KeyError if it is not present"""
+        node = self._head
+        position = 0
+        for level in reversed(range(self._level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+
+        if node.next[0] is None or node.next[0].key != key:
+            raise KeyError(key)
+        return position
+
+    def _node_at(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('skip list index out of range')
+
+        node = self._head
+        position = -1  # The head sits just before index 0
+        for level in reversed(range(self._level)):
+            while node.next[level] is not None and position + node.width[level] <= index:
+                position += node.width[level]
+                node = node.next[level]
+        return node
+
+    def __getitem__(self, index):
+        return self._node_at(index).key
+
+    def slice(self, start, stop):
+        """Keys at positions start..stop-1, clamped to the list"""
+        start = max(start, 0)
+        stop = min(stop, self._size)
+        if start >= stop:
+            return []
+
+        keys = []
+        node = self._node_at(start)
+        for _ in range(stop - start):
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
@@ -0,0 +1,15 @@
+from src.services.leaderboard_index import LeaderboardIndex
+
+def snapshot_leaderboards():
+    """Write the leaderboard index to SQLite so restarted processes can restore it"""
+    print("Snapshotting leaderboards...")
+    counts = LeaderboardIndex.snapshot()
+    for board, entries in counts.items():
+        print(f"  {board}: {entries} users")
+    return counts
+
+if __name__ == '__main__':
+    # The scheduler runs this every 5 minutes; a restart replays UserLevel changes made since the last snapshot
+    from src.main import app
+    with app.app_context():
+        snapshot_leaderboards()
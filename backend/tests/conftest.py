@@ -0,0 +1,109 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads these at import time: use a throwaway database and no scheduler or warm-up threads
+_db_dir = tempfile.mkdtemp(prefix="ai-learning-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["SCHEDULER_ENABLED"] = "0"
+os.environ["LEADERBOARD_WARMUP"] = "0"
+os.environ.setdefault("SECRET_KEY", "test-secret-key-for-the-test-suite-only")
+
+from src.main import app as flask_app  # noqa: E402
+from src.database import db  # noqa: E402
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("RUN_BENCHMARKS") == "1":
+        return
+    skip = pytest.mark.skip(reason="benchmark; set RUN_BENCHMARKS=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def _reset_process_caches():
+    from src.services.answer_keys import AnswerKeyCache
+    from src.services.catalog_cache import CatalogCache
+    from src.services.dashboard_cache import DashboardCache
+    from src.services.leaderboard_index import LeaderboardIndex
+
+    AnswerKeyCache.clear()
+    CatalogCache.invalidate()
+    DashboardCache.clear()
+    LeaderboardIndex.reset()
+
+
+@pytest.fixture
+def app():
+    """The application with a fresh, empty database"""
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+    _reset_process_caches()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Register a user; returns (auth headers, user id)"""
+    def register(username="alice"):
+        response = client.post("/api/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": "Password1"
+        })
+        assert response.status_code == 201, response.get_json()
+        body = response.get_json()
+        return {"Authorization": f"Bearer {body['token']}"}, body["user"]["id"]
+    return register
+
+
+@pytest.fixture
+def seed_quiz(app):
+    """A learning path with one topic and a quiz of short-answer questions (answers A0, A1, ...)"""
+    def seed_quiz(user_id, questions=3, subject="Python"):
+        from src.models.learning import LearningPath, Topic, Quiz, Question
+
+        with app.app_context():
+            path = LearningPath(user_id=user_id, title=f"{subject} path", subject=subject)
+            db.session.add(path)
+            db.session.flush()
+            topic = Topic(learning_path_id=path.id, title="Basics")
+            db.session.add(topic)
+            db.session.flush()
+            quiz = Quiz(topic_id=topic.id, title=f"{subject} quiz")
+            db.session.add(quiz)
+            db.session.flush()
+            rows = [
+                Question(quiz_id=quiz.id, question_text=f"Q{i}", question_type="short_answer",
+                         correct_answer=f"A{i}", order_index=i)
+                for i in range(questions)
+            ]
+            db.session.add_all(rows)
+            db.session.commit()
+            return quiz.id, [question.id for question in rows]
+    return seed_quiz
+
+
+@pytest.fixture
+def take_quiz(client):
+    """Start and submit an attempt with the first `correct` answers right; returns the submit response body"""
+    def take_quiz(headers, quiz_id, question_ids, correct):
+        started = client.post(f"/api/quizzes/{quiz_id}/start", headers=headers)
+        attempt_id = started.get_json()["attempt"]["id"]
+        answers = {str(qid): (f"A{i}" if i < correct else "wrong") for i, qid in enumerate(question_ids)}
+        response = client.post(f"/api/quiz-attempts/{attempt_id}/submit", headers=headers, json={"answers": answers})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+    return take_quiz
@@ -0,0 +1,90 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.database import db
+from src.models.gamification import Achievement, UserAchievement
+from src.services.achievement_rules import AchievementEngine
+from src.services.catalog_cache import CatalogCache
+
+# (condition_type, condition_resource, target, points); after one quiz at 2/3 the
+# quiz count and score rules are met, and their points then meet the points rule
+RULES = [
+    ("count", "quizzes_completed", 1, 10),
+    ("score", "average_quiz_score", 50, 10),
+    ("count", "notes_created", 1, 10),
+    ("count", "resources_viewed", 1, 10),
+    ("count", "learning_paths_completed", 1, 10),
+    ("streak", "learning_streak", 30, 10),
+    ("time", "total_points", 5, 10),
+]
+
+
+def add_rules(copy):
+    for condition_type, condition_resource, target, points in RULES:
+        db.session.add(Achievement(
+            name=f"{condition_resource} {target} #{copy}", description="Test rule", icon="star",
+            category="test", points=points, condition_type=condition_type,
+            condition_target=target, condition_resource=condition_resource
+        ))
+    db.session.commit()
+    CatalogCache.invalidate()
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def evaluate_counting_statements(user_id):
+    CatalogCache.get()  # Warm the snapshot: its build is a one-off per catalog version
+    AchievementEngine._user_level(user_id)
+    db.session.commit()
+    with count_statements() as statements:
+        earned = AchievementEngine.evaluate(user_id)
+    return len(statements), earned
+
+
+def test_statement_count_does_not_grow_with_the_catalog(app, register, seed_quiz, take_quiz):
+    users = []
+    for username in ("small", "large"):
+        headers, user_id = register(username)
+        quiz_id, question_ids = seed_quiz(user_id)
+        take_quiz(headers, quiz_id, question_ids, 2)
+        users.append(user_id)
+
+    with app.app_context():
+        add_rules(0)
+        small_count, small_earned = evaluate_counting_statements(users[0])
+
+        for copy in range(1, 10):
+            add_rules(copy)
+        large_count, large_earned = evaluate_counting_statements(users[1])
+
+        assert len(small_earned["achievements"]) == 3
+        assert len(large_earned["achievements"]) == 30
+        assert large_count == small_count, (small_count, large_count)
+
+
+def test_awards_are_written_once(app, register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    take_quiz(headers, quiz_id, question_ids, 2)
+
+    with app.app_context():
+        add_rules(0)
+        first = AchievementEngine.evaluate(user_id)
+        second = AchievementEngine.evaluate(user_id)
+
+        assert len(first["achievements"]) == 3
+        assert second["achievements"] == []
+        assert UserAchievement.query.filter_by(user_id=user_id).count() == 3
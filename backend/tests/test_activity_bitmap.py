@@ -0,0 +1,63 @@
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from src.database import db
+from src.models.gamification import UserLevel
+from src.services.activity_bitmap import ActivityBitmapService
+
+START = date(2026, 1, 1)
+
+
+def mark(app, user_id, days):
+    with app.app_context():
+        for day in days:
+            while True:
+                try:
+                    ActivityBitmapService.mark_active(user_id, START + timedelta(days=day))
+                    db.session.commit()
+                    break
+                except OperationalError:  # Database locked by another writer: retry
+                    db.session.rollback()
+
+
+def test_concurrent_marks_keep_every_day(app, register):
+    _, user_id = register()
+    threads = [threading.Thread(target=mark, args=(app, user_id, range(start, 120, 6))) for start in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        streaks = ActivityBitmapService.get_streaks(user_id, START + timedelta(days=119))
+        assert streaks == {'current': 120, 'longest': 120, 'total_active_days': 120}
+
+
+def test_logged_activities_mark_the_day(app, client, register):
+    headers, user_id = register()
+    client.post("/api/activities", headers=headers, json={"activity_type": "login"})
+
+    with app.app_context():
+        assert ActivityBitmapService.get_streaks(user_id)['total_active_days'] == 1
+
+
+def test_rebuild_keeps_days_only_the_bitmap_records(app, client, register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    take_quiz(headers, quiz_id, question_ids, 1)
+    client.post("/api/activities", headers=headers, json={"activity_type": "login"})
+
+    with app.app_context():
+        # Earlier streak updates: recorded only in the bitmap and the level's last activity date
+        today = date.today()
+        for days_ago in (1, 2, 3):
+            ActivityBitmapService.mark_active(user_id, today - timedelta(days=days_ago))
+        db.session.add(UserLevel(user_id=user_id, last_activity_date=today - timedelta(days=1)))
+        db.session.commit()
+        before = ActivityBitmapService.get_bits(user_id)
+
+        ActivityBitmapService.rebuild_from_daily_stats(user_id)
+        assert ActivityBitmapService.get_bits(user_id) == before
+        assert ActivityBitmapService.get_streaks(user_id)['current'] == 4
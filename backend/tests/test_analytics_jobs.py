@@ -0,0 +1,118 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database import db
+from src.models.analytics import AnalyticsJob
+from src.services.analytics_jobs import AnalyticsJobs
+
+
+@pytest.fixture
+def deferred(app, monkeypatch):
+    """Every analytics request goes through a background job"""
+    monkeypatch.setitem(app.config, "ANALYTICS_ASYNC_ROW_THRESHOLD", 0)
+
+
+@pytest.fixture
+def learner(register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    take_quiz(headers, quiz_id, question_ids, 2)
+    take_quiz(headers, quiz_id, question_ids, 3)
+    return headers, user_id
+
+
+def wait_for(client, headers, status_url):
+    for _ in range(100):
+        body = client.get(status_url, headers=headers).get_json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.05)
+    raise AssertionError(f"job still {body['status']}")
+
+
+def add_job(app, user_id, **fields):
+    with app.app_context():
+        defaults = {"id": "a" * 32, "name": "quiz-analytics", "params": {"days": 30}, "params_key": '{"days": 30}'}
+        job = AnalyticsJob(user_id=user_id, **dict(defaults, **fields))
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+
+@pytest.mark.parametrize("url", [
+    "/api/analytics/quiz-analytics",
+    "/api/analytics/study-time",
+    "/api/analytics/bundle?sections=quiz_analytics,activities",
+])
+def test_deferred_request_result_matches_inline(app, client, learner, monkeypatch, url):
+    headers, _ = learner
+    inline = client.get(url, headers=headers)
+    assert inline.status_code == 200
+
+    monkeypatch.setitem(app.config, "ANALYTICS_ASYNC_ROW_THRESHOLD", 0)
+    accepted = client.get(url, headers=headers)
+    assert accepted.status_code == 202
+    assert accepted.headers["Location"] == accepted.get_json()["status_url"]
+
+    job = wait_for(client, headers, accepted.get_json()["status_url"])
+    assert job["status"] == "done"
+    assert job["result"] == inline.get_json()
+
+
+def test_job_state_is_read_from_the_shared_table(app, client, learner):
+    headers, user_id = learner
+    # Finished by another worker: nothing about it is in this process
+    job_id = add_job(app, user_id, status="done", result={"total_attempts": 2},
+                     finished_at=datetime.utcnow(), expires_at=datetime.utcnow() + timedelta(minutes=5))
+
+    body = client.get(f"/api/analytics/jobs/{job_id}", headers=headers).get_json()
+    assert body["status"] == "done"
+    assert body["result"] == {"total_attempts": 2}
+
+
+def test_jobs_are_private_and_expire(app, client, learner, register):
+    headers, user_id = learner
+    other_headers, _ = register("bob")
+    live = add_job(app, user_id, id="b" * 32, status="done", expires_at=datetime.utcnow() + timedelta(minutes=5))
+    expired = add_job(app, user_id, id="c" * 32, status="done", expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+    assert client.get(f"/api/analytics/jobs/{live}", headers=other_headers).status_code == 404
+    assert client.get(f"/api/analytics/jobs/{expired}", headers=headers).status_code == 404
+
+    with app.app_context():
+        AnalyticsJobs.sweep()
+        assert db.session.get(AnalyticsJob, expired) is None
+        assert db.session.get(AnalyticsJob, live) is not None
+
+
+def test_identical_requests_share_the_running_job(app, client, learner, deferred):
+    headers, user_id = learner
+    job_id = add_job(app, user_id, status="running")
+
+    response = client.get("/api/analytics/quiz-analytics?days=30", headers=headers)
+    assert response.status_code == 202
+    assert response.get_json()["job_id"] == job_id
+
+
+def test_sweep_fails_jobs_lost_with_their_worker(app, client, learner):
+    headers, user_id = learner
+    stale = datetime.utcnow() - timedelta(seconds=AnalyticsJobs.STALE_AFTER_SECONDS + 1)
+    job_id = add_job(app, user_id, status="running", created_at=stale)
+
+    with app.app_context():
+        AnalyticsJobs.sweep()
+
+    body = client.get(f"/api/analytics/jobs/{job_id}", headers=headers).get_json()
+    assert body["status"] == "failed"
+
+
+def test_full_queue_is_refused(app, client, learner, deferred, monkeypatch):
+    headers, user_id = learner
+    monkeypatch.setattr(AnalyticsJobs, "MAX_PENDING", 1)
+    add_job(app, user_id, status="queued", params={"days": 7}, params_key='{"days": 7}')
+
+    response = client.get("/api/analytics/quiz-analytics?days=30", headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src.database import db
+from src.models.learning import Resource, Topic
+from src.models.user import User
+from src.services.analytics_bundle import AnalyticsBundle
+
+ENDPOINTS = {
+    "dashboard": "/api/analytics/dashboard",
+    "learning_progress": "/api/analytics/learning-progress",
+    "quiz_analytics": "/api/analytics/quiz-analytics",
+    "study_time": "/api/analytics/study-time",
+}
+
+
+@pytest.fixture
+def learner(register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    python_quiz, python_questions = seed_quiz(user_id, questions=4, subject="Python")
+    sql_quiz, sql_questions = seed_quiz(user_id, questions=2, subject="SQL")
+    take_quiz(headers, python_quiz, python_questions, 1)
+    take_quiz(headers, python_quiz, python_questions, 4)
+    take_quiz(headers, sql_quiz, sql_questions, 1)
+    return headers
+
+
+@pytest.mark.parametrize("section", sorted(ENDPOINTS))
+def test_endpoints_serve_the_bundle_sections(client, learner, section):
+    standalone = client.get(ENDPOINTS[section], headers=learner)
+    bundled = client.get(f"/api/analytics/bundle?sections={section}", headers=learner)
+
+    assert standalone.status_code == 200, standalone.get_json()
+    assert bundled.status_code == 200, bundled.get_json()
+    assert standalone.get_json() == bundled.get_json()[section]
+
+
+def test_quiz_analytics_payload(client, learner):
+    body = client.get("/api/analytics/quiz-analytics", headers=learner).get_json()
+
+    assert body["total_attempts"] == 3
+    assert body["best_score"] == 100.0
+    assert [row["subject"] for row in body["performance_by_subject"]] == ["Python", "SQL"]
+    assert [row["attempts_count"] for row in body["performance_by_subject"]] == [2, 1]
+    assert len(body["recent_attempts"]) == 3
+
+
+def count_section_statements(app, user_id, section):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            getattr(AnalyticsBundle(user), section)()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+@pytest.mark.parametrize("section", ["dashboard", "quiz_analytics"])
+def test_section_queries_do_not_grow_with_attempts(app, register, seed_quiz, take_quiz, section):
+    counts = []
+    for username, attempts in (("few", 2), ("many", 12)):
+        headers, user_id = register(username)
+        quiz_id, question_ids = seed_quiz(user_id)
+        for index in range(attempts):
+            take_quiz(headers, quiz_id, question_ids, index % 4)
+        counts.append(count_section_statements(app, user_id, section))
+
+    assert counts[0] == counts[1]
+
+
+def test_resource_sections(client, app, learner):
+    now = datetime.utcnow()
+    with app.app_context():
+        topic = Topic.query.first()
+        db.session.add_all([
+            Resource(topic_id=topic.id, title=f"Recent {index}", resource_type="video", duration_minutes=10,
+                     is_completed=True, completed_at=now - timedelta(days=index))
+            for index in range(6)
+        ] + [
+            Resource(topic_id=topic.id, title="Old", resource_type="book", duration_minutes=100,
+                     is_completed=True, completed_at=now - timedelta(days=60)),
+            Resource(topic_id=topic.id, title="Open", resource_type="article", duration_minutes=30),
+        ])
+        db.session.commit()
+
+    study_time = client.get("/api/analytics/study-time", headers=learner).get_json()
+    assert study_time["subject_study_time"] == [{"subject": "Python", "total_minutes": 60, "total_hours": 1.0}]
+
+    progress = client.get("/api/analytics/learning-progress", headers=learner).get_json()["learning_progress"]
+    python = next(row for row in progress if row["learning_path"]["subject"] == "Python")
+    assert python["resources_progress"]["total"] == 8
+    assert python["resources_progress"]["completed"] == 7
+    assert python["time_spent_minutes"] == 160
+
+    recent = client.get("/api/analytics/dashboard", headers=learner).get_json()["recent_activity"]
+    resources = [item["title"] for item in recent if item["type"] == "resource_completed"]
+    assert resources == [f"Completed: Recent {index}" for index in range(5)]
+
+
+def test_recent_activity_keeps_the_five_newest_quizzes(client, register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    scores = [take_quiz(headers, quiz_id, question_ids, index % 4)["results"]["percentage"] for index in range(7)]
+
+    recent = client.get("/api/analytics/dashboard", headers=headers).get_json()["recent_activity"]
+
+    assert [item["score"] for item in recent if item["type"] == "quiz_completed"] == scores[::-1][:5]
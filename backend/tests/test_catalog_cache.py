@@ -0,0 +1,56 @@
+import threading
+import time
+
+from src.database import db
+from src.models.gamification import Achievement, CatalogVersion
+from src.services.catalog_cache import CATALOG_NAME, CatalogCache
+
+CHECK_SECONDS = 0.2
+
+
+class OtherProcessCache(CatalogCache):
+    """The same cache with its own snapshot, like another worker's: this process's commits don't invalidate it"""
+
+    _lock = threading.Lock()
+    _snapshot = None
+    _checked_at = 0.0
+
+
+def catalog_version():
+    return db.session.query(CatalogVersion.version).filter_by(name=CATALOG_NAME).scalar() or 0
+
+
+def add_achievement(name):
+    db.session.add(Achievement(
+        name=name, description="Test rule", icon="star", category="test", points=10,
+        condition_type="count", condition_target=1, condition_resource="notes_created"
+    ))
+
+
+def test_catalog_writes_reach_other_processes_after_the_check_interval(app, monkeypatch):
+    monkeypatch.setattr(CatalogCache, "CHECK_SECONDS", CHECK_SECONDS)
+
+    with app.app_context():
+        before = OtherProcessCache.get()
+        assert before.achievements == ()
+
+        add_achievement("First note")
+        db.session.commit()
+        assert catalog_version() == before.version + 1
+        # This process rebuilds straight away
+        assert [a.name for a in CatalogCache.get().achievements] == ["First note"]
+
+        # The other process keeps its snapshot until its next version check
+        assert OtherProcessCache.get() is before
+        time.sleep(CHECK_SECONDS)
+        after = OtherProcessCache.get()
+        assert after.version == before.version + 1
+        assert [a.name for a in after.achievements] == ["First note"]
+
+        # A rolled back write does not move the version
+        add_achievement("Second note")
+        db.session.flush()
+        db.session.rollback()
+        assert catalog_version() == after.version
+        time.sleep(CHECK_SECONDS)
+        assert OtherProcessCache.get() is after
@@ -0,0 +1,182 @@
+import os
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import func
+
+from src.database import db
+from src.models.activity import UserActivity
+from src.models.learning import LearningPath, Quiz, QuizAttempt, Resource, Topic
+from src.models.user import User
+from src.services.columnar_snapshots import ColumnarAnalytics, SnapshotExporter
+
+
+@pytest.fixture
+def platform(app, register, seed_quiz, take_quiz):
+    """Learners over two subjects; returns a helper that adds a learner, an attempt and a completion"""
+    learners = {}
+
+    def learn(username, subject, scores):
+        if username not in learners:
+            headers, user_id = register(username)
+            learners[username] = (headers, user_id, *seed_quiz(user_id, questions=4, subject=subject))
+        headers, _, quiz_id, question_ids = learners[username]
+        for correct in scores:
+            take_quiz(headers, quiz_id, question_ids, correct)
+        return learners[username][1]
+
+    def add_resource(user_id, completed):
+        topic = Topic.query.join(LearningPath).filter(LearningPath.user_id == user_id).first()
+        resource = Resource(topic_id=topic.id, title="Reading", resource_type="article", duration_minutes=20,
+                            is_completed=completed, completed_at=datetime.utcnow() if completed else None)
+        db.session.add(resource)
+        return resource
+
+    alice = learn("alice", "Python", [4, 2, 1])
+    bob = learn("bob", "SQL", [3])
+    with app.app_context():
+        # Bob signed up three weeks ago and came back the week after
+        three_weeks_ago = datetime.utcnow() - timedelta(weeks=3)
+        db.session.get(User, bob).created_at = three_weeks_ago
+        QuizAttempt.query.filter_by(user_id=bob).update({"completed_at": three_weeks_ago + timedelta(weeks=1)})
+        UserActivity.query.filter_by(user_id=bob).update({"timestamp": three_weeks_ago})
+        open_resource = add_resource(alice, False)
+        add_resource(alice, True)
+        add_resource(bob, True)
+        db.session.commit()
+        open_resource_id = open_resource.id
+
+    def grow():
+        learn("carol", "Python", [4])
+        learn("alice", "Python", [3])
+        with app.app_context():
+            db.session.get(Resource, open_resource_id).is_completed = True
+            db.session.commit()
+
+    return grow
+
+
+def export(app, directory):
+    with app.app_context():
+        return SnapshotExporter(str(directory)).export_all()
+
+
+def expected_scores():
+    rows = db.session.query(
+        LearningPath.subject, func.count(QuizAttempt.id), func.avg(QuizAttempt.percentage)
+    ).select_from(QuizAttempt).join(Quiz).join(Topic).join(LearningPath).filter(
+        QuizAttempt.completed_at.isnot(None)
+    ).group_by(LearningPath.subject).order_by(LearningPath.subject)
+    return [(subject, count, pytest.approx(average, abs=0.01)) for subject, count, average in rows]
+
+
+def expected_funnel(pass_mark=80):
+    attempts = db.session.query(QuizAttempt.user_id, QuizAttempt.percentage).filter(
+        QuizAttempt.completed_at.isnot(None)
+    ).all()
+    resources = db.session.query(LearningPath.user_id, Resource.is_completed).select_from(Resource).join(
+        Topic
+    ).join(LearningPath).all()
+    return {
+        "users_with_resources": len({user_id for user_id, _ in resources}),
+        "users_completing_resources": len({user_id for user_id, completed in resources if completed}),
+        "users_taking_quizzes": len({user_id for user_id, _ in attempts}),
+        "users_passing_quizzes": len({user_id for user_id, score in attempts if score >= pass_mark}),
+        "resources_total": len(resources),
+        "resources_completed": sum(1 for _, completed in resources if completed),
+    }
+
+
+def expected_retention(weeks=8):
+    def monday(when):
+        return (when - timedelta(days=when.weekday())).date()
+
+    signups = {user_id: monday(created_at) for user_id, created_at in db.session.query(User.id, User.created_at)}
+    active = db.session.query(UserActivity.user_id, UserActivity.timestamp).all() + db.session.query(
+        QuizAttempt.user_id, QuizAttempt.completed_at
+    ).filter(QuizAttempt.completed_at.isnot(None)).all()
+    active_weeks = {
+        (user_id, (monday(when) - signups[user_id]).days // 7) for user_id, when in active
+    }
+
+    cohorts = {}
+    for user_id, cohort in signups.items():
+        cohorts.setdefault(cohort, []).append(user_id)
+    return [
+        {
+            "cohort_week_start": cohort.isoformat(),
+            "users": len(users),
+            "retention": [
+                round(sum((user_id, week) in active_weeks for user_id in users) / len(users) * 100, 1)
+                for week in range(weeks)
+            ],
+        }
+        for cohort, users in sorted(cohorts.items())
+    ]
+
+
+def test_snapshots_match_sql_after_an_incremental_export(app, platform, tmp_path):
+    first = export(app, tmp_path)
+    platform()
+    second = export(app, tmp_path)
+
+    analytics = ColumnarAnalytics(str(tmp_path))
+    with app.app_context():
+        assert second["quiz_attempts"] == first["quiz_attempts"] + 2 == QuizAttempt.query.count()
+        assert second["users"] == first["users"] + 1 == User.query.count()
+        attempt_ids = [row[0] for row in QuizAttempt.query.with_entities(QuizAttempt.id).order_by(
+            QuizAttempt.completed_at, QuizAttempt.id
+        )]
+        assert analytics.column("quiz_attempts", "id").tolist() == attempt_ids
+
+        groups = sorted(analytics.score_distribution()["groups"], key=lambda group: group["subject"])
+        assert [(g["subject"], g["attempts_count"], g["average_score"]) for g in groups] == expected_scores()
+
+        funnel = analytics.completion_funnel()
+        assert funnel["overall"] == expected_funnel()
+        # The in-place completion change reached the rewritten resources table
+        assert funnel["overall"]["resources_completed"] == 3
+
+        cohorts = analytics.cohort_retention()["cohorts"]
+        assert cohorts == expected_retention()
+        assert cohorts[0]["retention"][1] == 100.0  # Bob's return a week after signing up
+
+
+def save_with_tight_header(path, values):
+    """Write an .npy file whose header has no room to grow, as older numpy versions did"""
+    header = f"{{'descr': '<i8', 'fortran_order': False, 'shape': ({len(values)},), }}\n".encode("latin1")
+    with open(path, "wb") as f:
+        f.write(b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header)
+        f.write(values.astype("<i8").tobytes())
+
+
+def header_length(path):
+    with open(path, "rb") as f:
+        np.lib.format.read_magic(f)
+        np.lib.format.read_array_header_1_0(f)
+        return f.tell()
+
+
+@pytest.mark.parametrize("rows", [9, 99, 999])
+def test_appends_across_a_digit_boundary(app, tmp_path, rows):
+    with app.app_context():
+        exporter = SnapshotExporter(str(tmp_path))
+    path = exporter._column_path("users", "id")
+    existing = np.arange(rows, dtype=np.int64)
+
+    # Headers written by np.save leave room for the shape to grow: appended in place
+    np.save(path, existing)
+    before = header_length(path)
+    exporter._append_column("users", "id", [rows, rows + 1], rows)
+    assert header_length(path) == before
+    assert os.path.getsize(path) == before + (rows + 2) * 8
+    assert np.load(path).tolist() == list(range(rows + 2))
+
+    # A header without spare room is rewritten with the file
+    save_with_tight_header(path, existing)
+    before = header_length(path)
+    exporter._append_column("users", "id", [rows, rows + 1], rows)
+    assert header_length(path) > before
+    assert np.load(path, mmap_mode="r").tolist() == list(range(rows + 2))
@@ -0,0 +1,73 @@
+import pytest
+
+from src.database import db
+from src.models.user import User
+from src.services.dashboard_cache import DashboardCache
+
+
+@pytest.fixture
+def learner(register, seed_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    return headers, user_id, quiz_id, question_ids
+
+
+def dashboard(client, headers, etag=None, days=None):
+    query = f"?days={days}" if days is not None else ""
+    extra = {"If-None-Match": f'"{etag}"'} if etag else {}
+    return client.get(f"/api/analytics/dashboard{query}", headers=dict(headers, **extra))
+
+
+def test_unchanged_dashboard_revalidates_with_304(client, learner):
+    headers = learner[0]
+    first = dashboard(client, headers)
+    etag = first.get_etag()[0]
+    assert first.status_code == 200 and etag
+
+    revalidated = dashboard(client, headers, etag=etag)
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+    assert revalidated.get_etag()[0] == etag
+    assert revalidated.headers["Cache-Control"] == "private, no-cache"
+
+    assert dashboard(client, headers, etag="stale").status_code == 200
+
+
+def test_committed_writes_invalidate_the_dashboard(client, learner, take_quiz):
+    headers, _, quiz_id, question_ids = learner
+    etag = dashboard(client, headers).get_etag()[0]
+
+    take_quiz(headers, quiz_id, question_ids, 3)
+
+    refreshed = dashboard(client, headers, etag=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()["overview"]["total_quizzes_taken"] == 1
+    assert refreshed.get_etag()[0] != etag
+
+
+def test_daily_goal_change_invalidates_the_dashboard(app, client, learner):
+    headers, user_id, _, _ = learner
+    etag = dashboard(client, headers).get_etag()[0]
+
+    response = client.put("/api/auth/profile", headers=headers, json={"daily_goal_minutes": 45})
+    assert response.status_code == 200
+
+    refreshed = dashboard(client, headers, etag=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()["daily_goal_progress"]["daily_goal_minutes"] == 45
+
+    # A rolled back change leaves the cached entry in place
+    etag = refreshed.get_etag()[0]
+    with app.app_context():
+        db.session.get(User, user_id).daily_goal_minutes = 90
+        db.session.flush()
+        db.session.rollback()
+    assert dashboard(client, headers, etag=etag).status_code == 304
+
+
+def test_days_is_clamped(client, learner):
+    headers = learner[0]
+
+    assert dashboard(client, headers, days=100000).get_etag() == dashboard(client, headers, days=3 * 366).get_etag()
+    assert dashboard(client, headers, days=-5).get_json() == dashboard(client, headers, days=1).get_json()
+    assert set(DashboardCache._entries[learner[1]]) == {3 * 366, 1}
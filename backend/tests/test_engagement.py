@@ -0,0 +1,54 @@
+import threading
+from datetime import date
+
+from sqlalchemy.exc import OperationalError
+
+from src.database import db
+from src.models.analytics import DailyActiveUsers
+from src.services.engagement_service import EngagementService
+from src.utils.sketches import HyperLogLog
+
+DAY = date(2026, 3, 2)
+
+
+def record(app, user_ids):
+    with app.app_context():
+        for user_id in user_ids:
+            while True:
+                try:
+                    EngagementService.record_active(user_id, DAY)
+                    db.session.commit()
+                    break
+                except OperationalError:  # Database locked by another writer: retry
+                    db.session.rollback()
+
+
+def test_concurrent_records_keep_every_register(app):
+    threads = [
+        threading.Thread(target=record, args=(app, range(start, 2000, 8)))
+        for start in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = HyperLogLog(EngagementService.PRECISION)
+    for user_id in range(2000):
+        expected.add(user_id)
+    with app.app_context():
+        row = db.session.get(DailyActiveUsers, DAY)
+        assert row.registers == expected.to_bytes()
+        assert abs(EngagementService.get_engagement(days=1, today=DAY)['dau'] - 2000) < 2000 * 0.05
+
+
+def test_repeat_visits_do_not_write(app):
+    with app.app_context():
+        EngagementService.record_active(1, DAY)
+        db.session.commit()
+        before = db.session.get(DailyActiveUsers, DAY).updated_at
+        db.session.expire_all()
+
+        EngagementService.record_active(1, DAY)
+        db.session.commit()
+        assert db.session.get(DailyActiveUsers, DAY).updated_at == before
@@ -0,0 +1,99 @@
+import pytest
+
+from src.database import db
+from src.models.gamification import Achievement, UserAchievement, UserLevel
+from src.models.outbox import OutboxEvent
+from src.services.achievement_rules import AchievementEngine
+from src.services.catalog_cache import CatalogCache
+from src.services.event_outbox import EventOutbox
+
+
+@pytest.fixture
+def studied(app, register):
+    """A user with no level row yet, one pending resource_completed event and a one-day streak achievement"""
+    _, user_id = register()
+    with app.app_context():
+        db.session.add(Achievement(
+            name="First day", description="Study one day", icon="flame", category="learning", points=10,
+            condition_type="streak", condition_target=1, condition_resource="learning_streak"
+        ))
+        EventOutbox.emit(user_id, "resource_completed")
+        db.session.commit()
+        CatalogCache.invalidate()
+        assert UserLevel.query.filter_by(user_id=user_id).count() == 0
+    return user_id
+
+
+@pytest.fixture
+def failing_evaluation(monkeypatch):
+    """Make rule evaluation raise the first `times` calls"""
+    def fail(times):
+        calls = {"count": 0}
+        evaluate = AchievementEngine.evaluate
+
+        def flaky(user_id, keys=None):
+            calls["count"] += 1
+            if calls["count"] <= times:
+                raise RuntimeError("evaluation failed")
+            return evaluate(user_id, keys)
+
+        monkeypatch.setattr(AchievementEngine, "evaluate", staticmethod(flaky))
+    return fail
+
+
+def outbox_rows():
+    return [(row.processed_at is not None, row.attempts, row.last_error) for row in OutboxEvent.query.all()]
+
+
+def test_events_are_processed_once(app, studied):
+    with app.app_context():
+        assert EventOutbox.process_batch() == 1
+        assert EventOutbox.process_batch() == 0
+
+        level = UserLevel.query.filter_by(user_id=studied).one()
+        assert (level.current_learning_streak, level.total_points) == (1, 10)
+        assert outbox_rows() == [(True, 1, None)]
+
+
+def test_redelivered_events_do_not_award_twice(app, studied):
+    with app.app_context():
+        EventOutbox.process_batch()
+        # As if the consumer crashed after its commit and the batch was taken again
+        OutboxEvent.query.update({OutboxEvent.processed_at: None})
+        db.session.commit()
+
+        assert EventOutbox.process_batch() == 1
+
+        level = UserLevel.query.filter_by(user_id=studied).one()
+        assert (level.current_learning_streak, level.total_points) == (1, 10)
+        assert UserAchievement.query.filter_by(user_id=studied).count() == 1
+
+
+def test_failure_commits_nothing_and_is_retried(app, studied, failing_evaluation):
+    failing_evaluation(times=1)
+
+    with app.app_context():
+        EventOutbox.process_batch()
+
+        # The streak refresh created the level row without committing, so it was rolled back with the rest
+        assert UserLevel.query.filter_by(user_id=studied).count() == 0
+        assert outbox_rows() == [(False, 1, "evaluation failed")]
+
+        assert EventOutbox.process_batch() == 1
+        level = UserLevel.query.filter_by(user_id=studied).one()
+        assert (level.current_learning_streak, level.total_points) == (1, 10)
+        assert outbox_rows() == [(True, 2, "evaluation failed")]
+
+
+def test_events_are_given_up_after_max_attempts(app, studied, failing_evaluation):
+    failing_evaluation(times=EventOutbox.MAX_ATTEMPTS)
+
+    with app.app_context():
+        for attempt in range(1, EventOutbox.MAX_ATTEMPTS):
+            EventOutbox.process_batch()
+            assert outbox_rows() == [(False, attempt, "evaluation failed")]
+
+        EventOutbox.process_batch()
+        assert outbox_rows() == [(True, EventOutbox.MAX_ATTEMPTS, "evaluation failed")]
+        assert EventOutbox.process_batch() == 0
+        assert UserLevel.query.filter_by(user_id=studied).count() == 0
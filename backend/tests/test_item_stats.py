@@ -0,0 +1,55 @@
+import pytest
+
+from src.database import db
+from src.models.analytics import QuestionStats
+from src.services.item_stats import STAT_FIELDS, ItemStatsService
+
+
+def analysis_rows(quiz_id):
+    return [
+        (item["question_id"], item["attempts"], item["correct_count"], item["difficulty"], item["discrimination"])
+        for item in ItemStatsService.item_analysis(quiz_id)["questions"]
+    ]
+
+
+def stats_rows():
+    return {
+        row.question_id: {field: getattr(row, field) for field in ("quiz_id", *STAT_FIELDS)}
+        for row in QuestionStats.query.all()
+    }
+
+
+def test_incremental_stats_equal_a_rebuild(app, client, register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id, questions=4)
+    other_quiz, other_questions = seed_quiz(user_id, questions=2, subject="SQL")
+    for correct in (4, 3, 1, 0, 2, 3):
+        take_quiz(headers, quiz_id, question_ids, correct)
+
+    # A two-point question added later: attempts before and after it have different totals
+    response = client.post(f"/api/quizzes/{quiz_id}/questions", headers=headers, json={
+        "question_text": "Q4", "question_type": "short_answer", "correct_answer": "A4", "points": 2
+    })
+    assert response.status_code == 201
+    question_ids.append(response.get_json()["question"]["id"])
+    for correct in (5, 4, 2):
+        take_quiz(headers, quiz_id, question_ids, correct)
+    for correct in (2, 1):
+        take_quiz(headers, other_quiz, other_questions, correct)
+
+    with app.app_context():
+        incremental = stats_rows()
+        analysis = {quiz: analysis_rows(quiz) for quiz in (quiz_id, other_quiz)}
+        assert set(incremental) == set(question_ids + other_questions)
+        assert incremental[question_ids[-1]]["attempts"] == 3
+
+        assert ItemStatsService.rebuild(chunk_size=1) == len(incremental)
+        db.session.expire_all()
+        rebuilt = stats_rows()
+
+        assert rebuilt.keys() == incremental.keys()
+        for question_id, row in incremental.items():
+            # The rebuild re-derives durations from the attempt timestamps, hence the tolerance
+            assert rebuilt[question_id] == pytest.approx(row, abs=0.05), question_id
+        for quiz in (quiz_id, other_quiz):
+            assert analysis_rows(quiz) == analysis[quiz]
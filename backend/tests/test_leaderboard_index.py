@@ -0,0 +1,167 @@
+import random
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from src.database import db
+from src.models.gamification import UserLevel
+from src.services.leaderboard_index import Board, LeaderboardIndex
+
+
+def add_levels(app, register, points):
+    user_ids = []
+    for index, total_points in enumerate(points):
+        _, user_id = register(f"user{index}")
+        user_ids.append(user_id)
+    with app.app_context():
+        for user_id, total_points in zip(user_ids, points):
+            level = UserLevel.query.filter_by(user_id=user_id).first() or UserLevel(user_id=user_id)
+            level.total_points = total_points
+            db.session.add(level)
+        db.session.commit()
+    return user_ids
+
+
+def test_ranks_follow_committed_scores(app, register):
+    first, second, third = add_levels(app, register, [50, 300, 120])
+
+    with app.app_context():
+        assert [user_id for _, user_id, _ in LeaderboardIndex.top("all_time", "points", 10)] == [second, third, first]
+
+        level = UserLevel.query.filter_by(user_id=first).first()
+        level.total_points = 500
+        db.session.commit()
+
+        assert LeaderboardIndex.position("all_time", "points", first) == (1, 500)
+        assert [user_id for _, user_id, _ in LeaderboardIndex.around("all_time", "points", third, 1)] == [second, third]
+
+
+def test_a_slow_build_blocks_only_its_own_board(app, register, monkeypatch):
+    add_levels(app, register, [10, 20])
+    release = threading.Event()
+    builds = []
+    level_rows = LeaderboardIndex._level_rows
+
+    def slow_level_rows(since=None):
+        if since is None:
+            builds.append(threading.current_thread().name)
+            release.wait(5)
+        return level_rows(since)
+
+    monkeypatch.setattr(LeaderboardIndex, "_level_rows", staticmethod(slow_level_rows))
+    results = {}
+
+    def read(name):
+        with app.app_context():
+            results[name] = LeaderboardIndex.size("all_time", "points")
+
+    readers = [threading.Thread(target=read, args=(f"reader{index}",), name=f"reader{index}") for index in range(3)]
+    for reader in readers:
+        reader.start()
+    while not builds:
+        time.sleep(0.01)
+
+    with app.app_context():
+        # The all-time build is stuck; period boards and the lock stay available
+        started = time.monotonic()
+        assert LeaderboardIndex.size("weekly", "points") == 0
+        assert time.monotonic() - started < 1
+
+    release.set()
+    for reader in readers:
+        reader.join()
+    assert len(builds) == 1
+    assert results == {"reader0": 2, "reader1": 2, "reader2": 2}
+
+
+def test_a_slow_catch_up_does_not_block_readers(app, register, monkeypatch):
+    first, second = add_levels(app, register, [10, 20])
+    with app.app_context():
+        assert LeaderboardIndex.size("all_time", "points") == 2
+    fetched = threading.Event()
+    release = threading.Event()
+    level_rows = LeaderboardIndex._level_rows
+
+    def slow_level_rows(since=None):
+        rows = level_rows(since)
+        if since is not None and threading.current_thread().name == "catch-up":
+            fetched.set()
+            release.wait(5)
+        return rows
+
+    def catch_up():
+        with app.app_context():
+            LeaderboardIndex.top("all_time", "points", 10)
+
+    monkeypatch.setattr(LeaderboardIndex, "_level_rows", staticmethod(slow_level_rows))
+    LeaderboardIndex._synced_at = 0.0
+    thread = threading.Thread(target=catch_up, name="catch-up")
+    thread.start()
+    assert fetched.wait(5)
+
+    with app.app_context():
+        # The catch-up's query is stuck; readers and commits go ahead on the boards as they are
+        started = time.monotonic()
+        assert LeaderboardIndex.position("all_time", "points", second) == (1, 20)
+        level = UserLevel.query.filter_by(user_id=first).first()
+        level.total_points = 500
+        db.session.commit()
+        assert LeaderboardIndex.position("all_time", "points", first) == (1, 500)
+        assert time.monotonic() - started < 1
+
+    release.set()
+    thread.join()
+    with app.app_context():
+        # The rows read before the commit do not overwrite the newer score
+        assert LeaderboardIndex.position("all_time", "points", first) == (1, 500)
+
+
+def test_warm_up_builds_every_board(app, register):
+    add_levels(app, register, [10, 20, 30])
+
+    LeaderboardIndex._warm(app)
+
+    assert LeaderboardIndex._boards is not None
+    assert len(LeaderboardIndex._period_boards) == 4
+    assert len(LeaderboardIndex._boards["points"]) == 3
+
+
+@pytest.mark.benchmark
+def test_one_million_user_board():
+    users = 1_000_000
+    rng = random.Random(7)
+    scores = [(user_id, rng.randrange(100_000)) for user_id in range(1, users + 1)]
+
+    started = time.perf_counter()
+    board = Board.from_scores(scores)
+    build_seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    measured = Board.from_scores(scores[:100_000])
+    bytes_per_user = tracemalloc.get_traced_memory()[0] / len(measured)
+    tracemalloc.stop()
+
+    def per_call_us(operation, calls=20_000):
+        started = time.perf_counter()
+        for _ in range(calls):
+            operation()
+        return (time.perf_counter() - started) / calls * 1e6
+
+    rank_us = per_call_us(lambda: board.rank(rng.randrange(1, users + 1)))
+    update_us = per_call_us(lambda: board.set(rng.randrange(1, users + 1), rng.randrange(100_000)))
+
+    def page():
+        start = rng.randrange(users - 100)
+        return board.page(start, start + 100)
+
+    page_us = per_call_us(page, 2_000)
+
+    print(
+        f"\n1M users: build {build_seconds:.1f}s, {bytes_per_user:.0f} B/user "
+        f"(~{bytes_per_user * users / 1e6:.0f} MB per board), rank {rank_us:.1f}us, "
+        f"update {update_us:.1f}us, 100-row page {page_us:.1f}us"
+    )
+    assert bytes_per_user < 400  # Documented budget: ~340 MB per board per process at 1M users
+    assert rank_us < 200 and update_us < 500
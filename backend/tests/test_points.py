@@ -0,0 +1,119 @@
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from src.database import db
+from src.models.analytics import UserDailyStats
+from src.models.gamification import PointsLedgerEntry, UserLevel
+from src.services.gamification_service import GamificationService
+from src.services.stats_service import StatsService
+
+THREADS = 8
+AWARDS_PER_THREAD = 40
+
+
+def award(app, user_id, category, points):
+    with app.app_context():
+        for _ in range(AWARDS_PER_THREAD):
+            while True:
+                try:
+                    GamificationService.award_points(user_id, points, category)
+                    break
+                except OperationalError:  # Database locked by another writer: retry
+                    db.session.rollback()
+
+
+def test_concurrent_awards_add_up_exactly(app, register):
+    # No user_levels row yet: the first awards also race to create it
+    _, user_id = register()
+    threads = [
+        threading.Thread(target=award, args=(app, user_id, "quiz" if index % 2 else "learning", 7))
+        for index in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = THREADS * AWARDS_PER_THREAD * 7
+    with app.app_context():
+        level = UserLevel.query.filter_by(user_id=user_id).one()
+        assert level.total_points == expected
+        assert level.quiz_points == level.learning_points == expected // 2
+        assert level.current_level == GamificationService._level_for_points(1, expected)
+        assert level.points_to_next_level == (
+            GamificationService._calculate_points_for_level(level.current_level + 1) - expected
+        )
+
+        ledger = db.session.query(func.sum(PointsLedgerEntry.points)).filter_by(user_id=user_id).scalar()
+        daily = db.session.query(func.sum(UserDailyStats.points_earned)).filter_by(user_id=user_id).scalar()
+        assert ledger == daily == expected
+
+
+def test_award_crossing_several_levels(app, register):
+    _, user_id = register()
+
+    with app.app_context():
+        level = GamificationService.award_points(user_id, 1000, "achievement")
+
+        # 1000 points: level 3 needs 900, level 4 needs 1600
+        assert (level.current_level, level.points_to_next_level) == (3, 600)
+
+
+def ledger_totals(user_id):
+    rows = db.session.query(PointsLedgerEntry.category, func.sum(PointsLedgerEntry.points)).filter_by(
+        user_id=user_id
+    ).group_by(PointsLedgerEntry.category)
+    return dict(rows)
+
+
+def test_compaction_keeps_totals_and_runs_once(app, register):
+    _, user_id = register()
+    old_day = datetime(2024, 3, 4, 9)
+    recent_day = datetime.utcnow() - timedelta(days=1)
+
+    with app.app_context():
+        for hour in range(3):
+            StatsService.record_points(user_id, 10, "quiz", old_day + timedelta(hours=hour))
+            StatsService.record_points(user_id, 5, "learning", recent_day)
+        StatsService.record_points(user_id, 7, "learning", old_day)
+        db.session.commit()
+        before = ledger_totals(user_id)
+        cutoff = datetime.utcnow() - timedelta(days=StatsService.LEDGER_RETENTION_DAYS)
+
+        # Three quiz awards on the old day fold into one row; the single learning award is left alone
+        assert StatsService.compact_points_ledger(cutoff) == 3
+        assert ledger_totals(user_id) == before
+        compacted = PointsLedgerEntry.query.filter_by(user_id=user_id, category="quiz").one()
+        assert (compacted.points, compacted.entries, compacted.created_at) == (30, 3, datetime(2024, 3, 4))
+        assert PointsLedgerEntry.query.filter(PointsLedgerEntry.created_at >= cutoff).count() == 3
+
+        # The compacted row is one row per group now, so a second pass removes nothing
+        assert StatsService.compact_points_ledger(cutoff) == 0
+        assert ledger_totals(user_id) == before
+        assert PointsLedgerEntry.query.filter_by(user_id=user_id, category="quiz").one().id == compacted.id
+
+
+def test_backfill_rebuilds_points_from_the_ledger(app, register):
+    _, user_id = register()
+    legacy_day, first_ledger_day, later_day = date(2024, 1, 2), date(2024, 3, 4), date(2024, 3, 6)
+
+    with app.app_context():
+        # Points from before the ledger existed live only in the rollup
+        StatsService._increment(user_id, legacy_day, points_earned=40)
+        StatsService.record_points(user_id, 10, "quiz", first_ledger_day)
+        StatsService.record_points(user_id, 15, "quiz", later_day)
+        StatsService.record_points(user_id, 15, "learning", later_day)
+        db.session.commit()
+        StatsService.compact_points_ledger(datetime(2024, 6, 1))
+        # Drift: the rollup lost one award and gained points no ledger row explains
+        UserDailyStats.query.filter_by(user_id=user_id, date=later_day).update({"points_earned": 15})
+        StatsService._increment(user_id, date(2024, 3, 5), points_earned=99)
+        db.session.commit()
+
+        StatsService.backfill_daily_stats(user_id)
+
+        points = dict(db.session.query(UserDailyStats.date, UserDailyStats.points_earned).filter_by(user_id=user_id))
+        assert points == {legacy_day: 40, first_ledger_day: 10, later_day: 30}
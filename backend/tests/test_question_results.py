@@ -0,0 +1,116 @@
+import pytest
+
+from src.database import db
+from src.models.learning import Question, QuestionResult, Quiz
+from src.routes import quizzes
+
+
+@pytest.fixture
+def attempt(register, seed_quiz, take_quiz):
+    """One submitted attempt with the first two of three questions right"""
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    attempt_id = take_quiz(headers, quiz_id, question_ids, 2)["results"]["attempt_id"]
+    return headers, attempt_id, question_ids
+
+
+def forbid_grading(monkeypatch):
+    """Fail the request if the details view grades answers instead of reading stored results"""
+    def grade(answer_key, answers):
+        raise AssertionError("answers were re-graded")
+
+    monkeypatch.setattr(quizzes, "grade", grade)
+
+
+def stored_results(attempt_id):
+    rows = QuestionResult.query.filter_by(attempt_id=attempt_id).order_by(QuestionResult.question_id)
+    return [(row.question_id, row.answer, row.is_correct, row.points_earned) for row in rows]
+
+
+def details(client, headers, attempt_id):
+    response = client.get(f"/api/quiz-attempts/{attempt_id}", headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return [
+        (row["question"]["id"], row["user_answer"], row["is_correct"])
+        for row in response.get_json()["attempt"]["detailed_results"]
+    ]
+
+
+def test_details_read_the_results_stored_at_submit(app, client, attempt, monkeypatch):
+    headers, attempt_id, question_ids = attempt
+    forbid_grading(monkeypatch)
+
+    with app.app_context():
+        assert stored_results(attempt_id) == [
+            (question_ids[0], "A0", True, 1), (question_ids[1], "A1", True, 1), (question_ids[2], "wrong", False, 0)
+        ]
+
+    assert details(client, headers, attempt_id) == [
+        (question_ids[0], "A0", True), (question_ids[1], "A1", True), (question_ids[2], "wrong", False)
+    ]
+
+
+def test_legacy_attempts_are_graded_once(app, client, attempt, monkeypatch):
+    headers, attempt_id, question_ids = attempt
+    with app.app_context():
+        # Submitted before per-question results were stored
+        QuestionResult.query.filter_by(attempt_id=attempt_id).delete()
+        db.session.commit()
+
+    graded = details(client, headers, attempt_id)
+    assert graded == [(question_ids[0], "A0", True), (question_ids[1], "A1", True), (question_ids[2], "wrong", False)]
+    with app.app_context():
+        assert len(stored_results(attempt_id)) == 3
+
+    forbid_grading(monkeypatch)
+    assert details(client, headers, attempt_id) == graded
+
+
+def test_missed_questions(client, register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+    other_quiz, other_questions = seed_quiz(user_id, questions=1, subject="SQL")
+    # Q0 always right, Q1 missed twice out of three, Q2 always missed
+    for correct in (2, 1, 1):
+        take_quiz(headers, quiz_id, question_ids, correct)
+    for _ in range(2):
+        take_quiz(headers, other_quiz, other_questions, 0)
+
+    def missed(**params):
+        response = client.get("/api/quizzes/missed-questions", headers=headers, query_string=params)
+        assert response.status_code == 200, response.get_json()
+        return [(row["question_id"], row["times_answered"], row["times_missed"], row["miss_rate"])
+                for row in response.get_json()["questions"]]
+
+    assert missed() == [(question_ids[2], 3, 3, 100.0), (other_questions[0], 2, 2, 100.0), (question_ids[1], 3, 2, 66.7)]
+    assert missed(quiz_id=quiz_id) == [(question_ids[2], 3, 3, 100.0), (question_ids[1], 3, 2, 66.7)]
+    assert missed(min_attempts=3, limit=1) == [(question_ids[2], 3, 3, 100.0)]
+
+
+def test_editing_a_question_regrades_the_next_submit(app, client, attempt, take_quiz):
+    headers, _, question_ids = attempt
+    with app.app_context():
+        quiz_id = db.session.get(Question, question_ids[0]).quiz_id
+        version = db.session.get(Quiz, quiz_id).version
+        # The first submit left this quiz's key cached in the process
+        db.session.get(Question, question_ids[0]).correct_answer = "B0"
+        db.session.commit()
+        assert db.session.get(Quiz, quiz_id).version == version + 1
+
+    # Answering A0 to every question is now wrong on the edited one
+    results = take_quiz(headers, quiz_id, question_ids, 3)["results"]
+    assert [row["is_correct"] for row in results["detailed_results"]] == [False, True, True]
+    assert results["detailed_results"][0]["correct_answer"] == "B0"
+    with app.app_context():
+        assert stored_results(results["attempt_id"])[0] == (question_ids[0], "A0", False, 0)
+
+    response = client.post(f"/api/quizzes/{quiz_id}/questions", headers=headers, json={
+        "question_text": "Q3", "question_type": "short_answer", "correct_answer": "A3"
+    })
+    assert response.status_code == 201
+    with app.app_context():
+        assert db.session.get(Quiz, quiz_id).version == version + 2
+
+    question_ids.append(response.get_json()["question"]["id"])
+    results = take_quiz(headers, quiz_id, question_ids, 4)["results"]
+    assert (results["score"], results["max_score"]) == (3, 4)
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import func
+
+from src.database import db
+from src.models.gamification import Achievement, Badge, RuleBackfillJob, UserAchievement, UserBadge, UserLevel
+from src.models.learning import Note
+from src.services.catalog_cache import CatalogCache
+from src.services.rule_backfill import RuleBackfill
+
+NOTE_WRITERS = 4
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def catalog(app, register):
+    """Five users, the first four with a note; a note rule worth 100 points and the rules it unlocks"""
+    user_ids = [register(f"user{index}")[1] for index in range(NOTE_WRITERS + 1)]
+    with app.app_context():
+        for user_id in user_ids[:NOTE_WRITERS]:
+            db.session.add(Note(user_id=user_id, title="Note", content="text"))
+        note_rule = Achievement(
+            name="First note", description="Write a note", icon="pen", category="notes", points=100,
+            condition_type="count", condition_target=1, condition_resource="notes_created"
+        )
+        points_rule = Achievement(
+            name="Hundred points", description="Earn 100 points", icon="star", category="points", points=0,
+            condition_type="time", condition_target=100, condition_resource="total_points"
+        )
+        collector = Badge(
+            name="Collector", description="Earn two achievements", icon="trophy", color="#ffaa00",
+            category="achievements", condition_type="achievements", condition_value=2
+        )
+        db.session.add_all([note_rule, points_rule, collector])
+        db.session.commit()
+        CatalogCache.invalidate()
+        return user_ids, note_rule.id, points_rule.id, collector.id
+
+
+def earned(model, rule_column, rule_id):
+    return sorted(user_id for (user_id,) in db.session.query(model.user_id).filter(rule_column == rule_id))
+
+
+def test_backfill_awards_the_cascade_once(app, catalog):
+    user_ids, note_rule, points_rule, collector = catalog
+    writers = user_ids[:NOTE_WRITERS]
+
+    with app.app_context():
+        job = RuleBackfill("achievement", note_rule, chunk_size=2).run()
+        assert (job.status, job.users_processed, job.awarded_count) == ("completed", 5, NOTE_WRITERS)
+
+        assert earned(UserAchievement, UserAchievement.achievement_id, note_rule) == writers
+        assert earned(UserAchievement, UserAchievement.achievement_id, points_rule) == writers
+        assert earned(UserBadge, UserBadge.badge_id, collector) == writers
+        points = db.session.query(UserLevel.user_id, UserLevel.total_points).filter(UserLevel.user_id.in_(writers))
+        assert dict(points) == {user_id: 100 for user_id in writers}
+
+        # A second run finds nothing left to award
+        job = RuleBackfill("achievement", note_rule, chunk_size=2).run()
+        assert (job.status, job.awarded_count) == ("completed", 0)
+        assert UserAchievement.query.count() == 2 * NOTE_WRITERS
+        assert UserBadge.query.count() == NOTE_WRITERS
+        assert db.session.query(func.sum(UserLevel.total_points)).scalar() == 100 * NOTE_WRITERS
+
+
+def test_interrupted_backfill_resumes_from_its_cursor(app, catalog):
+    user_ids, note_rule, points_rule, _ = catalog
+
+    def interrupt(job):
+        raise Interrupted
+
+    with app.app_context():
+        with pytest.raises(Interrupted):
+            RuleBackfill("achievement", note_rule, chunk_size=2, progress=interrupt).run()
+        db.session.rollback()
+
+        # The first chunk committed with its cascade; the job is still running at its cursor
+        job = RuleBackfillJob.query.one()
+        assert (job.status, job.last_user_id, job.users_processed) == ("running", user_ids[1], 2)
+        assert earned(UserAchievement, UserAchievement.achievement_id, points_rule) == user_ids[:2]
+
+        resumed = RuleBackfill("achievement", note_rule, chunk_size=2).run()
+        assert resumed.id == job.id
+        assert (resumed.status, resumed.users_processed, resumed.awarded_count) == ("completed", 5, NOTE_WRITERS)
+        assert earned(UserAchievement, UserAchievement.achievement_id, note_rule) == user_ids[:NOTE_WRITERS]
+        assert earned(UserAchievement, UserAchievement.achievement_id, points_rule) == user_ids[:NOTE_WRITERS]
@@ -0,0 +1,86 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database import db
+from src.models.scheduler import ScheduledJobLease
+from src.services.scheduler import ScheduledJob, Scheduler
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """Isolated job registry; each thread acts as its own worker, named after the thread"""
+    monkeypatch.setattr(Scheduler, "_jobs", {})
+    monkeypatch.setattr(Scheduler, "_metrics", {})
+    monkeypatch.setattr(Scheduler, "owner", staticmethod(lambda: threading.current_thread().name))
+
+
+def lease():
+    row = db.session.get(ScheduledJobLease, "report")
+    db.session.refresh(row)
+    return row
+
+
+def test_one_of_two_workers_runs_the_slot(app, workers):
+    ran = []
+    barrier = threading.Barrier(2)
+
+    def report():
+        ran.append(threading.current_thread().name)
+        time.sleep(0.2)
+
+    # Every worker process registers its own copy of the job
+    jobs = [Scheduler.register("report", report, every=3600), ScheduledJob("report", report, every=3600)]
+    slot = jobs[0].slot(datetime.utcnow())
+    results = {}
+
+    def worker(job):
+        barrier.wait()
+        results[threading.current_thread().name] = Scheduler.run_job(app, job, slot)
+
+    threads = [threading.Thread(target=worker, args=(job,), name=f"worker{index}") for index, job in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results.values()) == [False, True]
+    assert ran == [name for name, won in results.items() if won]
+    with app.app_context():
+        row = lease()
+        assert (row.owner, row.run_count, row.last_status, row.lease_expires_at) == (ran[0], 1, "success", None)
+
+    # The slot has been run; neither worker runs it again
+    assert not Scheduler.run_job(app, jobs[1], slot)
+    assert len(ran) == 1
+
+
+def test_expired_lease_is_taken_over(app, workers):
+    ran = []
+    job = Scheduler.register("report", lambda: ran.append(Scheduler.owner()), every=3600, lease=60)
+    now = datetime.utcnow()
+    slot = job.slot(now)
+
+    with app.app_context():
+        # A worker started the previous slot and died mid-run, leaving its lease behind
+        db.session.add(ScheduledJobLease(
+            job_name="report", owner="crashed", lease_expires_at=now + timedelta(seconds=30),
+            last_started_at=slot - timedelta(minutes=5), run_count=0, failure_count=0
+        ))
+        db.session.commit()
+
+    # The live lease keeps the new slot from overlapping the old run
+    assert not Scheduler.run_job(app, job, slot)
+
+    with app.app_context():
+        lease().lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+    assert Scheduler.run_job(app, job, slot)
+    assert ran == [threading.current_thread().name]
+    with app.app_context():
+        row = lease()
+        assert (row.owner, row.run_count, row.lease_expires_at) == (ran[0], 1, None)
+        assert row.last_started_at >= slot
@@ -0,0 +1,129 @@
+import bisect
+import random
+import struct
+import time
+from array import array
+
+import pytest
+
+from src.utils.sketches import KLLSketch
+
+
+def exact_cdf(sorted_values, value):
+    return bisect.bisect_left(sorted_values, value) / len(sorted_values)
+
+
+@pytest.mark.parametrize("distribution", ["uniform", "normal", "scores"])
+def test_cdf_matches_exact_percentiles(distribution):
+    rng = random.Random(7)
+    if distribution == "uniform":
+        values = [rng.uniform(0, 100) for _ in range(100_000)]
+    elif distribution == "normal":
+        values = [rng.gauss(70, 12) for _ in range(100_000)]
+    else:
+        # Quiz percentages: few distinct values, many ties
+        values = [round(rng.randint(0, 12) / 12 * 100, 4) for _ in range(100_000)]
+
+    random.seed(1)
+    sketch = KLLSketch()
+    for value in values:
+        sketch.update(value)
+
+    values.sort()
+    probes = [values[int(len(values) * q)] for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)]
+    errors = [abs(sketch.cdf(probe) - exact_cdf(values, probe)) for probe in probes]
+    assert max(errors) < 0.02
+    assert len(sketch.to_bytes()) < 16_000
+
+
+def test_merged_sketches_match_exact_percentiles():
+    rng = random.Random(11)
+    random.seed(2)
+    parts = [[rng.uniform(0, 100) for _ in range(20_000)] for _ in range(5)]
+    merged = KLLSketch()
+    for part in parts:
+        sketch = KLLSketch()
+        for value in part:
+            sketch.update(value)
+        merged.merge(sketch)
+
+    values = sorted(value for part in parts for value in part)
+    assert merged.n == len(values)
+    for q in (0.1, 0.5, 0.9):
+        probe = values[int(len(values) * q)]
+        assert abs(merged.cdf(probe) - exact_cdf(values, probe)) < 0.02
+
+
+def test_serialization_round_trip_is_exact():
+    random.seed(3)
+    sketch = KLLSketch()
+    for i in range(50_000):
+        sketch.update((i * 37 % 1000) / 3)
+
+    restored = KLLSketch.from_bytes(sketch.to_bytes())
+    assert restored.n == sketch.n
+    assert restored.compactors == sketch.compactors
+    for probe in (0.0, 1 / 3, 100 / 3, 200.0, 333.0):
+        assert restored.cdf(probe) == sketch.cdf(probe)
+
+
+def test_ties_are_not_counted_as_beaten_after_a_round_trip():
+    sketch = KLLSketch()
+    for _ in range(5):
+        sketch.update(200 / 3)
+        sketch.update(50.0)
+
+    assert sketch.cdf(200 / 3) == 0.5
+    assert KLLSketch.from_bytes(sketch.to_bytes()).cdf(200 / 3) == 0.5
+
+
+def test_reads_float32_sketches_written_by_format_1():
+    sketch = KLLSketch()
+    for value in (10.0, 20.0, 30.0):
+        sketch.update(value)
+    data = bytearray(sketch.to_bytes())
+    # Re-encode as format 1: same header and counts, float32 items
+    header_size = struct.calcsize('<BHQH') + 4 * len(sketch.compactors)
+    data[0] = 1
+    legacy = bytes(data[:header_size]) + array('f', [10.0, 20.0, 30.0]).tobytes()
+
+    restored = KLLSketch.from_bytes(legacy)
+    assert restored.n == 3
+    assert restored.cdf(25.0) == pytest.approx(2 / 3)
+
+
+def test_percentile_endpoint_counts_ties_as_not_beaten(client, register, seed_quiz, take_quiz):
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id, questions=3)
+    for correct in (2, 2, 2, 2, 2):
+        take_quiz(headers, quiz_id, question_ids, correct)
+    results = [take_quiz(headers, quiz_id, question_ids, 0)["results"] for _ in range(5)]
+
+    best = take_quiz(headers, quiz_id, question_ids, 2)["results"]
+    # Scores of 66.67% beat the five 0% attempts and tie with the other five
+    assert best["peer_percentiles"]["quiz"]["percentile"] == pytest.approx(5 / 11 * 100, abs=0.1)
+
+    response = client.get(f"/api/quiz-attempts/{best['attempt_id']}/percentile", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["percentiles"]["quiz"]["percentile"] == pytest.approx(5 / 11 * 100, abs=0.1)
+    assert results[0]["peer_percentiles"]["quiz"]["sample_size"] == 6
+
+
+@pytest.mark.benchmark
+def test_update_throughput():
+    rng = random.Random(5)
+    values = [rng.uniform(0, 100) for _ in range(1_000_000)]
+    sketch = KLLSketch()
+    started = time.perf_counter()
+    for value in values:
+        sketch.update(value)
+    elapsed = time.perf_counter() - started
+
+    restored_started = time.perf_counter()
+    for _ in range(1000):
+        KLLSketch.from_bytes(sketch.to_bytes()).cdf(50.0)
+    round_trip_ms = time.perf_counter() - restored_started  # Seconds for 1000 runs: ms per run
+
+    print(f"\n{len(values) / elapsed:,.0f} updates/s, {round_trip_ms:.3f} ms per load+cdf, "
+          f"{len(sketch.to_bytes())} bytes")
+    assert len(values) / elapsed > 100_000
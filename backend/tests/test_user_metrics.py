@@ -0,0 +1,96 @@
+import pytest
+
+from src.database import db
+from src.models.analytics import UserMetrics
+from src.services.achievement_rules import AchievementEngine
+from src.services.metrics_service import MetricsService
+
+
+@pytest.fixture
+def learner(client, register, seed_quiz, take_quiz):
+    """A user with two quiz attempts, one note left of two and two resource views; returns a write helper"""
+    headers, user_id = register()
+    quiz_id, question_ids = seed_quiz(user_id)
+
+    def write(quizzes=0, notes=0, views=0):
+        """Counted writes through the API; returns the ids of the notes created"""
+        for correct in range(quizzes):
+            take_quiz(headers, quiz_id, question_ids, correct % 4)
+        note_ids = []
+        for index in range(notes):
+            response = client.post("/api/notes", headers=headers, json={"title": f"Note {index}", "content": "text"})
+            assert response.status_code == 201
+            note_ids.append(response.get_json()["note"]["id"])
+        for _ in range(views):
+            client.post("/api/activities", headers=headers, json={"activity_type": "resource_viewed"})
+        return note_ids
+
+    note_id, _ = write(quizzes=2, notes=2, views=2)
+    assert client.delete(f"/api/notes/{note_id}", headers=headers).status_code == 200
+    return user_id, write
+
+
+def counters(user_id):
+    row = db.session.get(UserMetrics, user_id)
+    db.session.refresh(row)
+    return row
+
+
+def test_counters_follow_each_write(app, learner):
+    user_id, _ = learner
+
+    with app.app_context():
+        row = counters(user_id)
+        assert (row.quizzes_completed, row.notes_created, row.resources_viewed) == (2, 1, 2)
+
+        # The first reconciliation only marks the row; the counts already agree
+        assert MetricsService.reconcile(user_id) == 1
+        row = counters(user_id)
+        assert row.reconciled_at is not None
+        assert (row.quizzes_completed, row.notes_created, row.resources_viewed) == (2, 1, 2)
+        assert MetricsService.reconcile() == 0
+
+
+def test_reconcile_repairs_drift(app, learner):
+    user_id, _ = learner
+
+    with app.app_context():
+        MetricsService.reconcile(user_id)
+        db.session.get(UserMetrics, user_id).notes_created = 99
+        db.session.commit()
+
+        assert MetricsService.reconcile() == 1
+        assert counters(user_id).notes_created == 1
+        assert MetricsService.reconcile() == 0
+
+
+def test_first_increment_after_deploy_does_not_hide_history(app, learner):
+    user_id, write = learner
+    with app.app_context():
+        # Counters introduced after the user's history was written
+        db.session.delete(db.session.get(UserMetrics, user_id))
+        db.session.commit()
+
+    write(quizzes=1)
+
+    with app.app_context():
+        row = counters(user_id)
+        assert row.quizzes_completed == 1 and row.reconciled_at is None
+
+        values = AchievementEngine.progress_values(user_id)
+        assert values[("count", "quizzes_completed")] == 3
+        assert values[("count", "notes_created")] == 1
+        assert values[("count", "resources_viewed")] == 2
+
+        # The read reconciled the row, so the next one is served from the counters
+        row = counters(user_id)
+        assert row.quizzes_completed == 3 and row.reconciled_at is not None
+        from_counters = AchievementEngine.progress_values(user_id)
+        assert from_counters == pytest.approx(values)
+
+    write(quizzes=1, notes=1)
+
+    with app.app_context():
+        values = AchievementEngine.progress_values(user_id)
+        assert values[("count", "quizzes_completed")] == 4
+        assert values[("count", "notes_created")] == 2
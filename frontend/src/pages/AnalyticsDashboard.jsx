@@ -74,18 +74,19 @@ const AnalyticsDashboard = () => {
     setLoading(true);
     setError(null);
     try {
-      const [dashboardRes, learningRes, quizRes, studyTimeRes, activitiesRes] = await Promise.all([
-        axios.get(`${API_URL}/analytics/dashboard`),
-        axios.get(`${API_URL}/analytics/learning-progress`),
-        axios.get(`${API_URL}/analytics/quiz-analytics`),
-        axios.get(`${API_URL}/analytics/study-time`),
-        axios.get(`${API_URL}/activities?per_page=5`) // Fetch last 5 activities
-      ]);
-      setDashboardData(dashboardRes.data);
-      setLearningProgress(learningRes.data);
-      setQuizAnalytics(quizRes.data);
-      setStudyTimeAnalytics(studyTimeRes.data);
-      setUserActivities(activitiesRes.data.activities);
+      // One round-trip; the server derives every section from shared queries
+      const response = await axios.get(`${API_URL}/analytics/bundle`, {
+        params: {
+          sections: 'dashboard,learning_progress,quiz_analytics,study_time,activities',
+          activity_limit: 5 // Fetch last 5 activities
+        }
+      });
+      const bundle = response.data;
+      setDashboardData(bundle.dashboard);
+      setLearningProgress(bundle.learning_progress);
+      setQuizAnalytics(bundle.quiz_analytics);
+      setStudyTimeAnalytics(bundle.study_time);
+      setUserActivities(bundle.activities.activities);
     } catch (err) {
       setError(err.response?.data?.error || 'Failed to fetch analytics data');
     }
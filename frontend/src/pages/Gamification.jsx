@@ -37,19 +37,14 @@ const Gamification = () => {
   const fetchGamificationData = async () => {
     setLoading(true);
     try {
-      const [profileRes, achievementsRes, badgesRes, statsRes, levelRes] = await Promise.all([
-        axios.get(`${API_URL}/gamification/profile`),
-        axios.get(`${API_URL}/gamification/achievements`),
-        axios.get(`${API_URL}/gamification/badges`),
-        axios.get(`${API_URL}/gamification/stats`),
-        axios.get(`${API_URL}/gamification/level-progress`)
-      ]);
+      // Every section of the page comes from one overview request
+      const { data } = await axios.get(`${API_URL}/gamification/overview`);
 
-      setProfile(profileRes.data.profile);
-      setAchievements(achievementsRes.data.achievements);
-      setBadges(badgesRes.data.badges);
-      setStats(statsRes.data.stats);
-      setLevelProgress(levelRes.data);
+      setProfile(data.profile);
+      setAchievements(data.achievements);
+      setBadges(data.badges);
+      setStats(data.stats);
+      setLevelProgress(data.level_progress);
 
       // Fetch leaderboards
       await fetchLeaderboards();